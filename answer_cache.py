@@ -0,0 +1,176 @@
+"""
+Semantik yanıt cache'i.
+
+Aynı sorular tekrar tekrar sorulduğunda her seferinde LLM üretimi yapmamak
+için, üretilen yanıt normalize sorgu embedding'i ve retrieval'da kullanılan
+chunk ID'lerinin parmak izi ile saklanır. Bir sorgu ancak aynı chunk
+kümesini getirdiyse ve embedding'i kayıtlı sorguya cosine eşiğinden daha
+yakınsa cache'ten yanıtlanır. Kaynak dosya silindiğinde ya da yeniden
+yüklendiğinde o dosyaya dayanan kayıtlar düşürülür.
+"""
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Iterable, Set
+
+import numpy as np
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+def retrieval_fingerprint(chunk_ids: Iterable[str]) -> str:
+    """Retrieval'da kullanılan chunk ID kümesinin sıra bağımsız parmak izi"""
+    joined = "\n".join(sorted(set(chunk_ids)))
+    return hashlib.sha1(joined.encode("utf-8")).hexdigest()
+
+
+class SemanticAnswerCache:
+    """(normalize embedding, retrieval fingerprint) -> yanıt, LRU + TTL"""
+
+    def __init__(
+        self,
+        max_entries: int = config.ANSWER_CACHE_MAX_ENTRIES,
+        similarity_threshold: float = config.ANSWER_CACHE_SIMILARITY_THRESHOLD,
+        ttl_seconds: float = config.ANSWER_CACHE_TTL_SECONDS,
+    ):
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+        # entry_id -> kayıt (LRU sırasıyla)
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        # fingerprint -> entry_id'ler
+        self._by_fingerprint: Dict[str, Set[int]] = {}
+        # source_file -> entry_id'ler
+        self._by_source: Dict[str, Set[int]] = {}
+
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "invalidated": 0, "evicted": 0}
+
+    @staticmethod
+    def _normalize(embedding) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return None
+        return vector / norm
+
+    def _drop(self, entry_id: int):
+        """Kaydı tüm index'lerden sil (lock altında çağrılır)"""
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        bucket = self._by_fingerprint.get(entry["fingerprint"])
+        if bucket is not None:
+            bucket.discard(entry_id)
+            if not bucket:
+                del self._by_fingerprint[entry["fingerprint"]]
+        for source in entry["sources"]:
+            ids = self._by_source.get(source)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del self._by_source[source]
+
+    def lookup(self, embedding, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """Eşleşen yanıtı döndür, yoksa None"""
+        query = self._normalize(embedding)
+        now = time.time()
+        with self._lock:
+            bucket = self._by_fingerprint.get(fingerprint)
+            if query is None or not bucket:
+                self._stats["misses"] += 1
+                return None
+
+            best_id = None
+            best_score = self.similarity_threshold
+            for entry_id in list(bucket):
+                entry = self._entries[entry_id]
+                if now - entry["created_at"] > self.ttl_seconds:
+                    self._drop(entry_id)
+                    continue
+                score = float(np.dot(entry["embedding"], query))
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self._stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(best_id)
+            entry = self._entries[best_id]
+            entry["hits"] += 1
+            self._stats["hits"] += 1
+            return {**entry["result"], "cache_similarity": best_score}
+
+    def store(
+        self,
+        embedding,
+        fingerprint: str,
+        sources: Iterable[str],
+        result: Dict[str, Any],
+    ):
+        """Yanıtı cache'e ekle"""
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+        sources = {source for source in sources if source}
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                "embedding": vector,
+                "fingerprint": fingerprint,
+                "sources": sources,
+                "result": result,
+                "created_at": time.time(),
+                "hits": 0,
+            }
+            self._by_fingerprint.setdefault(fingerprint, set()).add(entry_id)
+            for source in sources:
+                self._by_source.setdefault(source, set()).add(entry_id)
+            self._stats["stores"] += 1
+
+            while len(self._entries) > self.max_entries:
+                oldest_id = next(iter(self._entries))
+                self._drop(oldest_id)
+                self._stats["evicted"] += 1
+
+    def invalidate_source(self, source_file: str) -> int:
+        """Kaynak dosyaya dayanan tüm kayıtları düşür"""
+        with self._lock:
+            entry_ids = list(self._by_source.get(source_file, ()))
+            for entry_id in entry_ids:
+                self._drop(entry_id)
+            self._stats["invalidated"] += len(entry_ids)
+        if entry_ids:
+            logger.info(f"🧹 Yanıt cache'i: {source_file} için {len(entry_ids)} kayıt düşürüldü")
+        return len(entry_ids)
+
+    def invalidate_sources(self, source_files: Iterable[str]) -> int:
+        return sum(self.invalidate_source(source) for source in set(source_files))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_fingerprint.clear()
+            self._by_source.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        stats["miss_ratio"] = stats["misses"] / lookups if lookups else 0.0
+        stats["similarity_threshold"] = self.similarity_threshold
+        return stats
+
+
+# Global cache instance
+answer_cache = SemanticAnswerCache()
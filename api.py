@@ -1,17 +1,25 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context
 from flask_cors import CORS
 import chromadb
 from quer import ask_local_llm, temizle_yanit
 from base import AdvancedDocumentProcessor
-from embedder import LocalEmbedder
-from chroma import ChromaDBManager
+from embedder import get_embedder
+from micro_batcher import get_query_batcher
+from conversation_store import conversation_store
+from answer_cache import answer_cache
+from chroma import get_chroma_manager
+from ingestion_queue import get_ingestion_queue, update_enhanced_catalogs
+from jsonl_io import iter_records, write_records
+from file_api_utils import file_api, init_file_api
+from stats_service import stats_reconciler, stats_json_writer
 from pathlib import Path
 from config import config
 import re
 
 import os
+import time
+import threading
 import datetime
-from datetime import datetime as dt
 import shutil
 from werkzeug.utils import secure_filename
 import json
@@ -19,6 +27,15 @@ import json
 app = Flask(__name__)
 CORS(app)  # React uygulamasından API çağrıları için
 
+
+@app.teardown_appcontext
+def release_question_db(exc):
+    """İstek bitince question_db bağlantısını havuza geri ver"""
+    from question_db import close_connection
+
+    close_connection()
+
+
 # Import config for consistency
 from config import config
 
@@ -36,8 +53,17 @@ os.makedirs(EMBEDDINGS_FOLDER, exist_ok=True)
 
 # Initialize enhanced components with consistent config
 processor = AdvancedDocumentProcessor()
-embedder = LocalEmbedder(model=config.EMBEDDING_MODEL)  # Local SentenceTransformer
-chroma_manager = ChromaDBManager()
+embedder = get_embedder(config.EMBEDDING_MODEL)  # Paylaşılan SentenceTransformer
+query_batcher = get_query_batcher(embedder)  # Eşzamanlı sorgular için micro-batching
+chroma_manager = get_chroma_manager()
+# Arka plan doküman işleme kuyruğu (yarım kalan işler açılışta devam eder)
+ingestion_queue = get_ingestion_queue(chroma_manager)
+ingestion_queue.start()
+# /api/docs/process_new aynı processor / embedder / chroma_manager ile process içinde çalışır
+init_file_api(processor, embedder, chroma_manager)
+app.register_blueprint(file_api)
+# Silinen dokümanların sorularını / kaynak anahtar kelimelerini arka planda güncelle
+stats_reconciler.start()
 
 
 def allowed_file(filename):
@@ -71,9 +97,9 @@ def generate_unique_filename(filename, upload_folder):
 def embed_query(text: str):
     """
     Soru için embedding hesaplar ve liste döner.
-    Sadece LocalEmbedder (SentenceTransformer) kullanır.
+    Eşzamanlı istekler micro-batcher üzerinden tek encode çağrısında işlenir.
     """
-    embedding = embedder.embed_single(text)
+    embedding = query_batcher.embed(text)
     return embedding.tolist()
 
 
@@ -87,6 +113,155 @@ def initialize_database():
         print(f"Veritabanı başlatılamadı: {e}")
 
 
+QUESTION_INDICATORS = [
+    "nasıl",
+    "ne",
+    "nerede",
+    "neden",
+    "kim",
+    "hangi",
+    "kaç",
+    "ne zaman",
+    "nasıl",
+    "nedir",
+    "kural",
+    "prosedür",
+    "işlem",
+    "gerekli",
+    "şart",
+    "başvuru",
+    "belge",
+    "form",
+    "süreç",
+    "?",
+]
+
+# /api/chat/stream için time-to-first-token metrikleri
+stream_metrics = {
+    "total_streams": 0,
+    "ttft_count": 0,
+    "ttft_total_ms": 0.0,
+    "ttft_last_ms": None,
+    "ttft_max_ms": 0.0,
+}
+stream_metrics_lock = threading.Lock()
+
+
+def get_chatbot():
+    """Paylaşılan RAG chatbot örneğini (gerekirse oluşturarak) döndürür"""
+    from rag_chatbot import AdvancedRAGChatbot
+
+    if not hasattr(chat, "_chatbot"):
+        chat._chatbot = AdvancedRAGChatbot()
+    return chat._chatbot
+
+
+def detect_greeting_and_question(user_query):
+    """Mesajda selamlama ve soru olup olmadığını döndürür (karma mesaj kontrolü)"""
+    from enhanced_chat_manager import conversation_manager
+
+    has_greeting = any(
+        re.search(pattern, user_query.lower())
+        for pattern in conversation_manager.greeting_patterns
+    )
+    has_question = any(
+        indicator in user_query.lower() for indicator in QUESTION_INDICATORS
+    )
+    return has_greeting, has_question
+
+
+def get_small_talk_response(user_id, user_query):
+    """Selamlama/veda mesajları için otomatik yanıt, diğerleri için None"""
+    from enhanced_chat_manager import conversation_manager
+
+    # Sadece selamlama kontrolü
+    if conversation_manager.is_greeting(user_query):
+        greeting_response = conversation_manager.get_greeting_response()
+        conversation_manager.add_to_conversation(
+            user_id, user_query, greeting_response
+        )
+        # Selamlama için soru kaydı yapmıyoruz (soru sayısına dahil edilmez)
+        return {
+            "response": greeting_response,
+            "sources": [],
+            "type": "greeting",
+            "confidence": 1.0,
+            "quality_level": "Otomatik Yanıt",
+        }
+
+    # Veda kontrolü
+    if conversation_manager.is_goodbye(user_query):
+        goodbye_response = conversation_manager.get_goodbye_response()
+        conversation_manager.add_to_conversation(
+            user_id, user_query, goodbye_response
+        )
+        # Veda için soru kaydı yapmıyoruz (soru sayısına dahil edilmez)
+        return {
+            "response": goodbye_response,
+            "sources": [],
+            "type": "goodbye",
+            "confidence": 1.0,
+            "quality_level": "Otomatik Yanıt",
+        }
+
+    return None
+
+
+def record_answer(user_query, final_response, rag_result):
+    """Soru ve yanıtı veritabanına kaydeder"""
+    try:
+        # Şema açılışta initialize_database() ile hazırlanır, her istekte tekrar çalıştırılmaz
+        from question_db import add_question
+
+        # Kaynak bilgisini al - sadece başarılı cevaplar için
+        source_file = None
+        if rag_result.get("sources") and len(rag_result["sources"]) > 0:
+            # Confidence düşükse veya quality level "Bilgi Yok", "Düşük Güven", "Hata" ise kaynak kaydetme
+            confidence = rag_result.get("confidence", 0)
+            quality_level = rag_result.get("quality_level", "")
+
+            # Başarılı cevaplar için kaynak kaydet
+            success_conditions = (
+                confidence > 0.3
+                and quality_level not in ["Bilgi Yok", "Düşük Güven", "Hata"]
+                and not any(
+                    phrase in final_response.lower()
+                    for phrase in [
+                        "kesin bilgi bulunamadı",
+                        "spesifik bir soru sormayı deneyebilirsiniz",
+                        "sorunuzu işlerken bir hata oluştu",
+                        "bu konuda yeterli bilgi bulunamadı",
+                    ]
+                )
+            )
+
+            if success_conditions:
+                source_file = rag_result["sources"][0]
+
+        # Soruyu veritabanına kaydet
+
+        print(f"[DEBUG] add_question çağrısı: source_file={source_file}")
+        qid = add_question(
+            question=user_query,
+            answer=final_response,
+            source_file=source_file,
+            source_keyword=None,  # Gerekirse eklenebilir
+            topic=None,  # Otomatik tespit edilecek
+        )
+        print(f"[DEBUG] add_question sonrası: qid={qid}, source_file={source_file}")
+        # Kaynak dosya varsa question_sources tablosuna da ekle
+        if source_file:
+            from question_db import add_question_source
+            add_question_source(qid, source_file)
+            print(f"[DEBUG] add_question_source çağrıldı: qid={qid}, source_file={source_file}")
+
+        # Stats.json arka planda (birleştirilerek) güncellenir
+        update_stats_json()
+
+    except Exception as e:
+        print(f"Soru kaydedilirken hata: {e}")
+
+
 @app.route("/api/chat", methods=["POST"])
 def chat():
     try:
@@ -97,83 +272,22 @@ def chat():
         if not user_query:
             return jsonify({"error": "Boş mesaj gönderildi"}), 400
 
-        # Güncellenmiş RAG sistemi kullan
-        from rag_chatbot import AdvancedRAGChatbot
-
         # RAG chatbot'u başlat
-        if not hasattr(chat, "_chatbot"):
-            chat._chatbot = AdvancedRAGChatbot()
+        chatbot = get_chatbot()
 
         # Enhanced chat manager'dan sadece selamlama/veda kontrolü al
         from enhanced_chat_manager import conversation_manager
 
         # 1. Karma mesaj kontrolü (selamlama + soru)
-        has_greeting = any(
-            re.search(pattern, user_query.lower())
-            for pattern in conversation_manager.greeting_patterns
-        )
-        has_question = any(
-            indicator in user_query.lower()
-            for indicator in [
-                "nasıl",
-                "ne",
-                "nerede",
-                "neden",
-                "kim",
-                "hangi",
-                "kaç",
-                "ne zaman",
-                "nasıl",
-                "nedir",
-                "kural",
-                "prosedür",
-                "işlem",
-                "gerekli",
-                "şart",
-                "başvuru",
-                "belge",
-                "form",
-                "süreç",
-                "?",
-            ]
-        )
-
-        # 2. Sadece selamlama kontrolü
-        if conversation_manager.is_greeting(user_query):
-            greeting_response = conversation_manager.get_greeting_response()
-            conversation_manager.add_to_conversation(
-                user_id, user_query, greeting_response
-            )
-            # Selamlama için soru kaydı yapmıyoruz (soru sayısına dahil edilmez)
-            return jsonify(
-                {
-                    "response": greeting_response,
-                    "sources": [],
-                    "type": "greeting",
-                    "confidence": 1.0,
-                    "quality_level": "Otomatik Yanıt",
-                }
-            )
+        has_greeting, has_question = detect_greeting_and_question(user_query)
 
-        # 3. Veda kontrolü
-        if conversation_manager.is_goodbye(user_query):
-            goodbye_response = conversation_manager.get_goodbye_response()
-            conversation_manager.add_to_conversation(
-                user_id, user_query, goodbye_response
-            )
-            # Veda için soru kaydı yapmıyoruz (soru sayısına dahil edilmez)
-            return jsonify(
-                {
-                    "response": goodbye_response,
-                    "sources": [],
-                    "type": "goodbye",
-                    "confidence": 1.0,
-                    "quality_level": "Otomatik Yanıt",
-                }
-            )
+        # 2-3. Selamlama / veda kontrolü
+        small_talk = get_small_talk_response(user_id, user_query)
+        if small_talk:
+            return jsonify(small_talk)
 
         # 4. Güncellenmiş RAG sistemi ile yanıt al
-        rag_result = chat._chatbot.process_query(user_query)
+        rag_result = chatbot.process_query(user_query, user_id=user_id)
 
         # Karma mesaj için "Merhaba!" ile başla
         final_response = rag_result["response"]
@@ -181,58 +295,7 @@ def chat():
             final_response = "Merhaba! " + rag_result["response"]
 
         # Soru ve yanıtı veritabanına kaydet
-        try:
-            from question_db import add_question, init_db
-
-            init_db()  # Veritabanını başlat
-
-            # Kaynak bilgisini al - sadece başarılı cevaplar için
-            source_file = None
-            if rag_result.get("sources") and len(rag_result["sources"]) > 0:
-                # Confidence düşükse veya quality level "Bilgi Yok", "Düşük Güven", "Hata" ise kaynak kaydetme
-                confidence = rag_result.get("confidence", 0)
-                quality_level = rag_result.get("quality_level", "")
-
-                # Başarılı cevaplar için kaynak kaydet
-                success_conditions = (
-                    confidence > 0.3
-                    and quality_level not in ["Bilgi Yok", "Düşük Güven", "Hata"]
-                    and not any(
-                        phrase in final_response.lower()
-                        for phrase in [
-                            "kesin bilgi bulunamadı",
-                            "spesifik bir soru sormayı deneyebilirsiniz",
-                            "sorunuzu işlerken bir hata oluştu",
-                            "bu konuda yeterli bilgi bulunamadı",
-                        ]
-                    )
-                )
-
-                if success_conditions:
-                    source_file = rag_result["sources"][0]
-
-            # Soruyu veritabanına kaydet
-
-            print(f"[DEBUG] add_question çağrısı: source_file={source_file}")
-            qid = add_question(
-                question=user_query,
-                answer=final_response,
-                source_file=source_file,
-                source_keyword=None,  # Gerekirse eklenebilir
-                topic=None,  # Otomatik tespit edilecek
-            )
-            print(f"[DEBUG] add_question sonrası: qid={qid}, source_file={source_file}")
-            # Kaynak dosya varsa question_sources tablosuna da ekle
-            if source_file:
-                from question_db import add_question_source
-                add_question_source(qid, source_file)
-                print(f"[DEBUG] add_question_source çağrıldı: qid={qid}, source_file={source_file}")
-
-            # Stats.json dosyasını güncelle
-            update_stats_json()
-
-        except Exception as e:
-            print(f"Soru kaydedilirken hata: {e}")
+        record_answer(user_query, final_response, rag_result)
 
         # Conversation manager'a ekle
         conversation_manager.add_to_conversation(user_id, user_query, final_response)
@@ -260,6 +323,124 @@ def chat():
         return jsonify({"error": error_msg}), 500
 
 
+def sse_event(event, data):
+    """Server-Sent Events formatında tek olay"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.route("/api/chat/stream", methods=["POST"])
+def chat_stream():
+    """
+    /api/chat'in SSE versiyonu. Olaylar:
+      meta  - kaynaklar ve retrieval bilgisi (LLM çağrısından önce)
+      token - <think> bölümü ayıklanmış yanıt parçaları
+      done  - /api/chat ile aynı alanlara sahip son yanıt + ttft_ms
+      error - hata mesajı
+    """
+    data = request.get_json() or {}
+    user_query = data.get("message", "").strip()
+    user_id = data.get("user_id", "anonymous")
+
+    if not user_query:
+        return jsonify({"error": "Boş mesaj gönderildi"}), 400
+
+    request_started = time.perf_counter()
+
+    def generate():
+        from enhanced_chat_manager import conversation_manager
+
+        try:
+            has_greeting, has_question = detect_greeting_and_question(user_query)
+
+            small_talk = get_small_talk_response(user_id, user_query)
+            if small_talk:
+                yield sse_event("meta", {"sources": [], "type": small_talk["type"]})
+                yield sse_event("token", {"content": small_talk["response"]})
+                yield sse_event("done", small_talk)
+                return
+
+            mixed = has_greeting and has_question
+            ttft_ms = None
+            rag_result = None
+
+            for event in get_chatbot().process_query_stream(user_query, user_id=user_id):
+                if event["type"] == "meta":
+                    yield sse_event(
+                        "meta",
+                        {
+                            "sources": event.get("sources", []),
+                            "retrieval_info": event.get("retrieval_info", {}),
+                            "query_analysis": event.get("query_analysis", {}),
+                            "type": "mixed_response" if mixed else "rag_response",
+                        },
+                    )
+                    if mixed:
+                        yield sse_event("token", {"content": "Merhaba! "})
+                elif event["type"] == "token":
+                    if ttft_ms is None:
+                        ttft_ms = (time.perf_counter() - request_started) * 1000
+                    yield sse_event("token", {"content": event["content"]})
+                elif event["type"] == "done":
+                    rag_result = event["result"]
+
+            if rag_result is None:
+                yield sse_event("error", {"error": "Yanıt üretilemedi"})
+                return
+
+            final_response = rag_result["response"]
+            if mixed:
+                final_response = "Merhaba! " + rag_result["response"]
+
+            record_answer(user_query, final_response, rag_result)
+            conversation_manager.add_to_conversation(user_id, user_query, final_response)
+
+            with stream_metrics_lock:
+                stream_metrics["total_streams"] += 1
+                if ttft_ms is not None:
+                    stream_metrics["ttft_count"] += 1
+                    stream_metrics["ttft_total_ms"] += ttft_ms
+                    stream_metrics["ttft_last_ms"] = round(ttft_ms, 1)
+                    stream_metrics["ttft_max_ms"] = max(stream_metrics["ttft_max_ms"], ttft_ms)
+            if ttft_ms is not None:
+                print(f"⏱️ Stream TTFT: {ttft_ms:.0f} ms")
+
+            yield sse_event(
+                "done",
+                {
+                    "response": final_response,
+                    "sources": rag_result.get("sources", []),
+                    "type": "mixed_response" if mixed else "rag_response",
+                    "confidence": rag_result.get("confidence", 0.5),
+                    "quality_level": rag_result.get("quality_level", "Normal"),
+                    "retrieval_info": rag_result.get("retrieval_info", {}),
+                    "ttft_ms": round(ttft_ms, 1) if ttft_ms is not None else None,
+                },
+            )
+
+        except Exception as e:
+            error_msg = f"Chat hatası: {str(e)}"
+            print(error_msg)
+            yield sse_event("error", {"error": error_msg})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def get_stream_metrics():
+    """Stream TTFT özet metrikleri"""
+    with stream_metrics_lock:
+        count = stream_metrics["ttft_count"]
+        return {
+            "total_streams": stream_metrics["total_streams"],
+            "ttft_avg_ms": round(stream_metrics["ttft_total_ms"] / count, 1) if count else None,
+            "ttft_last_ms": stream_metrics["ttft_last_ms"],
+            "ttft_max_ms": round(stream_metrics["ttft_max_ms"], 1),
+        }
+
+
 @app.route("/api/health", methods=["GET"])
 def health():
     return jsonify({"status": "OK", "message": "RAG Chatbot API çalışıyor"})
@@ -286,23 +467,21 @@ def get_conversation_history():
 
 @app.route("/api/conversation/clear", methods=["POST"])
 def clear_conversation():
-    """Kullanıcının sohbet geçmişini temizle ve chatbot'u sıfırla"""
+    """Kullanıcının sohbet geçmişini temizle (paylaşılan chatbot ve modeller korunur)"""
     try:
         data = request.get_json()
         user_id = data.get("user_id", "anonymous")
         from enhanced_chat_manager import conversation_manager
 
         # Enhanced chat manager'daki conversation'ı temizle
-        if user_id in conversation_manager.conversations:
-            del conversation_manager.conversations[user_id]
+        conversation_manager.conversations.pop(user_id, None)
 
-        # Chatbot instance'ını da sıfırla (yeni sohbet için temiz başlangıç)
-        if hasattr(chat, "_chatbot"):
-            delattr(chat, "_chatbot")
+        # RAG bağlamı için tutulan geçmişi temizle
+        conversation_store.clear(user_id)
 
         return jsonify(
             {
-                "message": "Sohbet geçmişi temizlendi ve chatbot sıfırlandı",
+                "message": "Sohbet geçmişi temizlendi",
                 "user_id": user_id,
             }
         )
@@ -443,11 +622,8 @@ def admin_list_documents():
 def check_document_status(filename):
     """Dokümanın ChromaDB'de işlenip işlenmediğini kontrol eder"""
     try:
-        # ChromaDB'de dosya adına göre ara
-        collection_info = chroma_manager.get_collection_info()
-        unique_sources = collection_info.get("unique_sources", [])
-
-        if filename in unique_sources:
+        # Chunk kataloğunda birincil anahtar okuması
+        if chroma_manager.chunk_catalog.has_source(filename):
             return "processed"
         else:
             return "pending"
@@ -496,98 +672,34 @@ def admin_process_documents():
         # Her dosya için işleme
         for file_path in files_to_process:
             try:
-                # Doküman tipine göre metin çıkartma
-                file_ext = Path(file_path).suffix.lower()
-
-                if file_ext == ".pdf":
-                    text, metadata = processor.extract_text_from_pdf(file_path)
-                elif file_ext in [".docx", ".doc"]:
-                    text, metadata = processor.extract_text_from_docx(file_path)
-                else:
-                    text, metadata = processor.extract_text_universal(file_path)
-
-                if not text.strip():
+                # Metin çıkarma + temizleme
+                cleaned_text, metadata = processor.extract_document(file_path)
+                if not cleaned_text.strip():
                     failed_files.append(f"{metadata.filename}: Metin çıkarılamadı")
                     continue
 
-                # Metni temizle ve chunk'lara böl
-                cleaned_text = processor.advanced_clean_text(text)
-                processed_chunks = processor.adaptive_chunk_creation(
-                    cleaned_text, metadata
-                )
-
+                # Kuyruktaki işlerle aynı chunklama: CHUNKING_MODE="tokens" ise
+                # modelin token sınırına sığan child'lar embedlenir, parent'lar context olur
+                processed_chunks, parent_chunks = processor.chunk_document(cleaned_text, metadata)
                 if not processed_chunks:
                     failed_files.append(f"{metadata.filename}: Chunk oluşturulamadı")
                     continue
 
-                # Chunk'lar için embedding oluştur
-                chunk_texts = [chunk.content for chunk in processed_chunks]
-                embeddings = embedder.embed_batch(chunk_texts)
-
-                # ChromaDB'ye eklemek için veri formatı
-                documents_batch = [
-                    {
-                        "filename": metadata.filename,
-                        "file_type": metadata.file_type,
-                        "file_size": metadata.file_size,
-                        "content": cleaned_text,
-                        "chunks": chunk_texts,
-                        "embeddings": [emb.tolist() for emb in embeddings],
-                        "chunk_metadata": [
-                            chunk.metadata or {} for chunk in processed_chunks
-                        ],
-                        "chunk_count": len(chunk_texts),
-                        "character_count": len(cleaned_text),
-                        "document_metadata": {
-                            "creation_date": metadata.creation_date,
-                            "modification_date": metadata.modification_date,
-                            "author": metadata.author,
-                            "title": metadata.title,
-                            "page_count": metadata.page_count,
-                            "checksum": metadata.checksum,
-                        },
-                    }
-                ]
+                record = processor.build_document_record(
+                    cleaned_text, metadata, processed_chunks, file_path, None, parent_chunks
+                )
+                # (n, dim) float32 matris Chroma'ya aynen gider
+                embed_record = dict(record)
+                embed_record["embeddings"] = embedder.embed_batch_array(record["chunks"])
 
                 # ChromaDB'ye ekle
-                result = chroma_manager.add_documents_batch(documents_batch)
+                result = chroma_manager.add_documents_batch([embed_record])
 
-                if result.get("total_added", 0) > 0:
+                # Değişmemiş dosyanın yeniden işlenmesi hiçbir şey yazmaz (total_added == 0)
+                if result.get("total_processed", 0) > 0 and not result.get("errors"):
                     processed_files.append(metadata.filename)
-                    
-                    # Enhanced JSON dosyalarına ekle (pipeline mantığı)
-                    try:
-                        # enhanced_document_data.json'a ekle
-                        enhanced_data_path = "enhanced_document_data.json"
-                        if os.path.exists(enhanced_data_path):
-                            with open(enhanced_data_path, "r", encoding="utf-8") as f:
-                                enhanced_data = json.load(f)
-                        else:
-                            enhanced_data = []
-                        
-                        enhanced_data.extend(documents_batch)
-                        
-                        with open(enhanced_data_path, "w", encoding="utf-8") as f:
-                            json.dump(enhanced_data, f, ensure_ascii=False, indent=2)
-                        
-                        # enhanced_document_data_with_embeddings.json'a ekle
-                        enhanced_embeddings_path = "enhanced_document_data_with_embeddings.json"
-                        if os.path.exists(enhanced_embeddings_path):
-                            with open(enhanced_embeddings_path, "r", encoding="utf-8") as f:
-                                enhanced_embeddings_data = json.load(f)
-                        else:
-                            enhanced_embeddings_data = []
-                        
-                        enhanced_embeddings_data.extend(documents_batch)
-                        
-                        with open(enhanced_embeddings_path, "w", encoding="utf-8") as f:
-                            json.dump(enhanced_embeddings_data, f, ensure_ascii=False, indent=2)
-                            
-                        print(f"[PIPELINE] {metadata.filename} enhanced JSON dosyalarına eklendi")
-                        
-                    except Exception as e:
-                        print(f"[PIPELINE] Enhanced JSON ekleme hatası {metadata.filename}: {str(e)}")
-                        
+                    # Enhanced JSON dosyalarında dosyanın kaydı yenisiyle değiştirilir
+                    update_enhanced_catalogs(record, embed_record)
                 else:
                     failed_files.append(f"{metadata.filename}: ChromaDB ekleme hatası")
 
@@ -625,7 +737,27 @@ def admin_delete_document(filename):
                     print(f"{folder} klasöründen silinemedi: {e}")
 
         # Tüm ilgili JSON dosyalarından kaldır
+        def remove_from_jsonl_file(jsonl_path):
+            # Akış dosyası: kayıtları süzerek geçici dosyaya yaz, sonra yer değiştir
+            if os.path.exists(jsonl_path):
+                try:
+                    tmp_path = f"{jsonl_path}.tmp"
+                    kept = write_records(
+                        tmp_path,
+                        (
+                            item
+                            for item in iter_records(jsonl_path, decode=False)
+                            if item.get("filename") != filename
+                        ),
+                    )
+                    os.replace(tmp_path, jsonl_path)
+                    print(f"{jsonl_path} dosyasında {kept} kayıt kaldı")
+                except Exception as e:
+                    print(f"{jsonl_path} dosyasından silme hatası: {e}")
+
         def remove_from_json_file(json_path):
+            if json_path.endswith(".jsonl"):
+                return remove_from_jsonl_file(json_path)
             if os.path.exists(json_path):
                 try:
                     with open(json_path, "r", encoding="utf-8") as f:
@@ -648,8 +780,10 @@ def admin_delete_document(filename):
         for json_file in [
             "enhanced_document_data.json",
             "enhanced_document_data_with_embeddings.json",
-            "uploads_base.json",
-            "uploads_with_embed.json",
+            "uploads_base.jsonl",
+            "uploads_with_embed.jsonl",
+            "data.jsonl",
+            "embedded_data.jsonl",
             os.path.join(EMBEDDINGS_FOLDER, "embeddings_data.json")
         ]:
             remove_from_json_file(json_file)
@@ -666,6 +800,7 @@ def admin_delete_document(filename):
             delete_questions_by_source_file(filename)
         except Exception as e:
             print(f"question_db'den silme hatası: {e}")
+        stats_reconciler.request_reconcile()
 
         if deleted_any:
             return jsonify({"deleted": filename, "message": "Dosya ve tüm ilişkili veriler başarıyla silindi"})
@@ -833,12 +968,11 @@ def admin_bulk_delete():
             errors.append(f"Anahtar kelime backup hatası: {str(e)}")
 
 
-        # 1. Sadece seçili dosyaların ChromaDB'den chunk'larını sil
-        for filename in filenames:
-            try:
-                remove_from_chromadb(filename)
-            except Exception as e:
-                errors.append(f"ChromaDB silme hatası ({filename}): {str(e)}")
+        # 1. Sadece seçili dosyaların ChromaDB'den chunk'larını sil (tek silme turu)
+        try:
+            remove_sources_from_chromadb(filenames)
+        except Exception as e:
+            errors.append(f"ChromaDB silme hatası: {str(e)}")
 
         # 2. Enhanced json dosyalarından sadece seçili dosyaları kaldır
         for enhanced_file in [
@@ -899,13 +1033,24 @@ def remove_from_chromadb(filename):
     """ChromaDB'den belirli dosyaya ait chunk'ları siler"""
     try:
         from chroma_utils import remove_from_chromadb as real_remove_from_chromadb
-        real_remove_from_chromadb(filename)
+        real_remove_from_chromadb(filename, chroma_manager)
         print(f"[DELETE] ChromaDB'den {filename} kaldırıldı")
     except Exception as e:
         print(f"[DELETE] ChromaDB silme hatası {filename}: {str(e)}")
         raise
 
 
+def remove_sources_from_chromadb(filenames):
+    """ChromaDB'den birden çok dosyanın chunk'larını tek seferde siler"""
+    try:
+        from chroma_utils import remove_sources_from_chromadb as real_remove_sources
+        real_remove_sources(filenames, chroma_manager)
+        print(f"[DELETE] ChromaDB'den {len(filenames)} dosya kaldırıldı")
+    except Exception as e:
+        print(f"[DELETE] ChromaDB toplu silme hatası: {str(e)}")
+        raise
+
+
 @app.route("/api/admin/documents/status", methods=["GET"])
 def admin_documents_status():
     """Doküman işleme durumu özeti"""
@@ -1034,21 +1179,18 @@ def admin_cleanup():
         if cleanup_type in ["processed", "all"]:
             # Orphaned data temizle - sadece ChromaDB'de olan ama dosyası olmayan
             try:
-                collection_info = chroma_manager.get_collection_info()
-                unique_sources = collection_info.get("unique_sources", [])
-
                 orphaned_sources = []
-                for source in unique_sources:
+                for source in chroma_manager.chunk_catalog.sources():
                     if not os.path.exists(os.path.join(UPLOAD_FOLDER, source)):
                         orphaned_sources.append(source)
 
                 # Orphaned sources için cleanup
-                for source in orphaned_sources:
+                if orphaned_sources:
                     try:
-                        remove_from_chromadb(source)
-                        cleaned.append(f"Orphaned data: {source}")
+                        remove_sources_from_chromadb(orphaned_sources)
+                        cleaned.extend(f"Orphaned data: {source}" for source in orphaned_sources)
                     except Exception as e:
-                        errors.append(f"Orphaned cleanup {source}: {str(e)}")
+                        errors.append(f"Orphaned cleanup: {str(e)}")
 
             except Exception as e:
                 errors.append(f"ChromaDB cleanup error: {str(e)}")
@@ -1205,17 +1347,21 @@ def admin_download_embeddings():
         )  # "collection", "metadata", "stats"
 
         if file_type == "collection":
-            # ChromaDB collection'ı export et
-            export_file = os.path.join(EMBEDDINGS_FOLDER, "collection_export.json")
-            result = chroma_manager.export_data(export_file, include_embeddings=False)
-
-            if result.get("error"):
-                return jsonify({"error": result["error"]}), 500
+            # ChromaDB collection'ı export et: sayfalar okundukça istemciye akıtılır
+            # (diske yazılmaz). ?embeddings=1 ile vektörler de eklenir, ?dtype=float16 yarı boyut
+            include_embeddings = request.args.get("embeddings", "0").lower() in ("1", "true", "yes")
+            try:
+                chunks = chroma_manager.iter_export(
+                    include_embeddings=include_embeddings,
+                    embedding_dtype=request.args.get("dtype", "float32"),
+                )
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
 
-            return send_file(
-                export_file,
-                as_attachment=True,
-                download_name="chromadb_collection.json",
+            return Response(
+                stream_with_context(chunks),
+                mimetype="application/json",
+                headers={"Content-Disposition": "attachment; filename=chromadb_collection.json"},
             )
 
         elif file_type == "metadata":
@@ -1381,7 +1527,10 @@ def admin_chromadb_backup():
 def admin_chromadb_optimize():
     """ChromaDB optimizasyonu yapar"""
     try:
-        result = chroma_manager.optimize_collection()
+        data = request.get_json(silent=True) or {}
+        result = chroma_manager.optimize_collection(force=bool(data.get("force", False)))
+        if result.get("error"):
+            return jsonify(result), 500
         return jsonify(result)
     except Exception as e:
         return jsonify({"error": f"Optimizasyon hatası: {str(e)}"}), 500
@@ -1392,6 +1541,7 @@ def admin_embedder_info():
     """Embedder bilgilerini döner"""
     try:
         info = embedder.get_model_info()
+        info["query_batcher"] = query_batcher.get_stats()
         return jsonify(info)
     except Exception as e:
         return jsonify({"error": f"Embedder bilgisi alınamadı: {str(e)}"}), 500
@@ -1490,6 +1640,9 @@ def admin_system_status():
                         "total_embeddings", 0
                     ),
                 },
+                "chat_stream": get_stream_metrics(),
+                "conversations": conversation_store.get_stats(),
+                "ingestion": ingestion_queue.get_stats(),
                 "system": {
                     "total_disk_usage_mb": round(chroma_size + upload_size_mb, 2),
                     "status": "healthy",
@@ -1502,22 +1655,34 @@ def admin_system_status():
 
 @app.route("/api/admin/stats", methods=["GET"])
 def admin_stats():
-    """Soru istatistikleri (frontend uyumlu)"""
+    """
+    Soru istatistikleri (frontend uyumlu).
+
+    Tüm değerler önceden hesaplanmış tablolardan okunur; eski kaynak temizliği
+    stats_reconciler'da yapılır. ETag istatistik version sayacından (ve "bugün"e
+    bağlı değerler için UTC tarihten) üretilir; If-None-Match eşleşirse başka
+    sorgu çalıştırılmadan 304 döner.
+    """
     try:
         from question_db import (
+            get_stats_version,
+            stats_today,
             get_total_questions,
             get_top_sources,
             get_top_questions_with_topics,
             get_daily_user_stats,
             get_total_entry_count,
-            clean_obsolete_sources,
-            update_missing_keywords,
+            get_daily_question_count,
         )
-        import sqlite3
-        from datetime import datetime, timedelta
 
-        # Önce eski kayıtları temizle
-        clean_obsolete_sources()
+        # "Bugün"e bağlı değerler question_db'nin UTC istatistik gününü kullanır
+        etag = f"stats-{get_stats_version()}-{stats_today().isoformat()}"
+        if request.if_none_match.contains(etag):
+            # İçerik değişmedi: tarayıcı önbellekteki gövdeyi kullanır
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = "no-cache"
+            return response
 
         # Toplam soru sayısı
         total_questions = get_total_questions()
@@ -1546,24 +1711,13 @@ def admin_stats():
         ]
 
         # Günlük soru sayısı (bugün)
-        today = datetime.now().strftime("%Y-%m-%d")
         try:
-            conn = sqlite3.connect("questions.db")
-            c = conn.cursor()
-            c.execute(
-                """
-                SELECT COUNT(*) FROM questions
-                WHERE DATE(created_at) = ?
-            """,
-                (today,),
-            )
-            daily_questions = c.fetchone()[0]
-            conn.close()
+            daily_questions = get_daily_question_count()
         except Exception as e:
             daily_questions = 0
             print(f"Günlük soru sayısı alınamadı: {e}")
 
-        return jsonify(
+        response = jsonify(
             {
                 "totalQuestions": total_questions,
                 "dailyQuestions": daily_questions,
@@ -1575,15 +1729,33 @@ def admin_stats():
                 "topQuestions": top_questions_list,
             }
         )
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+        return response
 
     except Exception as e:
         return jsonify({"error": f"Soru istatistikleri alınamadı: {str(e)}"}), 500
 
 
+@app.route("/api/admin/stats/runtime", methods=["GET"])
+def admin_stats_runtime():
+    """Cevap cache'i ve stats.json yazıcısının çalışma zamanı sayaçları (ETag'siz)"""
+    try:
+        return jsonify(
+            {
+                "answerCache": answer_cache.get_stats(),
+                "statsJson": stats_json_writer.get_stats(),
+            }
+        )
+    except Exception as e:
+        return jsonify({"error": f"Çalışma zamanı istatistikleri alınamadı: {str(e)}"}), 500
+
+
 @app.route("/api/admin/upload_and_process", methods=["POST"])
 def admin_upload_and_process():
     """
-    Dosya yükle, chunkla, embedle ve ChromaDB'ye ekle (tam otomatik pipeline)
+    Dosyayı yükle ve işleme kuyruğuna ekle (extract -> chunk -> embed -> index).
+    İşlem arka planda yürür; ilerleme /api/admin/ingestion/jobs/<job_id> ile izlenir.
     """
     try:
         file = request.files.get("file")
@@ -1591,169 +1763,54 @@ def admin_upload_and_process():
         if not file:
             return jsonify({"error": "Dosya bulunamadı"}), 400
 
-        # 1. Dosyayı uploads klasörüne kaydet
         filename = secure_filename(file.filename)
+
+        # Dosyayı uploads klasörüne kaydet, işi kuyruğa ekle
         save_path = os.path.join(UPLOAD_FOLDER, filename)
         file.save(save_path)
+        job = ingestion_queue.submit(filename, save_path, keyword)
 
-        # 2. uploads klasörünü chunkla ve uploads_base.json'u güncelle
-        processor = AdvancedDocumentProcessor()
-        data = processor.process_documents(save_path, keyword=keyword)
-        if not data:
-            return jsonify({"error": "Chunklama başarısız"}), 500
-
-        # uploads_base.json'u güncelle (duplicate dosya engelle)
-        uploads_base_path = "uploads_base.json"
-        if os.path.exists(uploads_base_path):
-            with open(uploads_base_path, "r", encoding="utf-8") as f:
-                all_data = json.load(f)
-        else:
-            all_data = []
-        # Duplicate filename'leri çıkar
-        new_filenames = {item.get("filename") for item in data}
-        all_data = [
-            item for item in all_data if item.get("filename") not in new_filenames
-        ]
-        all_data.extend(data)
-        with open(uploads_base_path, "w", encoding="utf-8") as f:
-            json.dump(all_data, f, ensure_ascii=False, indent=2)
-
-        # 3. Embedding işlemini tetikle ve uploads_with_embed.json'u güncelle
-        from embedder import process_documents_with_embeddings
-
-        # Config'den model adını al ve doğru kullan
-        embedding_model = config.EMBEDDING_MODEL if hasattr(config, 'EMBEDDING_MODEL') else "paraphrase-multilingual-MiniLM-L12-v2"
-        
-        stats = process_documents_with_embeddings(
-            input_file="uploads_base.json",
-            output_file="uploads_with_embed.json",
-            model_config={
-                "model": embedding_model,  # "primary_model" yerine "model" kullan
-                "use_ensemble": False,
-                "use_cache": True,
-                "batch_size": 50,
-            },
-        )
-        # Embedding sonrası uploads_with_embed.json'da dosya var mı kontrol et, yoksa hata dön
-        with open("uploads_with_embed.json", "r", encoding="utf-8") as f:
-            embed_data = json.load(f)
-        if not any(item.get("filename") == filename for item in embed_data):
-            return (
-                jsonify(
-                    {
-                        "error": "Embedding sonrası dosya uploads_with_embed.json'a eklenemedi."
-                    }
-                ),
-                500,
-            )
-
-        # 4. ChromaDB'ye ekle
-        chroma_manager = ChromaDBManager()
-        chroma_manager.add_documents_batch(
-            embed_data, batch_size=1000, skip_duplicates=True
+        return (
+            jsonify(
+                {
+                    "success": True,
+                    "job_id": job["id"],
+                    "filename": filename,
+                    "status": job["status"],
+                    "status_url": f"/api/admin/ingestion/jobs/{job['id']}",
+                }
+            ),
+            202,
         )
 
-        # 5. Dosyayı işlenmiş ana klasöre (docs/) taşı
-        docs_folder = os.path.join(os.getcwd(), "docs")
-        os.makedirs(docs_folder, exist_ok=True)
-        try:
-            import shutil
-
-            shutil.move(save_path, os.path.join(docs_folder, filename))
-        except Exception as e:
-            app.logger.warning(f"Dosya docs klasörüne taşınamadı: {e}")
-
-        # 6. uploads_base.json içeriğini enhanced_document_data.json'a EKLE (mevcut veriyi koruyarak ve keyword'ü koruyarak)
-        enhanced_base_path = "enhanced_document_data.json"
-        try:
-            if os.path.exists("uploads_base.json"):
-                with open("uploads_base.json", "r", encoding="utf-8") as f:
-                    uploads_base_data = json.load(f)
-            else:
-                uploads_base_data = []
-            if os.path.exists(enhanced_base_path):
-                with open(enhanced_base_path, "r", encoding="utf-8") as f:
-                    enhanced_base_data = json.load(f)
-            else:
-                enhanced_base_data = []
-            # uploads_base.json içeriğini mevcut enhanced veriye ekle (duplicate filename engelle)
-            existing_filenames = {item.get("filename") for item in enhanced_base_data}
-            new_items = []
-            for item in uploads_base_data:
-                if item.get("filename") not in existing_filenames:
-                    # Eğer anahtar kelime frontend'den geldiyse ve item'da yoksa ekle
-                    if not item.get("keyword") and keyword:
-                        item["keyword"] = keyword
-                    new_items.append(item)
-            enhanced_base_data.extend(new_items)
-            with open(enhanced_base_path, "w", encoding="utf-8") as f:
-                json.dump(enhanced_base_data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            app.logger.error(f"enhanced_document_data.json güncellenemedi: {e}")
-
-        # 7. uploads_with_embed.json içeriğini enhanced_document_data_with_embeddings.json'a EKLE (mevcut veriyi koruyarak ve keyword'ü koruyarak)
-        enhanced_embed_path = "enhanced_document_data_with_embeddings.json"
-        try:
-            if os.path.exists("uploads_with_embed.json"):
-                with open("uploads_with_embed.json", "r", encoding="utf-8") as f:
-                    uploads_embed_data = json.load(f)
-            else:
-                uploads_embed_data = []
-            if os.path.exists(enhanced_embed_path):
-                with open(enhanced_embed_path, "r", encoding="utf-8") as f:
-                    enhanced_embed_data = json.load(f)
-            else:
-                enhanced_embed_data = []
-            existing_filenames = {item.get("filename") for item in enhanced_embed_data}
-            new_items = []
-            for item in uploads_embed_data:
-                if item.get("filename") not in existing_filenames:
-                    if not item.get("keyword") and keyword:
-                        item["keyword"] = keyword
-                    new_items.append(item)
-            enhanced_embed_data.extend(new_items)
-            with open(enhanced_embed_path, "w", encoding="utf-8") as f:
-                json.dump(enhanced_embed_data, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            app.logger.error(
-                f"enhanced_document_data_with_embeddings.json güncellenemedi: {e}"
-            )
-
-        # 8. uploads_base.json ve uploads_with_embed.json dosyalarını sil
-        try:
-            if os.path.exists("uploads_base.json"):
-                os.remove("uploads_base.json")
-            if os.path.exists("uploads_with_embed.json"):
-                os.remove("uploads_with_embed.json")
-        except Exception as e:
-            app.logger.error(
-                f"uploads_base.json veya uploads_with_embed.json silinemedi: {e}"
-            )
-
-        # 9. uploads klasöründeki dosyaları docs klasörüne taşı
-        docs_folder = os.path.join(os.getcwd(), "docs")
-        os.makedirs(docs_folder, exist_ok=True)
-        try:
-            for f in os.listdir(UPLOAD_FOLDER):
-                src_path = os.path.join(UPLOAD_FOLDER, f)
-                dst_path = os.path.join(docs_folder, f)
-                if os.path.isfile(src_path):
-                    try:
-                        import shutil
-
-                        shutil.move(src_path, dst_path)
-                    except Exception as e:
-                        app.logger.warning(f"{f} docs klasörüne taşınamadı: {e}")
-        except Exception as e:
-            app.logger.error(f"uploads klasöründen docs klasörüne taşıma hatası: {e}")
-
-        return jsonify({"success": True, "filename": filename, "stats": stats})
-
     except Exception as e:
         app.logger.error(f"Pipeline hata: {e}")
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/admin/ingestion/jobs/<job_id>", methods=["GET"])
+def admin_ingestion_job_status(job_id):
+    """Tek ingestion işinin aşama bazlı ilerlemesi"""
+    job = ingestion_queue.get_job(job_id)
+    if not job:
+        return jsonify({"error": "İş bulunamadı"}), 404
+    return jsonify({"success": True, "job": job})
+
+
+@app.route("/api/admin/ingestion/jobs", methods=["GET"])
+def admin_ingestion_jobs():
+    """Son ingestion işleri ve kuyruk durumu"""
+    status = request.args.get("status")
+    limit = request.args.get("limit", 50, type=int)
+    return jsonify(
+        {
+            "success": True,
+            "jobs": ingestion_queue.list_jobs(status=status, limit=limit),
+            "queue": ingestion_queue.get_stats(),
+        }
+    )
+
+
 @app.route("/api/admin/clear_questions", methods=["POST"])
 def clear_questions():
     """Tüm soru veritabanını temizler"""
@@ -1811,40 +1868,8 @@ def track_user_session():
 
 
 def update_stats_json():
-    """Stats.json dosyasını güncel verilerle güncelle - sadece mevcut dosyaları dahil et"""
-    try:
-        from question_db import (
-            get_total_questions,
-            get_top_sources,
-            get_top_questions_by_similarity,
-        )
-
-        # Mevcut istatistikleri al (sadece mevcut dosyalardan)
-        total_questions = get_total_questions()
-        top_sources = get_top_sources(5)  # Artık (source, keyword, count, unikys_name) tuple'ı dönüyor
-        top_questions = get_top_questions_by_similarity(5)
-
-        # Stats verisini hazırla
-        stats_data = {
-            "totalQuestions": total_questions,
-            "uniqueQuestions": total_questions,  # Şimdilik total ile aynı
-            "topSources": [
-                {"source": source, "keyword": keyword, "count": count, "unikys_name": unikys_name}
-                for source, keyword, count, unikys_name in top_sources
-            ],
-            "topQuestions": [
-                {"question": question, "count": count}
-                for question, answer, count in top_questions
-            ],
-            "lastUpdated": dt.now().isoformat(),
-        }
-
-        # stats.json dosyasını güncelle
-        with open("stats.json", "w", encoding="utf-8") as f:
-            json.dump(stats_data, f, ensure_ascii=False, indent=2)
-
-    except Exception as e:
-        print(f"Stats.json güncellenirken hata: {e}")
+    """Stats.json yeniden üretimini tetikle - yazım stats_json_writer thread'inde yapılır"""
+    stats_json_writer.trigger()
 
 
 @app.route("/api/admin/daily-questions", methods=["GET"])
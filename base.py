@@ -1,8 +1,13 @@
 import os
+import sys
 import json
 import re
 import hashlib
-from typing import List, Dict, Any, Optional, Tuple
+import time
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator
 from dataclasses import dataclass
 from pathlib import Path
 import logging
@@ -13,6 +18,7 @@ from docx import Document
 
 # textract not available - using alternative approach
 from config import config
+from jsonl_io import write_records
 
 logger = logging.getLogger(__name__)
 
@@ -45,6 +51,44 @@ class ProcessedChunk:
     metadata: Optional[Dict[str, Any]] = None
 
 
+class TokenLengthCounter:
+    """Kelimelerin embedding modeli tokenizer'ına göre token sayıları (kelime başına cache'li)"""
+
+    def __init__(self, model_name: str = config.EMBEDDING_MODEL):
+        from embedder import get_tokenizer, get_model_max_tokens
+
+        self.model_name = model_name
+        self.tokenizer = get_tokenizer(model_name)
+        special_tokens = 2  # [CLS]/<s> ve [SEP]/</s>
+        if self.tokenizer is not None and hasattr(self.tokenizer, "num_special_tokens_to_add"):
+            try:
+                special_tokens = self.tokenizer.num_special_tokens_to_add()
+            except Exception:
+                pass
+        self.max_content_tokens = max(8, get_model_max_tokens(model_name) - special_tokens)
+        self._cache: Dict[str, int] = {}
+
+    @staticmethod
+    def _estimate(word: str) -> int:
+        """Tokenizer yoksa yaklaşık değer (alt-kelime başına ~4 karakter)"""
+        return max(1, (len(word) + 3) // 4)
+
+    def count_words(self, words: List[str]) -> List[int]:
+        unknown = [word for word in dict.fromkeys(words) if word not in self._cache]
+        if unknown:
+            counts = None
+            if self.tokenizer is not None:
+                try:
+                    encoded = self.tokenizer(unknown, add_special_tokens=False)["input_ids"]
+                    counts = [max(1, len(ids)) for ids in encoded]
+                except Exception as e:
+                    logger.debug(f"Tokenizer ile sayım başarısız, tahmin kullanılıyor: {e}")
+            if counts is None:
+                counts = [self._estimate(word) for word in unknown]
+            self._cache.update(zip(unknown, counts))
+        return [self._cache[word] for word in words]
+
+
 class AdvancedDocumentProcessor:
     """Gelişmiş doküman işleme sınıfı"""
 
@@ -68,50 +112,17 @@ class AdvancedDocumentProcessor:
             "total_chunks": 0,
             "total_characters": 0,
         }
+        # Son process_documents çağrısındaki dosya bazlı süreler
+        self.file_timings: List[Dict[str, Any]] = []
+        # Tokenizer-aware chunking için (ilk kullanımda yüklenir)
+        self._token_counter: Optional["TokenLengthCounter"] = None
 
     def extract_text_from_pdf(self, file_path: str) -> Tuple[str, DocumentMetadata]:
         """Gelişmiş PDF metin çıkarma"""
         try:
             doc = fitz.open(file_path)
-            text_parts = []
             metadata = self._extract_pdf_metadata(doc, file_path)
-
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                # Metin çıkarma
-                text = page.get_text()  # type: ignore
-
-                # Tablo tespiti ve çıkarma
-                tables = page.find_tables() if hasattr(page, "find_tables") else None  # type: ignore
-                if tables:
-                    for table in tables:
-                        try:
-                            table_data = (
-                                table.extract() if hasattr(table, "extract") else None
-                            )
-                            table_text = (
-                                self._format_table_text(table_data)
-                                if table_data
-                                else ""
-                            )
-                            text += f"\n[TABLO {page_num}]\n{table_text}\n[/TABLO]\n"
-                        except Exception as e:
-                            logger.warning(
-                                f"Tablo çıkarma hatası sayfa {page_num}: {e}"
-                            )
-
-                # Görsel-metin ilişkisi (OCR için placeholder)
-                images = page.get_images() if hasattr(page, "get_images") else None  # type: ignore
-                if images:
-                    text += f"\n[GÖRSEL SAYISI: {len(images)}]\n"
-
-                if text.strip():
-                    text_parts.append(
-                        f"[SAYFA {page_num}]\n{text}\n[/SAYFA {page_num}]"
-                    )
-                else:
-                    logger.debug(f"Sayfa {page_num} boş")
-
+            text_parts = self._extract_pdf_pages(doc, 0, len(doc))
             doc.close()
             full_text = "\n".join(text_parts)
             metadata.page_count = len(text_parts)
@@ -126,6 +137,46 @@ class AdvancedDocumentProcessor:
             logger.error(f"PDF okuma hatası {file_path}: {e}")
             return "", self._create_error_metadata(file_path, str(e))
 
+    def _extract_pdf_pages(self, doc, start: int, end: int) -> List[str]:
+        """[start, end) aralığındaki sayfaların metin + tablo çıktısı"""
+        text_parts = []
+        for page_num in range(start, end):
+            page = doc[page_num]
+            # Metin çıkarma
+            text = page.get_text()  # type: ignore
+
+            # Tablo tespiti ve çıkarma
+            tables = page.find_tables() if hasattr(page, "find_tables") else None  # type: ignore
+            if tables:
+                for table in tables:
+                    try:
+                        table_data = (
+                            table.extract() if hasattr(table, "extract") else None
+                        )
+                        table_text = (
+                            self._format_table_text(table_data)
+                            if table_data
+                            else ""
+                        )
+                        text += f"\n[TABLO {page_num}]\n{table_text}\n[/TABLO]\n"
+                    except Exception as e:
+                        logger.warning(
+                            f"Tablo çıkarma hatası sayfa {page_num}: {e}"
+                        )
+
+            # Görsel-metin ilişkisi (OCR için placeholder)
+            images = page.get_images() if hasattr(page, "get_images") else None  # type: ignore
+            if images:
+                text += f"\n[GÖRSEL SAYISI: {len(images)}]\n"
+
+            if text.strip():
+                text_parts.append(
+                    f"[SAYFA {page_num}]\n{text}\n[/SAYFA {page_num}]"
+                )
+            else:
+                logger.debug(f"Sayfa {page_num} boş")
+        return text_parts
+
     def extract_text_from_docx(self, file_path: str) -> Tuple[str, DocumentMetadata]:
         """Gelişmiş DOCX metin çıkarma"""
         try:
@@ -328,100 +379,221 @@ class AdvancedDocumentProcessor:
         """Her zaman semantic chunking uygula (sayfa/paragraf chunking yok)"""
         if not text:
             return []
-        # Chunk size ve overlap sabitleniyor (isteğe göre değiştirilebilir)
-        self.chunk_size = 800
-        self.overlap = 100
+        # Chunk size ve overlap config'ten (ingestion manifest'in chunking parmak izine dahil)
+        self.chunk_size = config.PARENT_CHUNK_SIZE
+        self.overlap = config.PARENT_CHUNK_OVERLAP
         chunks = self._semantic_chunking(text)
         chunks = self._validate_chunks(chunks)
         return chunks
 
-    def _semantic_chunking(self, text: str) -> List[ProcessedChunk]:
-        """Başlık, madde, alt başlık ve boşluklara göre LLM için optimize semantic chunking"""
-        import re
-        chunks = []
-        chunk_size_words = 1200  # Yaklaşık 4000-4500 karakter, LLM için ideal
-        overlap_words = 20       # Yaklaşık 80-100 token, cevap kalitesini korur
+    # Başlık/madde/numaralı madde/boşluk tespiti için regex (bölüm sınırları)
+    SECTION_PATTERN = re.compile(
+        r"(^[A-ZÇĞİÖŞÜ\d][^\n]{0,80}\n)|(^\d+\.|^[a-z]\)|^MADDE \d+|^[-*#]{2,}|^\s*$)",
+        re.MULTILINE,
+    )
+    WORD_PATTERN = re.compile(r"\S+")
+    PAGE_MARKER_PATTERN = re.compile(r"\[SAYFA (\d+)\]")
+
+    def _word_table(self, text: str) -> Tuple[List[str], List[int], List[int]]:
+        """Metni tek geçişte kelimelere ayır: (kelimeler, başlangıç ofsetleri, bitiş ofsetleri)"""
+        words: List[str] = []
+        word_starts: List[int] = []
+        word_ends: List[int] = []
+        for match in self.WORD_PATTERN.finditer(text):
+            words.append(match.group())
+            word_starts.append(match.start())
+            word_ends.append(match.end())
+        return words, word_starts, word_ends
+
+    def _page_table(self, text: str) -> Tuple[List[int], List[int]]:
+        """[SAYFA n] etiketlerinin ofsetleri ve sayfa numaraları"""
+        page_offsets: List[int] = []
+        page_numbers: List[int] = []
+        for match in self.PAGE_MARKER_PATTERN.finditer(text):
+            page_offsets.append(match.start())
+            page_numbers.append(int(match.group(1)))
+        return page_offsets, page_numbers
+
+    @staticmethod
+    def _page_at(page_table: Tuple[List[int], List[int]], offset: int) -> Optional[int]:
+        """Ofsetin düştüğü sayfa (ilk etiketten önceyse ilk sayfa)"""
+        page_offsets, page_numbers = page_table
+        if not page_numbers:
+            return None
+        index = bisect_right(page_offsets, offset) - 1
+        return page_numbers[max(index, 0)]
+
+    def _semantic_chunking(
+        self,
+        text: str,
+        chunk_size_words: int = 1200,  # Yaklaşık 4000-4500 karakter, LLM için ideal
+        overlap_words: int = 20,  # Yaklaşık 80-100 token, cevap kalitesini korur
+    ) -> List[ProcessedChunk]:
+        """
+        Başlık, madde, alt başlık ve boşluklara göre LLM için optimize semantic chunking.
+
+        Metin bir kez kelimelere ayrılır ve her kelimenin karakter ofseti
+        tutulur; bölümler, büyük bölüm parçaları ve overlap'ler kelime
+        indeksleriyle hesaplanır. Her chunk metinde ardışık bir kelime
+        aralığıdır, start_pos/end_pos bu aralığın gerçek ofsetleridir. Toplam
+        maliyet metin uzunluğunda doğrusaldır.
+        """
+        words, word_starts, word_ends = self._word_table(text)
+        n_words = len(words)
+        if n_words == 0:
+            return []
+        page_table = self._page_table(text)
+
+        chunks: List[ProcessedChunk] = []
+        prev_end = None  # Önceki chunk'ın bittiği kelime indeksi (hariç)
+
+        def emit(own_start: int, own_end: int):
+            """[own_start, own_end) kelimelerini önceki chunk'tan overlap ile chunk yap"""
+            nonlocal prev_end
+            start = own_start
+            if prev_end is not None and overlap_words > 0:
+                start = max(0, prev_end - overlap_words)
+            start_pos = word_starts[start]
+            end_pos = word_ends[own_end - 1]
+            content = " ".join(words[start:own_end])
+            if len(content) <= 20:
+                return
+            metadata = None
+            if page_table[0]:
+                metadata = {
+                    "page_start": self._page_at(page_table, start_pos),
+                    "page_end": self._page_at(page_table, end_pos - 1),
+                }
+            chunks.append(
+                ProcessedChunk(
+                    content=content,
+                    chunk_index=len(chunks),
+                    start_pos=start_pos,
+                    end_pos=end_pos,
+                    chunk_type="semantic",
+                    metadata=metadata,
+                )
+            )
+            prev_end = own_end
 
-        # Başlık/madde/numaralı madde/boşluk tespiti için regex
-        pattern = re.compile(r"(^[A-ZÇĞİÖŞÜ\d][^\n]{0,80}\n)|(^\d+\.|^[a-z]\)|^MADDE \d+|^[-*#]{2,}|^\s*$)", re.MULTILINE)
-        splits = [m.start() for m in pattern.finditer(text)]
+        def emit_range(section_start: int, section_end: int):
+            """Bölümü chunk_size_words'lük parçalar halinde ekle"""
+            for own_start in range(section_start, section_end, chunk_size_words):
+                emit(own_start, min(own_start + chunk_size_words, section_end))
+
+        # Bölüm sınırları satır başlarındadır, bu yüzden hiçbir kelimeyi bölmez
+        splits = [m.start() for m in self.SECTION_PATTERN.finditer(text)]
         splits.append(len(text))
 
-        prev = 0
+        word_index = 0
         for i in range(1, len(splits)):
-            part = text[prev:splits[i]].strip()
-            if not part or len(part) < 20:
-                prev = splits[i]
+            section_start = word_index
+            while word_index < n_words and word_starts[word_index] < splits[i]:
+                word_index += 1
+            if word_index == section_start:
                 continue
-            words = part.split()
-            if len(words) > chunk_size_words:
-                j = 0
-                while j < len(words):
-                    chunk_words = words[j:j+chunk_size_words]
-                    chunk_text = " ".join(chunk_words)
-                    # Overlap uygula
-                    if chunks and overlap_words > 0:
-                        prev_text = chunks[-1].content
-                        prev_overlap = prev_text.split()[-overlap_words:]
-                        chunk_text = " ".join(prev_overlap) + " " + chunk_text
-                    chunk_start = text.find(chunk_text)
-                    chunk_end = chunk_start + len(chunk_text)
-                    if chunk_text.strip() and len(chunk_text.strip()) > 20:
-                        chunks.append(ProcessedChunk(
-                            content=chunk_text.strip(),
-                            chunk_index=len(chunks),
-                            start_pos=chunk_start,
-                            end_pos=chunk_end,
-                            chunk_type="semantic",
-                            metadata=None
-                        ))
-                    j += chunk_size_words - overlap_words
-            else:
-                chunk_text = part
-                if chunks and overlap_words > 0:
-                    prev_text = chunks[-1].content
-                    prev_overlap = prev_text.split()[-overlap_words:]
-                    chunk_text = " ".join(prev_overlap) + " " + chunk_text
-                chunk_start = text.find(chunk_text)
-                chunk_end = chunk_start + len(chunk_text)
-                if chunk_text.strip() and len(chunk_text.strip()) > 20:
-                    chunks.append(ProcessedChunk(
-                        content=chunk_text.strip(),
-                        chunk_index=len(chunks),
-                        start_pos=chunk_start,
-                        end_pos=chunk_end,
-                        chunk_type="semantic",
-                        metadata=None
-                    ))
-            prev = splits[i]
-
-        # Eğer hiç chunk oluşmadıysa veya tek büyük chunk oluştuysa, sliding window chunking uygula
-        if (not chunks or (len(chunks) == 1 and len(chunks[0].content.split()) > chunk_size_words)) and text.strip():
-            # Tüm metni kelime bazlı sliding window ile böl
-            words = text.strip().split()
-            j = 0
-            chunks = []
-            while j < len(words):
-                chunk_words = words[j:j+chunk_size_words]
-                chunk_text = " ".join(chunk_words)
-                if chunks and overlap_words > 0:
-                    prev_text = chunks[-1].content
-                    prev_overlap = prev_text.split()[-overlap_words:]
-                    chunk_text = " ".join(prev_overlap) + " " + chunk_text
-                chunk_start = text.find(chunk_text)
-                chunk_end = chunk_start + len(chunk_text)
-                if chunk_text.strip() and len(chunk_text.strip()) > 20:
-                    chunks.append(ProcessedChunk(
-                        content=chunk_text.strip(),
-                        chunk_index=len(chunks),
-                        start_pos=chunk_start,
-                        end_pos=chunk_end,
-                        chunk_type="semantic",
-                        metadata=None
-                    ))
-                j += chunk_size_words - overlap_words
+            # Çok kısa bölümler tek başına chunk olmaz (overlap ile sonraki chunk'a girer)
+            if word_ends[word_index - 1] - word_starts[section_start] < 20:
+                continue
+            emit_range(section_start, word_index)
+
+        # Hiç chunk oluşmadıysa tüm metne kelime bazlı sliding window uygula
+        if not chunks:
+            prev_end = None
+            emit_range(0, n_words)
         return chunks
 
+    def chunk_document(
+        self, text: str, metadata: DocumentMetadata
+    ) -> Tuple[List[ProcessedChunk], List[ProcessedChunk]]:
+        """
+        Embedlenecek chunk'ları ve (varsa) LLM context'i için parent pasajları döndür.
+
+        "tokens" modunda semantic chunk'lar parent olur; her parent embedding
+        modelinin token sınırını aşmayan child pencerelere bölünür ve yalnızca
+        child'lar embedlenir. "words" modunda eski semantic chunk'lar döner.
+        """
+        parents = self.adaptive_chunk_creation(text, metadata)
+        if config.CHUNKING_MODE != "tokens" or not parents:
+            return parents, []
+
+        children = self._token_window_chunking(text, parents)
+        if not config.PARENT_CHUNKS_ENABLED:
+            for child in children:
+                child.metadata.pop("parent_index", None)
+            return children, []
+        return children, parents
+
+    def _get_token_counter(self) -> "TokenLengthCounter":
+        if self._token_counter is None:
+            self._token_counter = TokenLengthCounter(config.EMBEDDING_MODEL)
+        return self._token_counter
+
+    def _token_window_chunking(
+        self,
+        text: str,
+        parents: List[ProcessedChunk],
+        max_tokens: Optional[int] = None,
+        overlap_tokens: Optional[int] = None,
+    ) -> List[ProcessedChunk]:
+        """
+        Parent aralıklarını modelin tokenizer'ıyla ölçülen, max_tokens'ı
+        aşmayan child pencerelere böl. Token sayıları kelime başına bir kez
+        hesaplanır; pencere sınırları önek toplamları üzerinde bisect ile bulunur.
+        """
+        counter = self._get_token_counter()
+        budget = max_tokens or config.CHUNK_MAX_TOKENS or counter.max_content_tokens
+        overlap = config.CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+
+        words, word_starts, word_ends = self._word_table(text)
+        if not words:
+            return []
+        prefix = [0] + list(accumulate(counter.count_words(words)))
+        page_table = self._page_table(text)
+
+        children: List[ProcessedChunk] = []
+        prev_parent_end = None
+        for parent_index, parent in enumerate(parents):
+            parent_start = bisect_left(word_starts, parent.start_pos)
+            parent_end = bisect_left(word_starts, parent.end_pos)
+            # Parent'ların kendi aralarındaki overlap'i child'larda tekrar etme
+            start = parent_start if prev_parent_end is None else max(parent_start, prev_parent_end)
+            prev_parent_end = parent_end
+
+            while start < parent_end:
+                # prefix[end] - prefix[start] <= budget olan en büyük end (en az bir kelime)
+                end = bisect_right(prefix, prefix[start] + budget, start + 1, parent_end + 1) - 1
+                end = max(end, start + 1)
+
+                start_pos, end_pos = word_starts[start], word_ends[end - 1]
+                child_metadata = {
+                    "parent_index": parent_index,
+                    "token_count": prefix[end] - prefix[start],
+                }
+                if page_table[0]:
+                    child_metadata["page_start"] = self._page_at(page_table, start_pos)
+                    child_metadata["page_end"] = self._page_at(page_table, end_pos - 1)
+                children.append(
+                    ProcessedChunk(
+                        content=" ".join(words[start:end]),
+                        chunk_index=len(children),
+                        start_pos=start_pos,
+                        end_pos=end_pos,
+                        chunk_type="token_window",
+                        metadata=child_metadata,
+                    )
+                )
+                if end >= parent_end:
+                    break
+                # Sonraki pencere overlap kadar token geriden başlar
+                next_start = bisect_left(prefix, prefix[end] - overlap, start + 1, end)
+                start = max(next_start, start + 1)
+
+        children = self._validate_chunks(children)
+        for index, child in enumerate(children):
+            child.chunk_index = index
+        return children
+
     def _page_based_chunking(self, text: str) -> List[ProcessedChunk]:
         """Sayfa bazlı chunking"""
         chunks = []
@@ -575,110 +747,180 @@ class AdvancedDocumentProcessor:
 
         return validated_chunks
 
-    def process_documents(self, path: str, keyword: str = None) -> List[Dict[str, Any]]:
-        """Ana doküman işleme fonksiyonu (anahtar kelime eşleşmesi zorunlu)"""
-        if not os.path.exists(path):
-            raise FileNotFoundError(f"Dosya veya klasör bulunamadı: {path}")
-
-        # Dosya listesi oluştur
-        files_to_process = self._get_supported_files(path)
-
-        if not files_to_process:
-            logger.warning(f"İşlenebilir dosya bulunamadı: {path}")
-            return []
+    def extract_document(self, file_path: str) -> Tuple[str, DocumentMetadata]:
+        """Tek dosyadan metni çıkar ve temizle (boş içerikte boş metin döner)"""
+        file_ext = Path(file_path).suffix.lower()
 
-        logger.info(f"📄 {len(files_to_process)} dosya bulundu. İşleniyor...")
+        if file_ext == ".pdf":
+            raw_text, metadata = self.extract_text_from_pdf(file_path)
+        elif file_ext in [".docx", ".doc"]:
+            raw_text, metadata = self.extract_text_from_docx(file_path)
+        else:
+            raw_text, metadata = self.extract_text_universal(file_path)
 
-        processed_data = []
+        return self.clean_extracted_text(raw_text, metadata)
 
-        for i, file_path in enumerate(files_to_process, 1):
-            logger.info(
-                f"[{i}/{len(files_to_process)}] İşleniyor: {os.path.basename(file_path)}"
-            )
+    def clean_extracted_text(
+        self, raw_text: str, metadata: DocumentMetadata
+    ) -> Tuple[str, DocumentMetadata]:
+        """Çıkarılan ham metni temizle (boş içerikte boş metin döner)"""
+        if not raw_text.strip():
+            logger.warning(f"   ⚠️ Boş içerik: {metadata.filename}")
+            return "", metadata
 
-            try:
-                # Dosya tipine göre işle
-                file_ext = Path(file_path).suffix.lower()
+        # Metni temizle
+        cleaned_text = self.advanced_clean_text(raw_text)
 
-                if file_ext == ".pdf":
-                    raw_text, metadata = self.extract_text_from_pdf(file_path)
-                elif file_ext in [".docx", ".doc"]:
-                    raw_text, metadata = self.extract_text_from_docx(file_path)
-                else:
-                    raw_text, metadata = self.extract_text_universal(file_path)
+        logger.info(
+            f"   🧹 Temizleme: {len(raw_text)} -> {len(cleaned_text)} karakter"
+        )
 
-                if not raw_text.strip():
-                    logger.warning(f"   ⚠️ Boş içerik: {metadata.filename}")
-                    self.stats["failed_files"] += 1
-                    continue
+        if not cleaned_text.strip():
+            logger.warning(
+                f"   ⚠️ Temizleme sonrası boş içerik: {metadata.filename}"
+            )
+        return cleaned_text, metadata
+
+    def build_document_record(
+        self,
+        cleaned_text: str,
+        metadata: DocumentMetadata,
+        processed_chunks: List[ProcessedChunk],
+        file_path: str,
+        keyword: str = None,
+        parent_chunks: Optional[List[ProcessedChunk]] = None,
+    ) -> Dict[str, Any]:
+        """Chunk'lardan enhanced_document_data.json kaydını oluştur"""
+        chunk_texts = [chunk.content for chunk in processed_chunks]
+        chunk_metadata = [chunk.metadata or {} for chunk in processed_chunks]
+
+        result_data = {
+            "filename": metadata.filename,
+            "file_type": metadata.file_type,
+            "file_size": metadata.file_size,
+            "content": cleaned_text,
+            "chunks": chunk_texts,
+            "chunk_metadata": chunk_metadata,
+            "chunk_count": len(chunk_texts),
+            "character_count": len(cleaned_text),
+            "document_metadata": {
+                "creation_date": metadata.creation_date,
+                "modification_date": metadata.modification_date,
+                "author": metadata.author,
+                "title": metadata.title,
+                "page_count": metadata.page_count,
+                "checksum": metadata.checksum,
+            },
+        }
+        # Child chunk'ların parent_index ile işaret ettiği LLM context pasajları
+        if parent_chunks:
+            result_data["parent_chunks"] = [
+                {
+                    "content": parent.content,
+                    "start_pos": parent.start_pos,
+                    "end_pos": parent.end_pos,
+                    **(parent.metadata or {}),
+                }
+                for parent in parent_chunks
+            ]
+        # Anahtar kelimeyi sadece bu dosya için ekle
+        if keyword is not None and os.path.basename(file_path) == result_data["filename"]:
+            result_data["keyword"] = keyword
+        return result_data
+
+    def process_file(self, file_path: str, keyword: str = None) -> Optional[Dict[str, Any]]:
+        """Tek dosyayı çıkar, temizle ve chunkla (işlenemezse None)"""
+        cleaned_text, metadata = self.extract_document(file_path)
+        return self._chunk_extracted(cleaned_text, metadata, file_path, keyword)
+
+    def _chunk_extracted(
+        self,
+        cleaned_text: str,
+        metadata: DocumentMetadata,
+        file_path: str,
+        keyword: str = None,
+    ) -> Optional[Dict[str, Any]]:
+        if not cleaned_text.strip():
+            return None
+
+        # Adaptif chunking
+        processed_chunks, parent_chunks = self.chunk_document(cleaned_text, metadata)
 
-                # Metni temizle
-                cleaned_text = self.advanced_clean_text(raw_text)
+        logger.info(
+            f"   📦 Chunking sonucu: {len(processed_chunks)} chunk, {len(parent_chunks)} parent oluşturuldu"
+        )
 
-                logger.info(
-                    f"   🧹 Temizleme: {len(raw_text)} -> {len(cleaned_text)} karakter"
-                )
+        if not processed_chunks:
+            logger.warning(f"   ⚠️ Chunk oluşturulamadı: {metadata.filename}")
+            return None
 
-                if not cleaned_text.strip():
-                    logger.warning(
-                        f"   ⚠️ Temizleme sonrası boş içerik: {metadata.filename}"
-                    )
-                    self.stats["failed_files"] += 1
-                    continue
+        return self.build_document_record(
+            cleaned_text, metadata, processed_chunks, file_path, keyword, parent_chunks
+        )
 
-                # Adaptif chunking
-                processed_chunks = self.adaptive_chunk_creation(cleaned_text, metadata)
+    def process_documents(
+        self, path: str, keyword: str = None, workers: int = 1
+    ) -> List[Dict[str, Any]]:
+        """
+        Ana doküman işleme fonksiyonu (anahtar kelime eşleşmesi zorunlu).
 
-                logger.info(
-                    f"   📦 Chunking sonucu: {len(processed_chunks)} chunk oluşturuldu"
-                )
+        workers > 1 ise dosyalar process havuzunda paralel işlenir; büyük
+        PDF'ler sayfa aralıklarına bölünür. Sonuçlar her durumda sıralı dosya
+        düzeninde birleştirilir, dosya bazlı süreler self.file_timings'e yazılır.
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Dosya veya klasör bulunamadı: {path}")
 
-                if not processed_chunks:
-                    logger.warning(f"   ⚠️ Chunk oluşturulamadı: {metadata.filename}")
-                    self.stats["failed_files"] += 1
-                    continue
-
-                # Sonuç verilerini hazırla
-                chunk_texts = [chunk.content for chunk in processed_chunks]
-                chunk_metadata = [chunk.metadata or {} for chunk in processed_chunks]
-
-                result_data = {
-                    "filename": metadata.filename,
-                    "file_type": metadata.file_type,
-                    "file_size": metadata.file_size,
-                    "content": cleaned_text,
-                    "chunks": chunk_texts,
-                    "chunk_metadata": chunk_metadata,
-                    "chunk_count": len(chunk_texts),
-                    "character_count": len(cleaned_text),
-                    "document_metadata": {
-                        "creation_date": metadata.creation_date,
-                        "modification_date": metadata.modification_date,
-                        "author": metadata.author,
-                        "title": metadata.title,
-                        "page_count": metadata.page_count,
-                        "checksum": metadata.checksum,
-                    },
-                }
-                # Anahtar kelimeyi sadece bu dosya için ekle
-                if keyword is not None and os.path.basename(file_path) == result_data["filename"]:
-                    result_data["keyword"] = keyword
+        # Dosya listesi oluştur
+        files_to_process = self._get_supported_files(path)
 
-                processed_data.append(result_data)
+        if not files_to_process:
+            logger.warning(f"İşlenebilir dosya bulunamadı: {path}")
+            return []
 
-                # İstatistik güncelle
-                self.stats["processed_files"] += 1
-                self.stats["total_chunks"] += len(chunk_texts)
-                self.stats["total_characters"] += len(cleaned_text)
+        return self.process_files(files_to_process, keyword, workers)
+
+    def process_files(
+        self, files_to_process: List[str], keyword: str = None, workers: int = 1
+    ) -> List[Dict[str, Any]]:
+        """Verilen dosya listesini işle (process_documents ile aynı çıktı)"""
+        return list(self.iter_process_files(files_to_process, keyword, workers))
+
+    def iter_process_files(
+        self, files_to_process: List[str], keyword: str = None, workers: int = 1
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        process_files'ın akış sürümü: kayıtlar sıralı dosya düzeninde, kendinden
+        önceki dosyalar biter bitmez üretilir; sonraki aşama tüm klasörü beklemez.
+        """
+        self.file_timings = []
+        if not files_to_process:
+            return
 
-                logger.info(
-                    f"   ✅ {len(chunk_texts)} chunk, {len(cleaned_text):,} karakter"
-                )
+        workers = max(1, workers or 1)
+        logger.info(
+            f"📄 {len(files_to_process)} dosya bulundu. İşleniyor... (worker: {workers})"
+        )
+        started = time.perf_counter()
 
-            except Exception as e:
-                logger.error(f"   ❌ İşleme hatası {os.path.basename(file_path)}: {e}")
-                self.stats["failed_files"] += 1
-                continue
+        if workers > 1 and (
+            len(files_to_process) > 1 or self._pdf_page_ranges(files_to_process[0])
+        ):
+            completed = self._iter_files_parallel(files_to_process, keyword, workers)
+        else:
+            completed = self._iter_files_serial(files_to_process, keyword)
+
+        # Sıralı dosya düzeninde üret (deterministik çıktı)
+        outcomes = {}
+        next_index = 0
+        for file_path, outcome in completed:
+            outcomes[file_path] = outcome
+            while next_index < len(files_to_process) and files_to_process[next_index] in outcomes:
+                ordered_path = files_to_process[next_index]
+                next_index += 1
+                result_data = self._record_outcome(ordered_path, outcomes.pop(ordered_path))
+                if result_data:
+                    yield result_data
 
         # Final istatistikler
         logger.info(f"📊 İşlem tamamlandı:")
@@ -686,8 +928,131 @@ class AdvancedDocumentProcessor:
         logger.info(f"   Başarısız: {self.stats['failed_files']}")
         logger.info(f"   Toplam chunk: {self.stats['total_chunks']:,}")
         logger.info(f"   Toplam karakter: {self.stats['total_characters']:,}")
+        logger.info(f"   Toplam süre: {time.perf_counter() - started:.2f} sn")
+
+    def _record_outcome(
+        self,
+        file_path: str,
+        outcome: Tuple[Optional[Dict[str, Any]], float, int, Optional[str]],
+    ) -> Optional[Dict[str, Any]]:
+        """Dosya sonucunu süre/istatistiklere işle, başarılıysa kaydı döndür"""
+        result_data, seconds, tasks, error = outcome
+        filename = os.path.basename(file_path)
+        self.file_timings.append(
+            {
+                "filename": filename,
+                "seconds": round(seconds, 3),
+                "tasks": tasks,
+                "chunks": result_data["chunk_count"] if result_data else 0,
+                "status": "ok" if result_data else "failed",
+            }
+        )
+
+        if error:
+            logger.error(f"   ❌ İşleme hatası {filename}: {error}")
+        if not result_data:
+            self.stats["failed_files"] += 1
+            return None
+
+        # İstatistik güncelle
+        self.stats["processed_files"] += 1
+        self.stats["total_chunks"] += result_data["chunk_count"]
+        self.stats["total_characters"] += result_data["character_count"]
+
+        logger.info(
+            f"   ✅ {filename}: {result_data['chunk_count']} chunk, "
+            f"{result_data['character_count']:,} karakter ({seconds:.2f} sn)"
+        )
+        return result_data
+
+    def _iter_files_serial(
+        self, files: List[str], keyword: Optional[str]
+    ) -> Iterator[Tuple[str, Tuple[Optional[Dict[str, Any]], float, int, Optional[str]]]]:
+        """Dosyaları sırayla işle, her biri bittiğinde (dosya, sonuç) üret"""
+        for i, file_path in enumerate(files, 1):
+            logger.info(f"[{i}/{len(files)}] İşleniyor: {os.path.basename(file_path)}")
+            file_started = time.perf_counter()
+            try:
+                record, error = self.process_file(file_path, keyword), None
+            except Exception as e:
+                record, error = None, str(e)
+            yield file_path, (record, time.perf_counter() - file_started, 1, error)
 
-        return processed_data
+    def _pdf_page_ranges(self, file_path: str) -> List[Tuple[int, int]]:
+        """Büyük PDF'ler için [start, end) sayfa aralıkları; küçük dosyalarda boş liste"""
+        if Path(file_path).suffix.lower() != ".pdf":
+            return []
+        try:
+            with fitz.open(file_path) as doc:
+                page_count = len(doc)
+        except Exception:
+            return []
+        if page_count < config.PDF_SPLIT_MIN_PAGES:
+            return []
+        step = config.PDF_PAGES_PER_TASK
+        return [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+
+    def _iter_files_parallel(
+        self, files: List[str], keyword: Optional[str], workers: int
+    ) -> Iterator[Tuple[str, Tuple[Optional[Dict[str, Any]], float, int, Optional[str]]]]:
+        """Dosyaları (büyük PDF'lerde sayfa aralıklarını) process havuzuna dağıt, bitenleri üret"""
+        finished = set()
+        file_started: Dict[str, float] = {}
+        task_counts: Dict[str, int] = {}
+        # Bölünmüş PDF'lerin sayfa parçaları: file_path -> {range_index: text_parts}
+        split_parts: Dict[str, Dict[int, List[str]]] = {}
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = {}
+            for file_path in files:
+                file_started[file_path] = time.perf_counter()
+                ranges = self._pdf_page_ranges(file_path)
+                if ranges:
+                    split_parts[file_path] = {}
+                    task_counts[file_path] = len(ranges) + 1
+                    for index, (start, end) in enumerate(ranges):
+                        future = executor.submit(_extract_pdf_range_task, file_path, start, end)
+                        pending[future] = ("pages", file_path, index, len(ranges))
+                else:
+                    task_counts[file_path] = 1
+                    future = executor.submit(_process_file_task, file_path, keyword)
+                    pending[future] = ("file", file_path, None, None)
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, file_path, index, total = pending.pop(future)
+                    if file_path in finished:
+                        continue
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        finished.add(file_path)
+                        yield file_path, (
+                            None, time.perf_counter() - file_started[file_path],
+                            task_counts[file_path], str(e),
+                        )
+                        continue
+
+                    if kind == "pages":
+                        split_parts[file_path][index] = result
+                        if len(split_parts[file_path]) == total:
+                            # Sayfa sırası korunarak birleştir
+                            parts = split_parts.pop(file_path)
+                            text_parts = [part for i in range(total) for part in parts[i]]
+                            future = executor.submit(
+                                _finish_split_pdf_task, file_path, text_parts, keyword
+                            )
+                            pending[future] = ("finish", file_path, None, None)
+                    else:
+                        finished.add(file_path)
+                        logger.info(
+                            f"[{len(finished)}/{len(files)}] Tamamlandı: {os.path.basename(file_path)}"
+                        )
+                        yield file_path, (
+                            result, time.perf_counter() - file_started[file_path],
+                            task_counts[file_path], None,
+                        )
 
     def _get_supported_files(self, path: str) -> List[str]:
         """Desteklenen dosyaları listele"""
@@ -705,24 +1070,68 @@ class AdvancedDocumentProcessor:
         return sorted(files)  # Deterministic order
 
 
-def save_enhanced_data(data: List[Dict[str, Any]], output_file: str) -> None:
-    """Gelişmiş veri kaydetme"""
+# ---------------------------------------------------------------------- #
+# Process havuzu görevleri (pickle edilebilmeleri için modül seviyesinde)
+# ---------------------------------------------------------------------- #
+_worker_processor: Optional[AdvancedDocumentProcessor] = None
+
+
+def _get_worker_processor() -> AdvancedDocumentProcessor:
+    """Worker process başına tek processor örneği"""
+    global _worker_processor
+    if _worker_processor is None:
+        _worker_processor = AdvancedDocumentProcessor()
+    return _worker_processor
+
+
+def _process_file_task(file_path: str, keyword: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Tüm dosyayı tek görevde işle"""
+    return _get_worker_processor().process_file(file_path, keyword)
+
+
+def _extract_pdf_range_task(file_path: str, start: int, end: int) -> List[str]:
+    """Büyük PDF'in bir sayfa aralığını çıkar"""
+    with fitz.open(file_path) as doc:
+        return _get_worker_processor()._extract_pdf_pages(doc, start, end)
+
+
+def _finish_split_pdf_task(
+    file_path: str, text_parts: List[str], keyword: Optional[str]
+) -> Optional[Dict[str, Any]]:
+    """Sayfa aralıklarından gelen metni birleştir, temizle ve chunkla"""
+    processor = _get_worker_processor()
+    with fitz.open(file_path) as doc:
+        metadata = processor._extract_pdf_metadata(doc, file_path)
+    raw_text = "\n".join(text_parts)
+    metadata.page_count = len(text_parts)
+    logger.info(
+        f"   📄 PDF'den {len(text_parts)} sayfa metin çıkarıldı, toplam {len(raw_text)} karakter"
+    )
+    cleaned_text, metadata = processor.clean_extracted_text(raw_text, metadata)
+    return processor._chunk_extracted(cleaned_text, metadata, file_path, keyword)
+
+
+def save_enhanced_data(data: Iterable[Dict[str, Any]], output_file: str) -> int:
+    """
+    Gelişmiş veri kaydetme (JSONL akışı). data bir generator olabilir; her kayıt
+    üretildiği anda yazılır, sonraki aşama dosyayı takip ederek tüketebilir.
+    """
     try:
         # Backup eski dosya
         if os.path.exists(output_file):
             backup_file = f"{output_file}.backup"
-            os.rename(output_file, backup_file)
+            os.replace(output_file, backup_file)
             logger.info(f"Eski dosya yedeklendi: {backup_file}")
 
-        # Yeni dosyayı kaydet
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        # Yeni dosyayı kayıt kayıt yaz
+        count = write_records(output_file, data)
 
-        logger.info(f"✅ Veriler kaydedildi: {output_file}")
+        logger.info(f"✅ {count} kayıt kaydedildi: {output_file}")
 
         # Dosya boyutu kontrolü
         file_size = os.path.getsize(output_file) / (1024 * 1024)  # MB
         logger.info(f"📁 Dosya boyutu: {file_size:.2f} MB")
+        return count
 
     except Exception as e:
         logger.error(f"❌ Kaydetme hatası: {e}")
@@ -730,9 +1139,9 @@ def save_enhanced_data(data: List[Dict[str, Any]], output_file: str) -> None:
 
 
 def main():
-    """uploads klasöründeki tüm desteklenen dosyaları işleyip uploads_base.json'a kaydeder"""
+    """uploads klasöründeki tüm desteklenen dosyaları işleyip uploads_base.jsonl'a kaydeder"""
     uploads_dir = "uploads"
-    output_file = "uploads_base.json"
+    output_file = "uploads_base.jsonl"
 
     # Logging setup
     logging.basicConfig(
@@ -754,21 +1163,9 @@ def main():
             logger.error("❌ uploads klasöründe işlenebilir dosya bulunamadı.")
             return
 
-        all_data = []
-        for i, file_path in enumerate(files_to_process, 1):
-            logger.info(f"[{i}/{len(files_to_process)}] İşleniyor: {file_path}")
-            try:
-                data = processor.process_documents(file_path)
-                if data:
-                    all_data.extend(data)
-                    logger.info(f"✅ {file_path} işlendi ve eklendi.")
-                else:
-                    logger.warning(f"⚠️ İşlenemeyen dosya: {file_path}")
-            except Exception as e:
-                logger.error(f"❌ Dosya işleme hatası: {file_path}, Hata: {e}")
-
-        if all_data:
-            save_enhanced_data(all_data, output_file)
+        # Her dosya işlendiği anda yazılır
+        count = save_enhanced_data(processor.iter_process_files(files_to_process), output_file)
+        if count:
             logger.info(f"✅ Tüm dosyalar {output_file} dosyasına kaydedildi.")
         else:
             logger.warning("⚠️ Hiçbir dosya başarıyla işlenemedi.")
@@ -778,5 +1175,147 @@ def main():
         raise
 
 
+def benchmark_chunking(sizes_mb: List[float]) -> List[Dict[str, Any]]:
+    """Sentetik çok sayfalı metinlerde _semantic_chunking süresini ölç (MB başına süre sabit kalmalı)"""
+    import random
+
+    random.seed(42)
+    vocabulary = [
+        "öğrenci", "madde", "yönetmelik", "sınav", "ders", "kredi", "fakülte",
+        "senato", "karar", "başvuru", "süre", "dönem", "not", "ortalama",
+    ]
+    processor = AdvancedDocumentProcessor()
+    results = []
+    for size_mb in sizes_mb:
+        target = int(size_mb * 1024 * 1024)
+        pages, length, page_num = [], 0, 0
+        while length < target:
+            body = " ".join(random.choice(vocabulary) for _ in range(400))
+            page = f"[SAYFA {page_num}] {body} [/SAYFA {page_num}]"
+            pages.append(page)
+            length += len(page.encode("utf-8")) + 1
+            page_num += 1
+        text = " ".join(pages)
+
+        started = time.perf_counter()
+        chunks = processor._semantic_chunking(text)
+        elapsed = time.perf_counter() - started
+
+        actual_mb = len(text.encode("utf-8")) / (1024 * 1024)
+        results.append(
+            {
+                "size_mb": round(actual_mb, 2),
+                "pages": page_num,
+                "chunks": len(chunks),
+                "seconds": round(elapsed, 3),
+                "seconds_per_mb": round(elapsed / actual_mb, 3),
+            }
+        )
+        print(
+            f"📏 {actual_mb:6.2f} MB | {page_num:5d} sayfa | {len(chunks):5d} chunk | "
+            f"{elapsed:7.3f} sn | {elapsed / actual_mb:.3f} sn/MB"
+        )
+    return results
+
+
+def benchmark_chunk_recall(
+    path: str = "docs", num_queries: int = 200, k: int = 5, span_words: int = 12
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Eski kelime bazlı chunk'lar ile tokenizer-aware child chunk'ları karşılaştır.
+
+    Dokümanlardan rastgele span_words kelimelik aralıklar sorgu olarak alınır;
+    ilk k sonuçtan birinin (token modunda child'ın ya da parent'ının) aralığı
+    sorgunun orta noktasını içeriyorsa isabet sayılır. İndeks boyutu vektör
+    (float32) + saklanan metin baytlarıdır.
+    """
+    import random
+    import numpy as np
+    from embedder import get_embedder
+
+    random.seed(42)
+    processor = AdvancedDocumentProcessor()
+    embedder = get_embedder(config.EMBEDDING_MODEL)
+
+    def embed(texts: List[str]) -> np.ndarray:
+        vectors = embedder.embed_batch_array(texts, normalize=True, show_progress=False)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    # (doküman, başlangıç, bitiş) aralıkları ve metinleri
+    word_rows, token_rows, parent_rows = [], [], []
+    queries: List[Tuple[int, int, str]] = []
+    for doc_id, file_path in enumerate(processor._get_supported_files(path)):
+        text, metadata = processor.extract_document(file_path)
+        if not text.strip():
+            continue
+        parents = processor.adaptive_chunk_creation(text, metadata)
+        children = processor._token_window_chunking(text, parents)
+        parent_base = len(parent_rows)
+        word_rows += [(doc_id, c.start_pos, c.end_pos, c.content) for c in parents]
+        parent_rows += [(doc_id, c.start_pos, c.end_pos, c.content) for c in parents]
+        token_rows += [
+            (doc_id, c.start_pos, c.end_pos, c.content, parent_base + c.metadata["parent_index"])
+            for c in children
+        ]
+
+        words, word_starts, _ = processor._word_table(text)
+        for _ in range(num_queries):
+            if len(words) <= span_words:
+                break
+            i = random.randrange(len(words) - span_words)
+            queries.append(
+                (doc_id, word_starts[i + span_words // 2], " ".join(words[i:i + span_words]))
+            )
+
+    if not queries or not word_rows:
+        print(f"❌ Benchmark için doküman bulunamadı: {path}")
+        return {}
+    queries = random.sample(queries, min(num_queries, len(queries)))
+    query_vectors = embed([q[2] for q in queries])
+
+    def contains(row, doc_id, offset):
+        return row[0] == doc_id and row[1] <= offset < row[2]
+
+    results = {}
+    for mode, rows in (("words", word_rows), ("tokens", token_rows)):
+        vectors = embed([row[3] for row in rows])
+        top_k = np.argsort(-(query_vectors @ vectors.T), axis=1)[:, :k]
+        hits = parent_hits = 0
+        for (doc_id, offset, _), indices in zip(queries, top_k):
+            candidates = [rows[j] for j in indices]
+            hits += any(contains(row, doc_id, offset) for row in candidates)
+            if mode == "tokens":
+                parent_hits += any(
+                    contains(parent_rows[row[4]], doc_id, offset) for row in candidates
+                )
+        text_bytes = sum(len(row[3].encode("utf-8")) for row in rows)
+        if mode == "tokens" and config.PARENT_CHUNKS_ENABLED:
+            text_bytes += sum(len(row[3].encode("utf-8")) for row in parent_rows)
+        results[mode] = {
+            "chunks": len(rows),
+            f"recall@{k}": round(hits / len(queries), 3),
+            "index_mb": round((vectors.nbytes + text_bytes) / (1024 * 1024), 2),
+        }
+        if mode == "tokens":
+            results[mode][f"parent_recall@{k}"] = round(parent_hits / len(queries), 3)
+
+    print(f"🔎 {len(queries)} sorgu, k={k}")
+    for mode, stats in results.items():
+        extra = f" | parent recall@{k}: {stats[f'parent_recall@{k}']:.3f}" if mode == "tokens" else ""
+        print(
+            f"📐 {mode:6s} | {stats['chunks']:6d} chunk | recall@{k}: {stats[f'recall@{k}']:.3f}"
+            f"{extra} | indeks: {stats['index_mb']:.2f} MB"
+        )
+    return results
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # python base.py benchmark [MB ...] -> chunking benchmark'ı
+    # python base.py benchmark-recall [klasör] -> kelime vs token chunk recall / indeks boyutu
+    if len(sys.argv) > 1 and sys.argv[1] == "benchmark":
+        benchmark_chunking([float(x) for x in sys.argv[2:]] or [1, 2, 4, 8])
+    elif len(sys.argv) > 1 and sys.argv[1] == "benchmark-recall":
+        benchmark_chunk_recall(sys.argv[2] if len(sys.argv) > 2 else "docs")
+    else:
+        main()
\ No newline at end of file
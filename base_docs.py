@@ -1,24 +1,67 @@
 # base_docs.py
 """
-Sadece docs klasöründeki dosyaları işler ve data.json olarak kaydeder.
+Sadece docs klasöründeki dosyaları işler ve data.jsonl olarak kaydeder.
+Her dosya işlendiği anda yazılır; embedder_docs --follow aynı anda tüketebilir.
+
+Ingestion manifest'ine göre yalnızca yeni veya değişmiş dosyalar işlenir;
+--full ile tüm klasör yeniden işlenir.
+
+Kullanım: python base_docs.py [--workers N] [--full]
 """
 import os
-import json
+import sys
 from base import AdvancedDocumentProcessor
+from config import config
+from ingestion_manifest import get_ingestion_manifest
+from jsonl_io import JsonlWriter
+
+def parse_workers(argv):
+    """--workers N argümanını oku (yoksa config değeri)"""
+    if "--workers" in argv:
+        index = argv.index("--workers")
+        if index + 1 < len(argv):
+            return int(argv[index + 1])
+    return config.DOCUMENT_PROCESS_WORKERS
 
 def main():
     DOCS_FOLDER = "docs"
-    OUTPUT_JSON = "data.json"
+    OUTPUT_JSONL = "data.jsonl"
     if not os.path.exists(DOCS_FOLDER):
         print(f"[base_docs] {DOCS_FOLDER} klasörü yok.")
+        # Takip eden aşama beklemede kalmasın
+        with JsonlWriter(OUTPUT_JSONL):
+            pass
         return
     
+    argv = sys.argv[1:]
+    workers = parse_workers(argv)
     processor = AdvancedDocumentProcessor()
-    data = processor.process_documents(DOCS_FOLDER)
-    
-    with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    print(f"[base_docs] {OUTPUT_JSON} kaydedildi. {len(data)} dosya işlendi.")
+    all_files = processor._get_supported_files(DOCS_FOLDER)
+
+    if "--full" in argv:
+        files_to_process = all_files
+    else:
+        plan = get_ingestion_manifest().plan(all_files)
+        files_to_process = sorted(plan["new"] + plan["changed"])
+        print(
+            f"[base_docs] Yeni: {len(plan['new'])}, değişen: {len(plan['changed'])}, "
+            f"değişmeyen: {len(plan['unchanged'])}, silinen: {len(plan['removed'])}"
+        )
+
+    # chroma_docs manifest'e dosya yolunu yazabilsin
+    path_by_name = {os.path.basename(path): path for path in files_to_process}
+    with JsonlWriter(OUTPUT_JSONL) as writer:
+        for item in processor.iter_process_files(files_to_process, workers=workers):
+            item["source_path"] = path_by_name.get(item["filename"])
+            writer.write(item)
+    print(f"[base_docs] {OUTPUT_JSONL} kaydedildi. {writer.count} dosya işlendi.")
+
+    # Dosya bazlı süreler (en yavaş dosyalar önce)
+    for timing in sorted(processor.file_timings, key=lambda t: t["seconds"], reverse=True)[:10]:
+        print(
+            f"[base_docs]   {timing['filename']}: {timing['seconds']:.2f} sn, "
+            f"{timing['chunks']} chunk, {timing['tasks']} görev ({timing['status']})"
+        )
 
 if __name__ == "__main__":
     main()
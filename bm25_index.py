@@ -0,0 +1,319 @@
+"""
+Kalıcı inverted index + BM25 skorlama.
+
+HybridRetriever.keyword_search her sorguda tüm koleksiyonu Chroma'dan çekip
+regex ile taramak yerine bu index'i kullanır. Index, rag_documents'a yazılan
+chunk'larla aynı ID'leri tutar ve ChromaDBManager / chroma_utils tarafından
+ekleme ve silme sırasında artımlı olarak güncellenir.
+"""
+import os
+import re
+import math
+import heapq
+import pickle
+import logging
+import threading
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple, Iterable
+
+from store_registry import PathRegistry
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "bm25_index.pkl"
+INDEX_VERSION = 1
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Metni index/sorgu için token'lara ayır (küçük harf, kelime bazlı)"""
+    if not text:
+        return []
+    return _TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """Term frequency, doküman uzunlukları ve BM25 skorlama ile inverted index"""
+
+    def __init__(self, index_path: str, k1: float = 1.5, b: float = 0.75):
+        self.index_path = index_path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+
+        # term -> {chunk_id: tf}
+        self.postings: Dict[str, Dict[str, int]] = {}
+        # chunk_id -> token sayısı
+        self.doc_lengths: Dict[str, int] = {}
+        # chunk_id -> source_file
+        self.doc_sources: Dict[str, str] = {}
+        # chunk_id -> chunk'ta geçen terimler (silmede postings taramamak için)
+        self.doc_terms: Dict[str, List[str]] = {}
+        self.total_length = 0
+        self._loaded_mtime: Optional[float] = None
+
+        self._load()
+
+    # ------------------------------------------------------------------ #
+    # Kalıcılık
+    # ------------------------------------------------------------------ #
+    def _load(self):
+        """Index'i diskten yükle"""
+        with self._lock:
+            if not os.path.exists(self.index_path):
+                return
+            try:
+                with open(self.index_path, "rb") as f:
+                    state = pickle.load(f)
+                if state.get("version") != INDEX_VERSION:
+                    logger.warning("BM25 index sürümü uyumsuz, yeniden oluşturulacak")
+                    return
+                self.postings = state["postings"]
+                self.doc_lengths = state["doc_lengths"]
+                self.doc_sources = state.get("doc_sources", {})
+                self.doc_terms = state["doc_terms"]
+                self.total_length = state["total_length"]
+                self._loaded_mtime = os.path.getmtime(self.index_path)
+                logger.info(f"📚 BM25 index yüklendi: {len(self.doc_lengths)} chunk, {len(self.postings)} terim")
+            except Exception as e:
+                logger.warning(f"BM25 index yüklenemedi: {e}")
+
+    def _maybe_reload(self):
+        """Başka bir process index'i güncellediyse yeniden yükle"""
+        try:
+            mtime = os.path.getmtime(self.index_path)
+        except OSError:
+            return
+        if self._loaded_mtime is None or mtime > self._loaded_mtime:
+            with self._lock:
+                self.postings = {}
+                self.doc_lengths = {}
+                self.doc_sources = {}
+                self.doc_terms = {}
+                self.total_length = 0
+                self._load()
+
+    def save(self):
+        """Index'i atomik olarak diske yaz"""
+        with self._lock:
+            directory = os.path.dirname(self.index_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.index_path}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    pickle.dump(
+                        {
+                            "version": INDEX_VERSION,
+                            "postings": self.postings,
+                            "doc_lengths": self.doc_lengths,
+                            "doc_sources": self.doc_sources,
+                            "doc_terms": self.doc_terms,
+                            "total_length": self.total_length,
+                        },
+                        f,
+                        protocol=pickle.HIGHEST_PROTOCOL,
+                    )
+                os.replace(tmp_path, self.index_path)
+                self._loaded_mtime = os.path.getmtime(self.index_path)
+            except Exception as e:
+                logger.error(f"BM25 index kaydedilemedi: {e}")
+
+    # ------------------------------------------------------------------ #
+    # Artımlı güncelleme
+    # ------------------------------------------------------------------ #
+    def add_documents(
+        self,
+        ids: List[str],
+        documents: List[str],
+        metadatas: Optional[List[Dict[str, Any]]] = None,
+        persist: bool = True,
+    ):
+        """Chunk'ları index'e ekle (aynı ID varsa yerine koyar)"""
+        with self._lock:
+            for i, (doc_id, document) in enumerate(zip(ids, documents)):
+                if doc_id in self.doc_lengths:
+                    self._remove_one(doc_id)
+
+                tokens = tokenize(document)
+                counts = Counter(tokens)
+                for term, tf in counts.items():
+                    self.postings.setdefault(term, {})[doc_id] = tf
+                self.doc_terms[doc_id] = list(counts)
+                self.doc_lengths[doc_id] = len(tokens)
+                self.total_length += len(tokens)
+
+                metadata = metadatas[i] if metadatas and i < len(metadatas) else None
+                if metadata and metadata.get("source_file"):
+                    self.doc_sources[doc_id] = metadata["source_file"]
+
+            if persist:
+                self.save()
+
+    def remove_documents(self, ids: Iterable[str], persist: bool = True) -> int:
+        """Chunk'ları index'ten kaldır"""
+        removed = 0
+        with self._lock:
+            for doc_id in ids:
+                if doc_id in self.doc_lengths:
+                    self._remove_one(doc_id)
+                    removed += 1
+            if persist and removed:
+                self.save()
+        return removed
+
+    def _remove_one(self, doc_id: str):
+        """Tek chunk'ı postings listelerinden sil (lock altında çağrılır)"""
+        self.total_length -= self.doc_lengths.pop(doc_id, 0)
+        self.doc_sources.pop(doc_id, None)
+        for term in self.doc_terms.pop(doc_id, []):
+            docs = self.postings.get(term)
+            if docs is None:
+                continue
+            docs.pop(doc_id, None)
+            if not docs:
+                del self.postings[term]
+
+    def clear(self, persist: bool = True):
+        """Index'i tamamen sıfırla"""
+        with self._lock:
+            self.postings = {}
+            self.doc_lengths = {}
+            self.doc_sources = {}
+            self.doc_terms = {}
+            self.total_length = 0
+            if persist:
+                self.save()
+
+    def rebuild_from_collection(self, collection, page_size: int = 1000) -> int:
+        """Index'i mevcut Chroma koleksiyonundan sayfalı olarak yeniden kur"""
+        with self._lock:
+            self.clear(persist=False)
+            total = collection.count()
+            for offset in range(0, total, page_size):
+                page = collection.get(
+                    limit=page_size, offset=offset, include=["documents", "metadatas"]
+                )
+                self.add_documents(
+                    page.get("ids", []) or [],
+                    page.get("documents", []) or [],
+                    page.get("metadatas", []) or [],
+                    persist=False,
+                )
+            self.save()
+            logger.info(f"✅ BM25 index koleksiyondan yeniden oluşturuldu: {len(self.doc_lengths)} chunk")
+            return len(self.doc_lengths)
+
+    # ------------------------------------------------------------------ #
+    # Sorgulama
+    # ------------------------------------------------------------------ #
+    def _idf(self, df: int, n_docs: int) -> float:
+        """Negatif olmayan BM25 IDF"""
+        return math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+
+    def search(
+        self,
+        query_terms: List[str],
+        n_results: int = 10,
+        term_weights: Optional[Dict[str, float]] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        BM25 skorlarına göre en iyi n_results chunk'ı döndürür.
+
+        Skorlar sorgunun teorik üst sınırına bölünerek 0-1 aralığına çekilir,
+        böylece semantic skorla aynı ölçekte birleştirilebilir.
+        """
+        return self.search_many([query_terms], n_results, term_weights)[0]
+
+    def search_many(
+        self,
+        queries_terms: List[List[str]],
+        n_results: int = 10,
+        term_weights: Optional[Dict[str, float]] = None,
+    ) -> List[List[Tuple[str, float]]]:
+        """
+        Birden fazla sorgu varyantını tek geçişte skorlar: her terimin
+        postings listesi bir kez dolaşılır, varyantlar bu katkıları paylaşır.
+        """
+        self._maybe_reload()
+        term_weights = term_weights or {}
+
+        with self._lock:
+            n_docs = len(self.doc_lengths)
+            if n_docs == 0:
+                return [[] for _ in queries_terms]
+            avgdl = self.total_length / n_docs
+
+            # Sorgu terimlerini index tokenizer'ı ile normalize et
+            variants = []
+            for query_terms in queries_terms:
+                terms = set()
+                for term in query_terms or []:
+                    terms.update(tokenize(term))
+                variants.append(terms)
+
+            # Ortak aday geçişi: terim -> {chunk_id: idf'li katkı}
+            k1, b = self.k1, self.b
+            contributions: Dict[str, Tuple[float, Dict[str, float]]] = {}
+            for term in set().union(*variants):
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = self._idf(len(docs), n_docs)
+                doc_lengths = self.doc_lengths
+                contributions[term] = (
+                    idf,
+                    {
+                        doc_id: idf * tf * (k1 + 1)
+                        / (tf + k1 * (1 - b + b * doc_lengths[doc_id] / avgdl))
+                        for doc_id, tf in docs.items()
+                    },
+                )
+
+            results = []
+            for terms in variants:
+                scores: Dict[str, float] = {}
+                upper_bound = 0.0
+                for term in terms:
+                    if term not in contributions:
+                        continue
+                    idf, term_scores = contributions[term]
+                    weight = term_weights.get(term, 1.0)
+                    upper_bound += idf * weight * (k1 + 1)
+                    for doc_id, score in term_scores.items():
+                        scores[doc_id] = scores.get(doc_id, 0.0) + score * weight
+
+                if not scores or upper_bound <= 0:
+                    results.append([])
+                    continue
+
+                top = heapq.nlargest(n_results, scores.items(), key=lambda x: x[1])
+                results.append([(doc_id, score / upper_bound) for doc_id, score in top])
+            return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Index istatistikleri"""
+        with self._lock:
+            n_docs = len(self.doc_lengths)
+            return {
+                "total_chunks": n_docs,
+                "total_terms": len(self.postings),
+                "avg_chunk_length": self.total_length / n_docs if n_docs else 0,
+                "index_size_mb": (
+                    os.path.getsize(self.index_path) / (1024 * 1024)
+                    if os.path.exists(self.index_path)
+                    else 0
+                ),
+            }
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+
+_indexes = PathRegistry()
+
+
+def get_bm25_index(chroma_path: str = "./chroma") -> BM25Index:
+    """Chroma dizini başına process genelinde tek BM25Index örneği döndür"""
+    return _indexes.get(chroma_path, lambda: BM25Index(os.path.join(chroma_path, INDEX_FILENAME)))
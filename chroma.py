@@ -1,8 +1,12 @@
 import os
+import sys
 import json
+import time
+import base64
 import shutil
+import tempfile
 import hashlib
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Callable, Iterator
 from datetime import datetime
 import logging
 import chromadb
@@ -10,12 +14,87 @@ from chromadb.config import Settings
 from chromadb.utils import embedding_functions
 import numpy as np
 from config import config
+from bm25_index import get_bm25_index
+from ingestion_manifest import get_ingestion_manifest
+from parent_store import get_parent_store, make_parent_id
+from chunk_catalog import get_chunk_catalog
+from store_registry import PathRegistry
+from chroma_maintenance import create_snapshot, compact_sqlite, is_sqlite_file
+from answer_cache import answer_cache
 from functools import lru_cache
 import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
 logger = logging.getLogger(__name__)
 
+# Chroma get / update / delete çağrılarında sayfa boyutu
+ID_PAGE_SIZE = 5000
+
+# optimize_collection'ın geçici olarak kurduğu koleksiyonun ad eki
+COMPACT_SUFFIX = "__compact"
+
+# Koleksiyon yeniden kurulunca (sıkıştırma / reset) yeni koleksiyon ID'si bu dosyaya
+# yazılır; diğer process'lerdeki manager'lar silinmiş koleksiyon handle'ı yerine
+# yenisini alır. Dosya en fazla bu aralıkla (sn) kontrol edilir.
+GENERATION_SUFFIX = ".generation"
+GENERATION_CHECK_INTERVAL = 1.0
+
+
+def make_chunk_id(source_file: str, chunk: str, occurrence: int = 0) -> str:
+    """
+    İçerik adresli chunk ID'si: kaynak dosya + chunk metninin hash'i.
+    Aynı dosyada birebir tekrar eden chunk'lar occurrence ile ayrılır.
+    """
+    digest = hashlib.sha1(chunk.encode("utf-8")).hexdigest()[:20]
+    suffix = f"-{occurrence}" if occurrence else ""
+    return f"{source_file}#c{digest}{suffix}"
+
+
+def _embedding_matrix(raw, limit: int, dim: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    İlk limit embedding'i (n, dim) float32 matrise çevir. Boyutu dim olmayan
+    satırlar valid maskesinde False olur (matristeki değerleri kullanılmaz).
+    """
+    rows = raw[:limit] if raw is not None else []
+    count = len(rows)
+    if count == 0:
+        return np.empty((0, dim), dtype=np.float32), np.zeros(0, dtype=bool)
+    if not isinstance(rows, np.ndarray):
+        try:
+            rows = np.asarray(rows, dtype=np.float32)
+        except (ValueError, TypeError):
+            rows = None  # Farklı uzunlukta satırlar
+    if rows is not None and rows.ndim == 2:
+        if rows.shape[1] == dim:
+            return rows.astype(np.float32, copy=False), np.ones(count, dtype=bool)
+        return np.empty((count, dim), dtype=np.float32), np.zeros(count, dtype=bool)
+
+    # Düzensiz giriş: satır uzunluklarıyla maske, yalnızca geçerli satırlar kopyalanır
+    source = raw[:limit]
+    lengths = np.fromiter(
+        (len(row) if row is not None else 0 for row in source), dtype=np.int64, count=count
+    )
+    valid = lengths == dim
+    matrix = np.empty((count, dim), dtype=np.float32)
+    if valid.any():
+        matrix[valid] = np.asarray([source[i] for i in np.flatnonzero(valid)], dtype=np.float32)
+    return matrix, valid
+
+
+class LocalEmbeddingFunction:
+    """Paylaşılan LocalEmbedder'ı kullanan Chroma embedding function"""
+
+    def __init__(self, model: Optional[str] = None):
+        self.model = model or config.EMBEDDING_MODEL
+
+    def __call__(self, input):
+        from embedder import get_embedder
+
+        if isinstance(input, str):
+            input = [input]
+        embedder = get_embedder(self.model)
+        return list(embedder.embed_batch_array(list(input), show_progress=False))
+
 
 class ChromaDBManager:
     """Performans optimizasyonlu ChromaDB yönetim sınıfı"""
@@ -26,11 +105,22 @@ class ChromaDBManager:
         self.chroma_path = chroma_path
         self.collection_name = collection_name
         self.client = None
-        self.collection = None
+        self._collection = None
+        self._generation: Optional[str] = None
+        self._generation_checked = 0.0
         self._stats_cache = None
         self._stats_cache_time = None
         self._cache_ttl = 300  # 5 dakika cache
         self._lock = threading.RLock()
+        # Koleksiyona yazan işlemler ile snapshot / sıkıştırma birbirini bekler
+        self._write_lock = threading.RLock()
+
+        # Keyword arama için inverted index (HybridRetriever ile paylaşılır)
+        self.bm25_index = get_bm25_index(chroma_path)
+        self.manifest = get_ingestion_manifest(chroma_path)
+        self.parent_store = get_parent_store(chroma_path)
+        # Kaynak dosya -> chunk ID (silme / durum kontrolleri Chroma'yı taramaz)
+        self.chunk_catalog = get_chunk_catalog(chroma_path)
         
         # Connection pooling için
         self._connection_pool = []
@@ -46,6 +136,50 @@ class ChromaDBManager:
 
         self._initialize_client()
 
+    @property
+    def collection(self):
+        """
+        Güncel koleksiyon handle'ı. Başka bir process koleksiyonu yeniden
+        kurduysa (generation dosyası değiştiyse) koleksiyon adla yeniden alınır.
+        """
+        if self._collection is not None and self.client is not None:
+            now = time.monotonic()
+            if now - self._generation_checked >= GENERATION_CHECK_INTERVAL:
+                self._generation_checked = now
+                generation = self._read_generation()
+                if generation != self._generation:
+                    try:
+                        self._collection = self.client.get_collection(name=self.collection_name)
+                        self._generation = generation
+                        logger.info(f"🔄 Yeniden kurulan koleksiyon alındı: '{self.collection_name}'")
+                    except Exception as e:
+                        # Yer değiştirme diğer process'te sürüyor olabilir; sonraki kontrolde tekrar
+                        logger.warning(f"⚠️ Yeniden kurulan koleksiyon alınamadı: {e}")
+        return self._collection
+
+    @collection.setter
+    def collection(self, value):
+        self._collection = value
+
+    def _generation_path(self) -> str:
+        return os.path.join(self.chroma_path, f"{self.collection_name}{GENERATION_SUFFIX}")
+
+    def _read_generation(self) -> Optional[str]:
+        try:
+            with open(self._generation_path(), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def _publish_generation(self):
+        """Yeni koleksiyon ID'sini diğer process'ler için yaz"""
+        generation = str(getattr(self._collection, "id", "") or time.time_ns())
+        tmp_path = f"{self._generation_path()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(generation)
+        os.replace(tmp_path, self._generation_path())
+        self._generation = generation
+
     def _initialize_client(self):
         """Yeni ChromaDB client konfigürasyonu ile başlatma"""
         try:
@@ -66,29 +200,11 @@ class ChromaDBManager:
             # YENİ ChromaDB client konfigürasyonu (deprecated settings kaldırıldı)
             self.client = chromadb.PersistentClient(path=self.chroma_path)
 
-            # Local embedding function tanımla
-            from embedder import LocalEmbedder
-            
-            def embedding_function(texts):
-                embedder = LocalEmbedder(model=config.EMBEDDING_MODEL)
-                if isinstance(texts, str):
-                    texts = [texts]
-                embeddings = []
-                for text in texts:
-                    embedding = embedder.embed_single(text)
-                    embeddings.append(embedding.tolist())
-                return embeddings
-            
-            # Custom embedding function class
-            class LocalEmbeddingFunction:
-                def __call__(self, input):
-                    return embedding_function(input)
-
             # Collection oluştur/al - Local embedding function ile
             try:
                 self.collection = self.client.get_collection(name=self.collection_name)
             except:
-                self.collection = self.client.create_collection(
+                self.collection = self._recover_compacted_collection() or self.client.create_collection(
                     name=self.collection_name,
                     embedding_function=LocalEmbeddingFunction(),
                     metadata={
@@ -97,9 +213,15 @@ class ChromaDBManager:
                     },
                 )
             
+            self._generation = self._read_generation()
+
             # Dimension uyumluluğunu kontrol et
             self._validate_collection_dimension()
 
+            # Katalog yoksa (ilk açılış / eski kurulum) koleksiyondan bir kez doldur
+            if self.chunk_catalog.is_empty() and self.collection.count() > 0:
+                self.chunk_catalog.rebuild_from_collection(self.collection)
+
             logger.info(f"✅ ChromaDB başlatıldı (yeni konfigürasyon): {self.chroma_path}")
             self._update_stats()
 
@@ -167,7 +289,7 @@ class ChromaDBManager:
                 now = datetime.now()
                 
                 # Cache kontrolü
-                if (self._stats_cache_time and 
+                if (self._stats_cache and self._stats_cache_time and
                     (now - self._stats_cache_time).total_seconds() < self._cache_ttl):
                     self.stats = self._stats_cache.copy()
                     return
@@ -184,26 +306,8 @@ class ChromaDBManager:
                 if os.path.exists(self.chroma_path):
                     self.stats["index_size_mb"] = self._get_directory_size_cached(self.chroma_path)
 
-                # Unique sources - sample-based estimation
-                if count > 0:
-                    # Büyük collection'lar için sampling
-                    sample_size = min(count, 500)  # Daha az sample
-                    sample_metadata = self.collection.get(
-                        limit=sample_size, 
-                        include=["metadatas"]
-                    )
-                    if sample_metadata and sample_metadata.get("metadatas"):
-                        sources = set()
-                        for metadata in sample_metadata["metadatas"] or []:
-                            if metadata and "source_file" in metadata:
-                                sources.add(metadata["source_file"])
-                        
-                        # Estimation for large collections
-                        if sample_size < count:
-                            estimated_sources = len(sources) * (count / sample_size)
-                            self.stats["unique_sources"] = int(estimated_sources)
-                        else:
-                            self.stats["unique_sources"] = len(sources)
+                # Unique sources - chunk kataloğundan (örnekleme / tahmin yok)
+                self.stats["unique_sources"] = self.chunk_catalog.source_count()
                 
                 # Cache güncelle
                 self._stats_cache = self.stats.copy()
@@ -213,131 +317,157 @@ class ChromaDBManager:
             logger.warning(f"İstatistik güncelleme hatası: {e}")
 
     def check_duplicates(self, new_ids: List[str]) -> Dict[str, Any]:
-        """Optimize edilmiş duplicate kontrolü"""
+        """Verilen ID'lerden koleksiyonda zaten olanlar (yalnızca bu ID'ler sorgulanır)"""
         try:
             if not self.collection:
                 return {"error": "collection is None"}
-                
-            # Büyük collection'larda duplicate kontrolü çok yavaş
-            total_count = self.collection.count()
-            
-            # Eğer collection çok büyükse, duplicate kontrolü atla
-            if total_count > 50000:  # 50k'dan fazlaysa
-                logger.info(f"⚠️ Büyük collection ({total_count}), duplicate kontrolü atlanıyor")
-                return {
-                    "total_existing": total_count,
-                    "new_ids_count": len(new_ids),
-                    "duplicates": [],
-                    "duplicate_count": 0,
-                    "skipped_large_collection": True
-                }
-            
-            # Batch'li duplicate kontrolü
-            existing_ids = set()
-            batch_size = 2000  # Daha büyük batch
-            
-            with ThreadPoolExecutor(max_workers=2) as executor:
-                futures = []
-                for offset in range(0, total_count, batch_size):
-                    future = executor.submit(
-                        self._get_ids_batch, 
-                        offset, 
-                        min(batch_size, total_count - offset)
-                    )
-                    futures.append(future)
-                
-                for future in as_completed(futures):
-                    try:
-                        batch_ids = future.result()
-                        existing_ids.update(batch_ids)
-                    except Exception as e:
-                        logger.warning(f"Batch duplicate kontrolü hatası: {e}")
-            
-            duplicates = [id for id in new_ids if id in existing_ids]
-            
+            existing = self._get_existing_metadatas(new_ids)
+            duplicates = [chunk_id for chunk_id in new_ids if chunk_id in existing]
             return {
-                "total_existing": len(existing_ids),
                 "new_ids_count": len(new_ids),
                 "duplicates": duplicates,
                 "duplicate_count": len(duplicates),
             }
-            
         except Exception as e:
             logger.error(f"❌ Duplicate kontrol hatası: {e}")
             return {"error": str(e)}
 
-    def _get_ids_batch(self, offset: int, limit: int) -> List[str]:
-        """Batch halinde ID'leri getir"""
-        try:
-            batch = self.collection.get(
-                limit=limit,
-                offset=offset,
-                include=["ids"]
-            )
-            return batch.get("ids", []) if batch else []
-        except Exception as e:
-            logger.warning(f"ID batch getirme hatası: {e}")
-            return []
+    def _get_existing_metadatas(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """ID -> mevcut metadata; koleksiyonda olmayan ID'ler sonuçta yer almaz"""
+        existing: Dict[str, Dict[str, Any]] = {}
+        for i in range(0, len(ids), ID_PAGE_SIZE):
+            page = self.collection.get(ids=ids[i:i + ID_PAGE_SIZE], include=["metadatas"])
+            for chunk_id, metadata in zip(page.get("ids", []) or [], page.get("metadatas", []) or []):
+                existing[chunk_id] = metadata or {}
+        return existing
 
     def add_documents_batch(
         self,
         data: List[Dict[str, Any]],
         batch_size: int = 2000,  # Daha büyük batch
-        skip_duplicates: bool = False,  # Default false (hızlandırma)
+        skip_duplicates: bool = False,  # Geriye uyumluluk; upsert ile her zaman idempotent
+        progress_callback: Optional[Callable[[Dict[str, int]], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Dokümanları idempotent olarak yaz. Her kayıt bir dosyanın tüm chunk'larıdır:
+        ID'si zaten olan chunk'lar yeniden yazılmaz (yalnızca değişen metadata
+        güncellenir), yeni chunk'lar upsert edilir, dosyada artık bulunmayan eski
+        chunk'lar silinir. progress_callback paketleme sayaçlarını doküman başına alır.
+        """
+        with self._write_lock:
+            return self._write_documents_batch(data, batch_size, progress_callback)
+
+    def _write_documents_batch(
+        self,
+        data: List[Dict[str, Any]],
+        batch_size: int,
+        progress_callback: Optional[Callable[[Dict[str, int]], None]],
     ) -> Dict[str, Any]:
-        """Optimize edilmiş batch doküman ekleme"""
 
         logger.info("🚀 Optimize edilmiş batch doküman ekleme başlıyor...")
 
         if not self.collection:
-            print("❌ Collection None, ekleme yapılamıyor")
+            logger.error("❌ Collection None, ekleme yapılamıyor")
             return {"total_added": 0, "skipped": 0, "errors": ["collection is None"]}
 
         # Verileri parallel işle
         with ThreadPoolExecutor(max_workers=4) as executor:
-            future = executor.submit(self._process_data_batch, data)
+            future = executor.submit(self._process_data_batch, data, progress_callback)
             ids, embeddings, metadatas, documents = future.result()
 
-        total_chunks = len(ids)
-        if total_chunks == 0:
-            logger.warning("⚠️ Eklenecek chunk bulunamadı")
-            return {"total_added": 0, "skipped": 0, "errors": []}
+        # Aynı dosya batch'te birden fazla kez varsa son kayıt geçerli
+        latest = {chunk_id: i for i, chunk_id in enumerate(ids)}
+        if len(latest) != len(ids):
+            keep = sorted(latest.values())
+            ids = [ids[i] for i in keep]
+            embeddings = embeddings[keep]
+            metadatas = [metadatas[i] for i in keep]
+            documents = [documents[i] for i in keep]
 
+        total_chunks = len(ids)
         logger.info(f"📊 Toplam {total_chunks} chunk işlenecek")
 
-        # Conditional duplicate kontrolü
-        duplicate_info = {"duplicates": [], "duplicate_count": 0}
-        if skip_duplicates:
-            logger.info("🔍 Duplicate kontrol yapılıyor...")
-            duplicate_info = self.check_duplicates(ids)
-
-            # Büyük collection'da duplicate kontrolü atlandıysa
-            if duplicate_info.get("skipped_large_collection"):
-                logger.info("⚠️ Büyük collection, duplicate kontrolü atlandı")
-            elif duplicate_info.get("duplicate_count", 0) > 0:
-                logger.info(f"⚠️ {duplicate_info['duplicate_count']} duplicate bulundu")
-                # Duplicate filtering logic...
+        # Dosyaların şu an indekste olan chunk'ları (katalog + manifest). Hiç chunk
+        # paketlenemeyen dosyalar (embedding eksik / boyut hatalı) hesaba katılmaz:
+        # başarısız bir embedding dosyanın önceki sağlam index'ini silmemeli
+        sources = {metadata.get("source_file") for metadata in metadatas}
+        skipped_sources = {item.get("filename", "unknown") for item in data} - sources
+        if skipped_sources:
+            logger.warning(
+                f"⚠️ {len(skipped_sources)} dosyadan chunk paketlenemedi, mevcut index'leri korunuyor: "
+                f"{', '.join(sorted(skipped_sources)[:5])}"
+            )
+        existing_by_source: Dict[str, set] = {}
+        reembedded_sources = set()
+        for source_file in sources:
+            known = set(self.chunk_catalog.ids_for_source(source_file))
+            entry = self.manifest.get(source_file)
+            if entry:
+                known.update(entry.get("chunk_ids", []))
+                # Farklı modelle indekslenmiş dosyanın vektörleri aynı ID'lerle yeniden yazılır
+                if entry.get("embedding_model") not in (None, config.EMBEDDING_MODEL):
+                    reembedded_sources.add(source_file)
+            existing_by_source[source_file] = known
+        existing_ids = set().union(*existing_by_source.values()) if existing_by_source else set()
+
+        # Var olan ID'ler: içerik aynı, yalnızca metadata (sıra, sayfa, parent) değişmiş olabilir
+        current_metadatas = self._get_existing_metadatas([i for i in ids if i in existing_ids])
+        new_idx, changed_idx = [], []
+        for i, chunk_id in enumerate(ids):
+            if chunk_id not in current_metadatas or metadatas[i].get("source_file") in reembedded_sources:
+                new_idx.append(i)
+            elif current_metadatas[chunk_id] != metadatas[i]:
+                changed_idx.append(i)
+        unchanged = total_chunks - len(new_idx) - len(changed_idx)
+
+        # Dosyada artık bulunmayan chunk'lar
+        current_ids = set(ids)
+        stale_ids = sorted(existing_ids - current_ids)
+
+        touched_sources = {metadatas[i].get("source_file") for i in new_idx + changed_idx}
+        if stale_ids:
+            touched_sources.update(
+                source_file for source_file, known in existing_by_source.items() if known - current_ids
+            )
+        # Değişen kaynaklara dayanan cache'li yanıtlar artık geçersiz
+        answer_cache.invalidate_sources(source for source in touched_sources if source)
 
-        # Optimize edilmiş batch ekleme
         total_added = 0
         errors = []
+        failed_ids: set = set()
+
+        if stale_ids:
+            self.delete_chunks(stale_ids, persist=False)
+            logger.info(f"🗑️ {len(stale_ids)} eski chunk silindi")
+
+        for i in range(0, len(changed_idx), ID_PAGE_SIZE):
+            part = changed_idx[i:i + ID_PAGE_SIZE]
+            try:
+                self.collection.update(
+                    ids=[ids[j] for j in part], metadatas=[metadatas[j] for j in part]
+                )
+            except Exception as e:
+                errors.append(f"Metadata güncelleme hatası: {e}")
 
-        print(f"⚡ {len(ids)} chunk ChromaDB'ye eklenecek (batch size: {batch_size})")
+        logger.info(
+            f"⚡ {len(new_idx)} yeni chunk yazılacak, {len(changed_idx)} metadata güncellendi, "
+            f"{unchanged} değişmedi (batch size: {batch_size})"
+        )
 
-        # Parallel batch processing
+        # Parallel batch processing (yalnızca yeni chunk'lar)
         with ThreadPoolExecutor(max_workers=2) as executor:
             futures = []
-            
-            for i in range(0, len(ids), batch_size):
-                end = min(i + batch_size, len(ids))
+            total_batches = (len(new_idx) + batch_size - 1) // batch_size
+            for i in range(0, len(new_idx), batch_size):
+                part = new_idx[i:i + batch_size]
                 future = executor.submit(
                     self._add_batch_chunk,
-                    ids[i:end],
-                    embeddings[i:end],
-                    metadatas[i:end],
-                    documents[i:end],
+                    [ids[j] for j in part],
+                    embeddings[part],
+                    [metadatas[j] for j in part],
+                    [documents[j] for j in part],
                     i // batch_size + 1,
-                    (len(ids) + batch_size - 1) // batch_size
+                    total_batches
                 )
                 futures.append(future)
             
@@ -347,29 +477,100 @@ class ChromaDBManager:
                     total_added += batch_result["added"]
                     if batch_result["error"]:
                         errors.append(batch_result["error"])
+                        failed_ids.update(batch_result.get("ids", []))
                 except Exception as e:
-                    print(f"❌ Batch işleme hatası: {e}")
+                    logger.error(f"❌ Batch işleme hatası: {e}")
                     errors.append(f"Batch processing error: {e}")
 
+        # BM25 index'i (silmeler + eklemeler) tek seferde diske yaz
+        if total_added > 0 or stale_ids:
+            self.bm25_index.save()
+
+        # Child chunk'ların işaret ettiği parent pasajlar
+        for item in data:
+            if item.get("parent_chunks") and item.get("filename", "unknown") in sources:
+                self.parent_store.put_source(item.get("filename", "unknown"), item["parent_chunks"])
+
         # Cache temizle
         self._stats_cache = None
         self._update_stats()
 
+        # Dosyaların güncel chunk ID'leri (ingestion manifest için); başarısız batch'ler hariç
+        ids_by_source: Dict[str, List[str]] = {}
+        for chunk_id, metadata in zip(ids, metadatas):
+            if chunk_id not in failed_ids:
+                ids_by_source.setdefault(metadata.get("source_file"), []).append(chunk_id)
+        self.chunk_catalog.add(ids_by_source)
+
         result = {
             "total_processed": total_chunks,
             "total_added": total_added,
-            "skipped": duplicate_info.get("duplicate_count", 0),
+            "updated": len(changed_idx),
+            "unchanged": unchanged,
+            "removed": len(stale_ids),
+            "ids_by_source": ids_by_source,
+            "skipped": unchanged,
             "errors": errors,
-            "success_rate": total_added / total_chunks if total_chunks > 0 else 0,
+            "success_rate": (total_added + len(changed_idx) + unchanged) / total_chunks if total_chunks > 0 else 0,
         }
 
-        print("✅ Optimize edilmiş batch ekleme tamamlandı")
+        logger.info("✅ Optimize edilmiş batch ekleme tamamlandı")
         return result
 
+    def delete_chunks(self, ids: List[str], page_size: int = 5000, persist: bool = True) -> int:
+        """
+        Chunk'ları ID ile koleksiyondan ve BM25 index'ten sil.
+        persist=False ise BM25 index'i diske yazmak çağırana kalır (toplu işlemlerde tek save).
+        """
+        if not self.collection or not ids:
+            return 0
+        with self._write_lock:
+            for i in range(0, len(ids), page_size):
+                self.collection.delete(ids=ids[i:i + page_size])
+            removed = self.bm25_index.remove_documents(ids, persist=False)
+            if persist and removed:
+                self.bm25_index.save()
+            self.chunk_catalog.remove_ids(ids)
+        self._stats_cache = None
+        return len(ids)
+
+    def delete_source(self, filename: str) -> int:
+        """Dosyanın tüm chunk'larını katalogdaki ID'lerle sil, silinen chunk sayısını döndür"""
+        return self.delete_sources([filename])[filename]
+
+    def delete_sources(self, filenames: List[str]) -> Dict[str, int]:
+        """
+        Dosyaların chunk'larını tek silme turunda kaldır (koleksiyon, BM25 ve
+        manifest birer kez yazılır); dosya başına silinen chunk sayısını döndür.
+        """
+        counts: Dict[str, int] = {}
+        all_names: List[str] = []
+        all_ids: List[str] = []
+        with self._write_lock:
+            for filename in dict.fromkeys(filenames):
+                sources = self.chunk_catalog.resolve_sources(filename)
+                names = list(dict.fromkeys([filename, *sources]))
+                chunk_ids: List[str] = []
+                for source_file in sources:
+                    chunk_ids.extend(self.chunk_catalog.ids_for_source(source_file))
+                # Manifest'te kayıtlı olup katalogda bulunmayan ID'ler de silinir
+                chunk_ids.extend(self.manifest.remove(names, persist=False))
+                chunk_ids = list(dict.fromkeys(chunk_ids))
+                counts[filename] = len(chunk_ids) if self.collection else 0
+                all_names.extend(names)
+                all_ids.extend(chunk_ids)
+            self.manifest.save()
+            self.delete_chunks(list(dict.fromkeys(all_ids)))
+            for name in dict.fromkeys(all_names):
+                self.parent_store.delete_source(name)
+        # Bu dosyalara dayanan cache'li yanıtları düşür
+        answer_cache.invalidate_sources(all_names)
+        return counts
+
     def _add_batch_chunk(
         self, 
         ids: List[str], 
-        embeddings: List[List[float]], 
+        embeddings: np.ndarray,
         metadatas: List[Dict[str, Any]], 
         documents: List[str],
         batch_num: int,
@@ -377,111 +578,132 @@ class ChromaDBManager:
     ) -> Dict[str, Any]:
         """Tek batch'i ekle"""
         try:
-            self.collection.add(
+            # upsert: katalog eksik olsa bile aynı ID iki kez yazılmaz
+            self.collection.upsert(
                 ids=ids,
                 embeddings=embeddings,
                 metadatas=metadatas,
                 documents=documents,
             )
+            self.bm25_index.add_documents(ids, documents, metadatas, persist=False)
             
             batch_size = len(ids)
             logger.info(f"📦 Batch {batch_num}/{total_batches}: {batch_size} chunk eklendi")
             
-            return {"added": batch_size, "error": None}
+            return {"added": batch_size, "ids": ids, "error": None}
             
         except Exception as e:
             error_msg = f"Batch {batch_num} hatası: {e}"
             logger.error(f"❌ {error_msg}")
-            return {"added": 0, "error": error_msg}
+            return {"added": 0, "ids": ids, "error": error_msg}
 
     def _process_data_batch(
-        self, data: List[Dict[str, Any]]
-    ) -> Tuple[List[str], List[List[float]], List[Dict[str, Any]], List[str]]:
-        """Optimize edilmiş veri batch işleme"""
-        ids, embeddings, metadatas, documents = [], [], [], []
-
-        print("İşlem başlatıldı")
-        print(f"Toplam {len(data)} öğe işlenecek.")
-        
-        for idx, item in enumerate(data):
-            print(f"İşleniyor ({idx + 1}/{len(data)}): {item}")
+        self,
+        data: List[Dict[str, Any]],
+        progress_callback: Optional[Callable[[Dict[str, int]], None]] = None,
+    ) -> Tuple[List[str], np.ndarray, List[Dict[str, Any]], List[str]]:
+        """
+        Kayıtları Chroma'ya yazılacak ID / embedding / metadata / doküman listelerine
+        dönüştür. Embedding boyutları doküman başına tek NumPy işlemiyle doğrulanır ve
+        vektörler tek bir (n, dim) float32 matriste döner (satır başına Python
+        listesine çevrilmez); öğe başına çıktı üretilmez, sayaçlar her dokümandan sonra progress_callback'e
+        ve iş sonunda tek bir özet log satırına gider.
+        """
+        dim = config.EMBEDDING_DIMENSION
+        ids, metadatas, documents = [], [], []
+        blocks: List[np.ndarray] = []
+        counters = {
+            "documents": len(data),
+            "processed_documents": 0,
+            "chunks": 0,
+            "packed": 0,
+            "skipped_documents": 0,
+            "skipped_empty": 0,
+            "skipped_dimension": 0,
+            "skipped_unmatched": 0,
+        }
 
+        for item in data:
             filename = item.get("filename", "unknown")
             file_type = item.get("file_type", "unknown")
-            chunks = item.get("chunks", [])
-            chunk_embeddings = item.get("embeddings", [])
-            doc_metadata = item.get("document_metadata", {})
-
-            print(f"  Filename: {filename}")
-            print(f"  File type: {file_type}")
-            print(f"  Chunk sayısı: {len(chunks)}")
-            print(f"  Embedding sayısı: {len(chunk_embeddings)}")
-            print(f"  Document metadata: {doc_metadata}")
-
-            # Hızlı validation
-            min_count = min(len(chunks), len(chunk_embeddings))
-            print(f"  Min chunk ve embedding sayısı: {min_count}")
-            
-            if min_count == 0:
-                print("  ⚠️ Boş chunk veya embedding bulundu, atlanıyor")
-                continue
+            chunks = item.get("chunks") or []
+            chunk_metadata = item.get("chunk_metadata") or []
+            has_parents = bool(item.get("parent_chunks"))
 
-            # Vectorized operations
-            for idx in range(min_count):
-                chunk = chunks[idx]
-                if not chunk or not chunk.strip():
-                    print(f"  ⚠️ Boş veya sadece boşluklardan oluşan chunk atlanıyor: {chunk}")
-                    continue
+            matrix, valid = _embedding_matrix(item.get("embeddings"), len(chunks), dim)
+            count = len(valid)
+            counters["processed_documents"] += 1
+            counters["chunks"] += len(chunks)
+            counters["skipped_unmatched"] += len(chunks) - count
 
-                embedding = chunk_embeddings[idx]
-                if len(embedding) != config.EMBEDDING_DIMENSION:
-                    print(f"⚠️ Geçersiz embedding boyutu bulundu: {len(embedding)} (Beklenen: {config.EMBEDDING_DIMENSION}), chunk: {chunk}")
-                    continue
+            if count == 0:
+                counters["skipped_documents"] += 1
+                if progress_callback:
+                    progress_callback(dict(counters))
+                continue
 
-                if not embedding or len(embedding) != config.EMBEDDING_DIMENSION:
-                    print(f"  ⚠️ Geçersiz embedding bulundu, atlanıyor: {embedding}")
-                    continue
+            nonempty = np.fromiter(
+                (bool(chunk and chunk.strip()) for chunk in chunks[:count]), dtype=bool, count=count
+            )
+            keep = np.flatnonzero(valid & nonempty)
+            counters["skipped_empty"] += int(count - nonempty.sum())
+            counters["skipped_dimension"] += int((nonempty & ~valid).sum())
+            if keep.size:
+                blocks.append(matrix[keep])
+
+            # Doküman düzeyindeki alanlar chunk başına değil bir kez hazırlanır
+            doc_metadata = item.get("document_metadata") or {}
+            doc_fields = {
+                f"doc_{key}": str(doc_metadata[key])
+                for key in ["title", "author", "created_date"]  # Sadece önemli alanlar
+                if doc_metadata.get(key)
+            }
 
-                # Optimize edilmiş ID generation
-                unique_id = f"{filename}_{idx}_{len(chunk)}"
-                print(f"  Oluşturulan unique_id: {unique_id}")
+            seen_chunks: Dict[str, int] = {}
+            for idx in keep.tolist():
+                chunk = chunks[idx]
+                # İçerik adresli ID (aynı içerik yeniden yüklemede aynı ID'yi alır)
+                occurrence = seen_chunks.get(chunk, 0)
+                seen_chunks[chunk] = occurrence + 1
 
-                # Minimal metadata
                 metadata = {
                     "source_file": filename,
                     "file_type": file_type,
                     "chunk_index": idx,
                     "chunk_length": len(chunk),
+                    **doc_fields,
                 }
-
-                print(f"  Meta verisi: {metadata}")
-
-                # Sadece gerekli doc metadata ekle
-                if doc_metadata:
-                    for key in ["title", "author", "created_date"]:  # Sadece önemli alanlar
-                        if key in doc_metadata and doc_metadata[key]:
-                            metadata[f"doc_{key}"] = str(doc_metadata[key])
-                            print(f"  Eklendi doc_metadata: {key} -> {doc_metadata[key]}")
-
-                ids.append(unique_id)
-                embeddings.append(embedding)
+                # Sayfa aralığı ve parent pasaj referansı (tokenizer-aware chunking)
+                extra = chunk_metadata[idx] if idx < len(chunk_metadata) else None
+                if extra:
+                    for key in ["page_start", "page_end", "token_count"]:
+                        if extra.get(key) is not None:
+                            metadata[key] = extra[key]
+                    if extra.get("parent_index") is not None and has_parents:
+                        metadata["parent_id"] = make_parent_id(filename, extra["parent_index"])
+
+                ids.append(make_chunk_id(filename, chunk, occurrence))
                 metadatas.append(metadata)
                 documents.append(chunk)
 
-                print(f"  Veriler eklendi - ID: {unique_id}, Chunk length: {len(chunk)}")
+            counters["packed"] = len(ids)
+            if progress_callback:
+                progress_callback(dict(counters))
 
-        # İşlem sonrasında verileri print ile yazdır
-        print(f"\nİşlem tamamlandı:")
-        print(f"Toplam chunk sayısı: {len(ids)}")
-        print(f"Toplam embedding sayısı: {len(embeddings)}")
-        print(f"Toplam metadata sayısı: {len(metadatas)}")
-        print(f"Toplam document sayısı: {len(documents)}")
+        # Chroma numpy matrisini doğrudan kabul eder
+        embeddings = np.vstack(blocks) if blocks else np.empty((0, dim), dtype=np.float32)
 
-        # Ayrıca, her listeyi tek tek de print ile yazdırabilirsin
-        print(f"Örnek IDs: {ids[:1]}")  # İlk 1 ID
-        print(f"Örnek Embeddings: {embeddings[:1]}")  # İlk 1 embedding
-        print(f"Örnek Metadatas: {metadatas[:1]}")  # İlk 1 metadata
-        print(f"Örnek Documents: {documents[:1]}")  # İlk 1 document
+        logger.info(
+            f"📦 {counters['documents']} doküman paketlendi: {counters['packed']}/{counters['chunks']} chunk"
+        )
+        skipped = counters["skipped_empty"] + counters["skipped_dimension"] + counters["skipped_unmatched"]
+        if skipped or counters["skipped_documents"]:
+            logger.warning(
+                f"⚠️ Atlanan: {counters['skipped_documents']} doküman, "
+                f"{counters['skipped_empty']} boş chunk, "
+                f"{counters['skipped_dimension']} geçersiz boyut (beklenen {dim}), "
+                f"{counters['skipped_unmatched']} embedding'i olmayan chunk"
+            )
 
         return ids, embeddings, metadatas, documents
 
@@ -587,11 +809,15 @@ class ChromaDBManager:
                 return {"error": "collection is None"}
                 
             count = self.collection.count()
+            chunks_by_source = self.chunk_catalog.sources()
             info = {
                 "collection_name": self.collection_name,
                 "total_chunks": count,
                 "chroma_path": self.chroma_path,
                 "stats": self.get_stats(),
+                "unique_sources": list(chunks_by_source),
+                "source_count": len(chunks_by_source),
+                "chunks_by_source": chunks_by_source,
                 "performance_optimized": True,
             }
             
@@ -639,91 +865,500 @@ class ChromaDBManager:
         """Collection'ı sıfırla (yeni yapı için)"""
         try:
             if self.client and self.collection_name:
-                try:
-                    self.client.delete_collection(name=self.collection_name)
-                    logger.info(f"✅ Collection '{self.collection_name}' silindi")
-                except Exception as e:
-                    logger.warning(f"Collection silme hatası: {e}")
-                
-                # Local embedding function tanımla
-                from embedder import LocalEmbedder
-                
-                def embedding_function(texts):
-                    embedder = LocalEmbedder(model=config.EMBEDDING_MODEL)
-                    if isinstance(texts, str):
-                        texts = [texts]
-                    embeddings = []
-                    for text in texts:
-                        embedding = embedder.embed_single(text)
-                        embeddings.append(embedding.tolist())
-                    return embeddings
-                
-                # Custom embedding function class
-                class LocalEmbeddingFunction:
-                    def __call__(self, input):
-                        return embedding_function(input)
-                
-                # Yeniden oluştur - Local embedding function ile
-                self.collection = self.client.create_collection(
-                    name=self.collection_name,
-                    embedding_function=LocalEmbeddingFunction(),
-                    metadata={
-                        "hnsw:space": "cosine",
-                        "description": "RAG documents collection with local embeddings"
-                    },
-                )
+                with self._write_lock:
+                    try:
+                        self.client.delete_collection(name=self.collection_name)
+                        logger.info(f"✅ Collection '{self.collection_name}' silindi")
+                    except Exception as e:
+                        logger.warning(f"Collection silme hatası: {e}")
+                    self.bm25_index.clear()
+                    self.manifest.remove(list(self.manifest.files))
+                    self.parent_store.clear()
+                    self.chunk_catalog.clear()
+
+                    # Yeniden oluştur - Local embedding function ile
+                    self.collection = self.client.create_collection(
+                        name=self.collection_name,
+                        embedding_function=LocalEmbeddingFunction(),
+                        metadata={
+                            "hnsw:space": "cosine",
+                            "description": "RAG documents collection with local embeddings"
+                        },
+                    )
+                    self._publish_generation()
                 logger.info(f"✅ Collection '{self.collection_name}' yeniden oluşturuldu")
                 
         except Exception as e:
             logger.error(f"❌ Collection reset hatası: {e}")
             raise
 
+    def _sync_catalog(self):
+        """Katalog koleksiyonla aynı sayıda chunk tutmuyorsa koleksiyondan yeniden kur"""
+        if self.chunk_catalog.get_stats()["chunks"] != self.collection.count():
+            logger.warning("⚠️ Chunk kataloğu koleksiyonla uyumsuz, yeniden oluşturuluyor")
+            self.chunk_catalog.rebuild_from_collection(self.collection, page_size=ID_PAGE_SIZE)
+
+    def create_backup(self, name: Optional[str] = None) -> str:
+        """
+        Chroma dizininin artımlı snapshot'ını al, snapshot dizinini döndür.
+        Değişmeyen dosyalar önceki snapshot'a hard link, SQLite dosyaları backup
+        API'siyle alınır; snapshot sürerken koleksiyona yazma beklenir.
+        """
+        started = time.perf_counter()
+        with self._write_lock:
+            snapshot = create_snapshot(
+                self.chroma_path,
+                config.CHROMA_BACKUP_DIR,
+                name=name,
+                keep=config.CHROMA_BACKUP_KEEP,
+            )
+        methods = snapshot["methods"]
+        logger.info(
+            f"💾 Backup oluşturuldu: {snapshot['path']} ({snapshot['file_count']} dosya, "
+            f"{snapshot['written_mb']:.2f}/{snapshot['total_mb']:.2f} MB yazıldı, "
+            f"{methods['link']} link, {methods['sqlite']} sqlite, "
+            f"{methods['clone'] + methods['copy']} kopya, {time.perf_counter() - started:.2f} sn)"
+        )
+        return snapshot["path"]
+
+    def iter_export(
+        self,
+        include_embeddings: bool = True,
+        embedding_dtype: str = "float32",
+        page_size: int = ID_PAGE_SIZE,
+        stats: Optional[Dict[str, int]] = None,
+    ) -> Iterator[str]:
+        """
+        Koleksiyonun JSON dışa aktarımını metin parçaları halinde üret. Kayıtlar
+        chunk kataloğundaki ID'lerle sayfa sayfa okunur (koleksiyon belleğe alınmaz);
+        her parça bir sayfadır. Embedding'ler base64 kodlu embedding_dtype
+        ("float32" / "float16") baytlarıdır. Geçersiz argümanlarda hemen ValueError.
+        """
+        if not self.collection:
+            raise ValueError("collection is None")
+        if embedding_dtype not in ("float32", "float16"):
+            raise ValueError(f"Desteklenmeyen embedding tipi: {embedding_dtype}")
+        stats = stats if stats is not None else {}
+        stats.update(exported=0, pages=0)
+        return self._iter_export(include_embeddings, embedding_dtype, page_size, stats)
+
+    def _iter_export(
+        self, include_embeddings: bool, embedding_dtype: str, page_size: int, stats: Dict[str, int]
+    ) -> Iterator[str]:
+        include = ["documents", "metadatas"] + (["embeddings"] if include_embeddings else [])
+        self._sync_catalog()
+        header = {
+            "collection": self.collection_name,
+            "exported_at": datetime.now().isoformat(),
+            "count": self.collection.count(),
+            "embedding_model": config.EMBEDDING_MODEL,
+            "embedding_dimension": config.EMBEDDING_DIMENSION if include_embeddings else None,
+            "embedding_dtype": embedding_dtype if include_embeddings else None,
+            "embedding_encoding": "base64" if include_embeddings else None,
+        }
+        # Başlık alanları + kayıtlar dizisi; kayıtlar sayfa sayfa eklenir
+        yield json.dumps(header, ensure_ascii=False)[:-1] + ', "records": ['
+        separator = "\n"
+        for page_ids in self.chunk_catalog.iter_id_pages(page_size):
+            page = self.collection.get(ids=page_ids, include=include)
+            page_ids = page.get("ids", []) or []
+            documents = page.get("documents") or [None] * len(page_ids)
+            metadatas = page.get("metadatas") or [None] * len(page_ids)
+            vectors = None
+            if include_embeddings and len(page_ids):
+                vectors = np.asarray(page.get("embeddings"), dtype=embedding_dtype)
+            parts = []
+            for i, chunk_id in enumerate(page_ids):
+                record = {"id": chunk_id, "document": documents[i], "metadata": metadatas[i]}
+                if vectors is not None:
+                    record["embedding"] = base64.b64encode(vectors[i].tobytes()).decode("ascii")
+                parts.append(separator + json.dumps(record, ensure_ascii=False))
+                separator = ",\n"
+            stats["exported"] += len(page_ids)
+            stats["pages"] += 1
+            if parts:
+                yield "".join(parts)
+        yield "\n]}\n"
+
+    def export_data(
+        self,
+        output_file: str,
+        include_embeddings: bool = True,
+        embedding_dtype: str = "float32",
+        page_size: int = ID_PAGE_SIZE,
+    ) -> Dict[str, Any]:
+        """
+        Koleksiyonu JSON dosyasına dışa aktar (bkz. iter_export). Dosya aynı dizinde
+        benzersiz bir geçici dosyaya yazılıp yerine taşınır; eşzamanlı export'lar
+        birbirinin yarım dosyasını ezmez.
+        """
+        started = time.perf_counter()
+        stats: Dict[str, int] = {}
+        try:
+            chunks = self.iter_export(include_embeddings, embedding_dtype, page_size, stats)
+        except ValueError as e:
+            return {"error": str(e)}
+
+        directory = os.path.dirname(output_file) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(
+            prefix=f".{os.path.basename(output_file)}.", suffix=".tmp", dir=directory
+        )
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(tmp_path, output_file)
+        except Exception as e:
+            logger.error(f"❌ Export hatası: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return {"error": str(e)}
+
+        duration = time.perf_counter() - started
+        size_mb = os.path.getsize(output_file) / (1024 * 1024)
+        logger.info(
+            f"📤 {stats['exported']} chunk dışa aktarıldı: {output_file} ({size_mb:.2f} MB, {duration:.2f} sn)"
+        )
+        return {
+            "output_file": output_file,
+            "exported": stats["exported"],
+            "pages": stats["pages"],
+            "include_embeddings": include_embeddings,
+            "embedding_dtype": embedding_dtype if include_embeddings else None,
+            "size_mb": round(size_mb, 2),
+            "duration_seconds": round(duration, 3),
+        }
+
+    def _recover_compacted_collection(self):
+        """Sıkıştırma eski koleksiyonu silip yeniden adlandırmadan kesildiyse kopyayı geri al"""
+        try:
+            collection = self.client.get_collection(name=f"{self.collection_name}{COMPACT_SUFFIX}")
+        except Exception:
+            return None
+        collection.modify(name=self.collection_name)
+        logger.warning(f"⚠️ Yarım kalan sıkıştırma kurtarıldı: '{self.collection_name}'")
+        return collection
+
+    def _rebuild_collection(self) -> int:
+        """
+        Koleksiyonu yeni bir koleksiyona sayfa sayfa kopyalayıp yer değiştir;
+        silinmiş kayıtların HNSW'de bıraktığı boşluklar yeni index'e taşınmaz.
+        """
+        self._sync_catalog()
+        compact_name = f"{self.collection_name}{COMPACT_SUFFIX}"
+        try:
+            self.client.delete_collection(name=compact_name)  # Önceki yarım deneme
+        except Exception:
+            pass
+        target = self.client.create_collection(
+            name=compact_name,
+            embedding_function=LocalEmbeddingFunction(),
+            metadata=self.collection.metadata or {
+                "hnsw:space": "cosine",
+                "description": "RAG documents collection with local embeddings"
+            },
+        )
+
+        copied = 0
+        for page_ids in self.chunk_catalog.iter_id_pages(ID_PAGE_SIZE):
+            page = self.collection.get(ids=page_ids, include=["embeddings", "documents", "metadatas"])
+            if len(page["ids"]):
+                target.add(
+                    ids=page["ids"],
+                    embeddings=page["embeddings"],
+                    documents=page["documents"],
+                    metadatas=page["metadatas"],
+                )
+                copied += len(page["ids"])
+
+        expected = self.collection.count()
+        if target.count() != expected:
+            self.client.delete_collection(name=compact_name)
+            raise RuntimeError(f"Sıkıştırma kopyası eksik ({target.count()}/{expected}), iptal edildi")
+
+        # Önce okuyucular tam kopyaya geçer, eski koleksiyon ancak sonra silinir;
+        # handle ID'ye bağlı olduğundan yeniden adlandırma okuyucuları etkilemez
+        self.collection = target
+        self.client.delete_collection(name=self.collection_name)
+        target.modify(name=self.collection_name)
+        self._publish_generation()
+        return copied
+
+    def optimize_collection(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Yoğun silmelerden sonra depoyu sıkıştır: son sıkıştırmadan beri silinen
+        chunk oranı CHROMA_COMPACT_MIN_DELETED_RATIO'yu geçtiyse (veya force)
+        koleksiyon yeniden kurulur; ardından dizindeki SQLite dosyalarının WAL'ı
+        işlenir ve VACUUM ile boş sayfalar geri verilir.
+        """
+        if not self.collection:
+            return {"error": "collection is None"}
+
+        started = time.perf_counter()
+        steps = []
+        with self._write_lock:
+            self._get_directory_size_cached.cache_clear()
+            size_before = self._get_directory_size_cached(self.chroma_path)
+            count = self.collection.count()
+            deleted = self.chunk_catalog.deleted_since_compact()
+            deleted_ratio = deleted / (count + deleted) if count + deleted else 0.0
+
+            rebuilt = False
+            if force or (deleted and deleted_ratio >= config.CHROMA_COMPACT_MIN_DELETED_RATIO):
+                copied = self._rebuild_collection()
+                self.chunk_catalog.reset_deleted()
+                rebuilt = True
+                steps.append({"step": "rebuild_collection", "chunks": copied})
+
+            for filename in sorted(os.listdir(self.chroma_path)):
+                path = os.path.join(self.chroma_path, filename)
+                if not os.path.isfile(path) or not is_sqlite_file(path):
+                    continue
+                try:
+                    steps.append({"step": "vacuum", **compact_sqlite(path)})
+                except Exception as e:
+                    logger.warning(f"⚠️ {filename} sıkıştırılamadı: {e}")
+                    steps.append({"step": "vacuum", "file": filename, "error": str(e)})
+
+            self.clear_cache()
+            size_after = self._get_directory_size_cached(self.chroma_path)
+
+        self._update_stats()
+        duration = time.perf_counter() - started
+        logger.info(
+            f"🧹 Optimizasyon tamamlandı: {size_before:.2f} MB -> {size_after:.2f} MB "
+            f"(yeniden kurulum: {'evet' if rebuilt else 'hayır'}, {duration:.2f} sn)"
+        )
+        return {
+            "chunks": count,
+            "deleted_since_compact": deleted,
+            "deleted_ratio": round(deleted_ratio, 4),
+            "rebuilt": rebuilt,
+            "size_before_mb": round(size_before, 2),
+            "size_after_mb": round(size_after, 2),
+            "reclaimed_mb": round(size_before - size_after, 2),
+            "steps": steps,
+            "duration_seconds": round(duration, 3),
+        }
+
+
+_managers = PathRegistry()
+
+
+def get_chroma_manager(
+    chroma_path: str = "./chroma", collection_name: str = "rag_documents"
+) -> ChromaDBManager:
+    """Chroma dizini + koleksiyon başına process genelinde tek manager döndür"""
+    return _managers.get(
+        chroma_path, lambda: ChromaDBManager(chroma_path, collection_name), collection_name
+    )
+
+
+def benchmark_import(num_docs: int = 200, chunks_per_doc: int = 100) -> Dict[str, Dict[str, Any]]:
+    """
+    Sentetik korpusta import hızı: yalnızca paketleme adımı (_process_data_batch)
+    ve geçici bir Chroma dizinine uçtan uca add_documents_batch. stdout log
+    dosyasına yönlendirilir; log boyutu yazma yolundaki gürültüyü gösterir.
+    """
+    import tempfile
+    import contextlib
+
+    rng = np.random.default_rng(42)
+    vocabulary = ["öğrenci", "madde", "yönetmelik", "sınav", "ders", "kredi", "fakülte", "senato"]
+    data = []
+    for d in range(num_docs):
+        words = rng.choice(vocabulary, size=(chunks_per_doc, 120))
+        vectors = rng.standard_normal((chunks_per_doc, config.EMBEDDING_DIMENSION)).astype(np.float32)
+        data.append(
+            {
+                "filename": f"bench_{d}.pdf",
+                "file_type": "pdf",
+                "chunks": [f"{d}-{c} " + " ".join(row) for c, row in enumerate(words)],
+                "embeddings": vectors,
+                "document_metadata": {"title": f"Belge {d}"},
+            }
+        )
+    total_chunks = num_docs * chunks_per_doc
+    results: Dict[str, Dict[str, Any]] = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "import.log")
+
+        def timed(name: str, func) -> None:
+            with open(log_path, "w", encoding="utf-8") as log, contextlib.redirect_stdout(log):
+                started = time.perf_counter()
+                func()
+                elapsed = time.perf_counter() - started
+            log_mb = os.path.getsize(log_path) / (1024 * 1024)
+            results[name] = {
+                "seconds": round(elapsed, 3),
+                "chunks_per_second": round(total_chunks / elapsed) if elapsed else None,
+                "log_mb": round(log_mb, 2),
+            }
+            print(
+                f"⏱️ {name:<16} {elapsed:8.3f} sn | {total_chunks / elapsed:10,.0f} chunk/sn | "
+                f"log {log_mb:8.2f} MB"
+            )
+
+        manager = ChromaDBManager(os.path.join(tmp, "chroma_bench"))
+        timed("pack", lambda: manager._process_data_batch(data))
+        # Uçtan uca: boş koleksiyona
+        timed("import", lambda: manager.add_documents_batch(data))
+
+    return results
+
+
+def benchmark_ingestion_memory(num_chunks: int = 20000, chunks_per_doc: int = 100) -> Dict[str, Dict[str, Any]]:
+    """
+    Embedder çıktısından Chroma'ya kadar tepe bellek (tracemalloc) ve süre:
+    eski list[float] hattı (satır dizileri -> tolist -> JSON -> parse) ile
+    tek float32 matris hattı (base64 JSONL -> matris dilimleri) karşılaştırılır.
+    Model çağrısı ölçüme dahil değildir; çıktısı sabit bir matrisle taklit edilir.
+    """
+    import tempfile
+    import tracemalloc
+    from jsonl_io import encode_embeddings, decode_embeddings
+
+    rng = np.random.default_rng(42)
+    num_docs = max(1, num_chunks // chunks_per_doc)
+    docs = [
+        (
+            f"bench_{d}.pdf",
+            [f"{d}-{c} yönetmelik madde {c}" for c in range(chunks_per_doc)],
+            rng.standard_normal((chunks_per_doc, config.EMBEDDING_DIMENSION)).astype(np.float32),
+        )
+        for d in range(num_docs)
+    ]
+    total_chunks = num_docs * chunks_per_doc
+
+    def lists_pipeline(manager: "ChromaDBManager"):
+        for filename, chunks, output in docs:
+            rows = [row.copy() for row in output]  # Eski embed_batch: satır başına dizi
+            record = {"filename": filename, "chunks": chunks, "embeddings": [row.tolist() for row in rows]}
+            line = json.dumps(record, ensure_ascii=False)
+            manager.add_documents_batch([json.loads(line)])
+
+    def matrix_pipeline(manager: "ChromaDBManager"):
+        for filename, chunks, output in docs:
+            record = {"filename": filename, "chunks": chunks, "embeddings": encode_embeddings(output)}
+            line = json.dumps(record, ensure_ascii=False)
+            parsed = json.loads(line)
+            parsed["embeddings"] = decode_embeddings(parsed["embeddings"])
+            manager.add_documents_batch([parsed])
+
+    results: Dict[str, Dict[str, Any]] = {}
+    previous_level = logger.level
+    logger.setLevel(logging.WARNING)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, pipeline in [("before_lists", lists_pipeline), ("after_matrix", matrix_pipeline)]:
+                # Süre ve tepe bellek ayrı koleksiyonlarda ölçülür (tracemalloc yavaşlatır)
+                manager = ChromaDBManager(os.path.join(tmp, f"{name}_time"))
+                started = time.perf_counter()
+                pipeline(manager)
+                elapsed = time.perf_counter() - started
+
+                manager = ChromaDBManager(os.path.join(tmp, f"{name}_memory"))
+                tracemalloc.start()
+                pipeline(manager)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                peak_mb = peak / (1024 * 1024)
+                results[name] = {
+                    "seconds": round(elapsed, 3),
+                    "chunks_per_second": round(total_chunks / elapsed) if elapsed else None,
+                    "peak_mb": round(peak_mb, 1),
+                }
+                print(
+                    f"🧠 {name:<13} {elapsed:8.3f} sn | {total_chunks / elapsed:10,.0f} chunk/sn | "
+                    f"tepe bellek {peak_mb:8.1f} MB"
+                )
+    finally:
+        logger.setLevel(previous_level)
+    return results
+
 
 def main():
     """Optimize edilmiş main function"""
+    from jsonl_io import iter_records
+
     chroma_path = "./chroma"
-    input_file = "uploads_with_embed.json"
+    input_file = "uploads_with_embed.jsonl"
     collection_name = "rag_documents"
+    flush_chunks = 2000  # Bu kadar chunk biriktikçe ChromaDB'ye yazılır
 
     logging.basicConfig(
         level=logging.INFO, 
         format="%(asctime)s - %(levelname)s - %(message)s"
     )
 
-    logger.info("🚀 YENİ CHROMADB KONFİGÜRASYONU ile uploads_with_embed.json aktarılıyor...")
+    if len(sys.argv) > 1 and sys.argv[1] == "benchmark":
+        # python chroma.py benchmark [doküman sayısı] [doküman başına chunk]
+        num_docs = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+        chunks_per_doc = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+        benchmark_import(num_docs, chunks_per_doc)
+        return
+    if len(sys.argv) > 1 and sys.argv[1] == "benchmark-memory":
+        # python chroma.py benchmark-memory [chunk sayısı]
+        num_chunks = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+        benchmark_ingestion_memory(num_chunks)
+        return
 
-    if not os.path.exists(input_file):
+    follow = "--follow" in sys.argv[1:]
+    logger.info(f"🚀 YENİ CHROMADB KONFİGÜRASYONU ile {input_file} aktarılıyor...")
+
+    if not follow and not os.path.exists(input_file):
         logger.error(f"❌ Giriş dosyası bulunamadı: {input_file}")
         return
 
     try:
         # Yeni konfigürasyon ile manager
-        chroma_manager = ChromaDBManager(chroma_path, collection_name)
-
-        logger.info(f"📄 JSON dosyası yükleniyor: {input_file}")
-        with open(input_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-
-        if not data:
-            logger.warning(f"⚠️ JSON dosyası boş: {input_file}")
+        chroma_manager = get_chroma_manager(chroma_path, collection_name)
+
+        logger.info(f"📄 JSONL akışı okunuyor: {input_file}")
+        totals = {"documents": 0, "total_processed": 0, "total_added": 0, "succeeded": 0.0, "errors": 0}
+        pending, pending_chunks = [], 0
+
+        def flush():
+            # Optimize edilmiş batch import
+            result = chroma_manager.add_documents_batch(
+                data=pending,
+                batch_size=2000,        # Daha büyük batch
+                skip_duplicates=False   # Hızlandırma için false
+            )
+            totals["total_processed"] += result.get("total_processed", 0)
+            totals["total_added"] += result.get("total_added", 0)
+            # Eklenen + güncellenen + zaten güncel olan chunk'lar başarılı sayılır
+            totals["succeeded"] += result.get("success_rate", 0) * result.get("total_processed", 0)
+            totals["errors"] += len(result.get("errors", []))
+
+        for item in iter_records(input_file, follow=follow):
+            pending.append(item)
+            pending_chunks += len(item.get("chunks", []))
+            totals["documents"] += 1
+            if pending_chunks >= flush_chunks:
+                flush()
+                pending, pending_chunks = [], 0
+        if pending:
+            flush()
+
+        if totals["documents"] == 0:
+            logger.warning(f"⚠️ JSONL dosyası boş: {input_file}")
             return
 
-        logger.info(f"📊 {len(data)} doküman bulundu")
-
-        # Optimize edilmiş batch import
-        result = chroma_manager.add_documents_batch(
-            data=data, 
-            batch_size=2000,        # Daha büyük batch
-            skip_duplicates=False   # Hızlandırma için false
+        success_rate = (
+            totals["succeeded"] / totals["total_processed"] if totals["total_processed"] else 0
         )
-
         logger.info("📊 YENİ KONFİGÜRASYON IMPORT RAPORU:")
-        logger.info(f"   İşlenen: {result['total_processed']:,}")
-        logger.info(f"   Eklenen: {result['total_added']:,}")
-        logger.info(f"   Başarı oranı: {result['success_rate']:.1%}")
+        logger.info(f"   Doküman: {totals['documents']:,}")
+        logger.info(f"   İşlenen: {totals['total_processed']:,}")
+        logger.info(f"   Eklenen: {totals['total_added']:,}")
+        logger.info(f"   Başarı oranı: {success_rate:.1%}")
         
-        if result["errors"]:
-            logger.warning(f"⚠️ {len(result['errors'])} hata oluştu")
+        if totals["errors"]:
+            logger.warning(f"⚠️ {totals['errors']} hata oluştu")
 
         # Final istatistikler
         final_stats = chroma_manager.get_stats()
@@ -737,6 +1372,5 @@ def main():
         logger.error(f"❌ Ana işlem hatası: {e}")
         raise
 
-
 if __name__ == "__main__":
     main()
\ No newline at end of file
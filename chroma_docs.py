@@ -1,45 +1,114 @@
 # chroma_docs.py
 """
-Sadece embedded_data.json'u ChromaDB'ye ekler (docs klasöründeki dosyalar için).
+Sadece embedded_data.jsonl'u ChromaDB'ye ekler (docs klasöründeki dosyalar için).
+
+Ingestion manifest'i güncellenir: değişen dosyalarda yalnızca değişen
+chunk'lar yazılır / silinir (içerik adresli ID'ler), docs klasöründen
+silinen dosyaların chunk'ları koleksiyondan kaldırılır.
+Kayıtlar akış halinde okunur ve birkaç doküman biriktikçe eklenir;
+--follow ile embedder_docs dosyayı hâlâ yazarken indekslemeye başlanır.
+
+Kullanım: python chroma_docs.py [--follow]
 """
 import os
-import json
-from chroma import ChromaDBManager
+import sys
+from chroma import get_chroma_manager
+from ingestion_manifest import is_current
+from jsonl_io import iter_records
 import logging
 
+# Bu kadar chunk biriktiğinde ChromaDB'ye yazılır
+INDEX_FLUSH_CHUNKS = 1000
+
+def index_pending(chroma_manager, pending, logger):
+    """Biriken kayıtları ekle ve manifest'e işle, (işlenen, eklenen, başarılı) döndür"""
+    result = chroma_manager.add_documents_batch(
+        data=pending, batch_size=1000, skip_duplicates=True
+    )
+    manifest = chroma_manager.manifest
+    ids_by_source = result.get("ids_by_source", {})
+    for item in pending:
+        chunk_ids = ids_by_source.get(item["filename"], [])
+        if not chunk_ids:
+            continue
+        manifest.record(
+            item["filename"],
+            item.get("source_path"),
+            item.get("document_metadata", {}).get("checksum"),
+            chunk_ids,
+            persist=False,
+        )
+    manifest.save()
+    if result.get("errors"):
+        logger.warning(f"⚠️ {len(result['errors'])} batch hatası")
+    processed = result.get("total_processed", 0)
+    # Eklenen + güncellenen + zaten güncel olan chunk'lar başarılı sayılır
+    return processed, result.get("total_added", 0), result.get("success_rate", 0) * processed
+
 def main():
-    INPUT_JSON = "embedded_data.json"
-    if not os.path.exists(INPUT_JSON):
-        print(f"[chroma_docs] {INPUT_JSON} yok.")
+    INPUT_JSONL = "embedded_data.jsonl"
+    follow = "--follow" in sys.argv[1:]
+    if not follow and not os.path.exists(INPUT_JSONL):
+        print(f"[chroma_docs] {INPUT_JSONL} yok.")
         return
-    
+
     logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
     logger = logging.getLogger(__name__)
-    
-    chroma_manager = ChromaDBManager()
-    
-    logger.info(f"📄 JSON dosyası yükleniyor: {INPUT_JSON}")
-    with open(INPUT_JSON, "r", encoding="utf-8") as f:
-        data = json.load(f)
-    
-    if not data:
-        logger.warning(f"⚠️ JSON dosyası boş: {INPUT_JSON}")
+
+    chroma_manager = get_chroma_manager()
+    manifest = chroma_manager.manifest
+
+    # docs klasöründen silinen dosyaların chunk'larını kaldır
+    removed_files = manifest.missing_files()
+    if removed_files:
+        removed_count = sum(chroma_manager.delete_sources(removed_files).values())
+        logger.info(f"🗑️ {len(removed_files)} silinmiş dosyanın {removed_count} chunk'ı kaldırıldı")
+
+    logger.info(f"📄 JSONL akışı okunuyor: {INPUT_JSONL}")
+
+    # Zaten aynı checksum + model + chunking ayarlarıyla indekslenmiş dosyaları atla
+    pending = []
+    pending_chunks = 0
+    documents = processed = added = 0
+    succeeded = 0.0
+    for item in iter_records(INPUT_JSONL, follow=follow):
+        filename = item.get("filename")
+        checksum = item.get("document_metadata", {}).get("checksum")
+        entry = manifest.get(filename)
+        if entry:
+            if entry.get("checksum") == checksum and is_current(entry) and entry.get("chunk_ids"):
+                logger.info(f"⏭️ Değişmemiş, atlanıyor: {filename}")
+                continue
+            logger.info(f"♻️ Değişen dosya, yalnızca farklı chunk'lar yazılacak: {filename}")
+
+        pending.append(item)
+        pending_chunks += len(item.get("chunks", []))
+        documents += 1
+        if pending_chunks >= INDEX_FLUSH_CHUNKS:
+            batch_processed, batch_added, batch_succeeded = index_pending(chroma_manager, pending, logger)
+            processed += batch_processed
+            added += batch_added
+            succeeded += batch_succeeded
+            pending, pending_chunks = [], 0
+
+    if pending:
+        batch_processed, batch_added, batch_succeeded = index_pending(chroma_manager, pending, logger)
+        processed += batch_processed
+        added += batch_added
+        succeeded += batch_succeeded
+
+    if documents == 0:
+        logger.info("✅ İndekslenecek yeni veya değişmiş dosya yok")
+        print(f"[chroma_docs] Değişiklik yok.")
         return
-    
-    logger.info(f"📊 {len(data)} doküman bulundu")
-    
-    # Batch import
-    result = chroma_manager.add_documents_batch(
-        data=data, batch_size=1000, skip_duplicates=True
-    )
-    
+
     logger.info("📊 IMPORT RAPORU:")
-    logger.info(f"   İşlenen: {result['total_processed']}")
-    logger.info(f"   Eklenen: {result['total_added']}")
-    logger.info(f"   Atlanan: {result['skipped']}")
-    logger.info(f"   Başarı oranı: {result['success_rate']:.1%}")
-    
-    print(f"[chroma_docs] {INPUT_JSON} ChromaDB'ye eklendi.")
+    logger.info(f"   Doküman: {documents}")
+    logger.info(f"   İşlenen: {processed}")
+    logger.info(f"   Eklenen: {added}")
+    logger.info(f"   Başarı oranı: {succeeded / processed if processed else 0:.1%}")
+
+    print(f"[chroma_docs] {INPUT_JSONL} ChromaDB'ye eklendi.")
 
 if __name__ == "__main__":
     main()
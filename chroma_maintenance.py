@@ -0,0 +1,211 @@
+"""
+ChromaDB dizini için çevrimiçi, artımlı snapshot'lar ve SQLite sıkıştırma.
+
+Snapshot, Chroma dizinindeki dosyaların (chroma.sqlite3, HNSW segmentleri,
+BM25 index'i, manifest, parent / chunk katalog veritabanları) bir kopyasıdır:
+- Önceki snapshot'tan beri değişmemiş dosyalar (boyut + mtime, SQLite için
+  -wal dahil) önceki snapshot'taki kopyaya hard link verilir; yer kaplamaz.
+- SQLite veritabanları sqlite3 backup API'siyle kopyalanır (yazma sürerken
+  bile tutarlı bir görüntü).
+- Diğer değişen dosyalar dosya sistemi destekliyorsa reflink (copy-on-write,
+  FICLONE) ile, değilse normal kopyayla alınır.
+Snapshot önce "<ad>.partial" dizinine yazılır, tamamlanınca yeniden
+adlandırılır; yarım kalan snapshot sonraki snapshot'ların tabanı olmaz.
+ChromaDBManager bu sırada yazma kilidini tutar (bkz. create_backup).
+"""
+import os
+import json
+import shutil
+import sqlite3
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_MANIFEST = "snapshot.json"
+PARTIAL_SUFFIX = ".partial"
+
+_SQLITE_HEADER = b"SQLite format 3\x00"
+# SQLite yardımcı dosyaları backup API'siyle ana dosyaya dahil edilir
+_SKIP_SUFFIXES = ("-wal", "-shm", "-journal", ".tmp")
+# linux/fs.h: _IOW(0x94, 9, int)
+_FICLONE = 0x40049409
+
+
+def is_sqlite_file(path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(_SQLITE_HEADER)) == _SQLITE_HEADER
+    except OSError:
+        return False
+
+
+def _signature(path: str) -> List[int]:
+    """Değişiklik imzası: boyut + mtime (varsa -wal dosyasınınki de)"""
+    signature = []
+    for candidate in (path, f"{path}-wal"):
+        if os.path.exists(candidate):
+            st = os.stat(candidate)
+            signature.extend([st.st_size, st.st_mtime_ns])
+    return signature
+
+
+def _clone_or_copy(src: str, dst: str) -> str:
+    """Dosya sistemi destekliyorsa reflink, değilse normal kopya"""
+    try:
+        import fcntl
+
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+        shutil.copystat(src, dst)
+        return "clone"
+    except (ImportError, OSError):
+        shutil.copy2(src, dst)
+        return "copy"
+
+
+def _link_or_copy(src: str, dst: str) -> str:
+    try:
+        os.link(src, dst)
+        return "link"
+    except OSError:
+        # Farklı dosya sistemi / hard link desteklenmiyor
+        return _clone_or_copy(src, dst)
+
+
+def _backup_sqlite(src: str, dst: str) -> str:
+    source = sqlite3.connect(src, timeout=30)
+    target = sqlite3.connect(dst)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    return "sqlite"
+
+
+def list_snapshots(backup_root: str) -> List[Dict[str, Any]]:
+    """Tamamlanmış snapshot'lar (eskiden yeniye)"""
+    snapshots = []
+    if not os.path.isdir(backup_root):
+        return snapshots
+    for name in os.listdir(backup_root):
+        manifest_path = os.path.join(backup_root, name, SNAPSHOT_MANIFEST)
+        if name.endswith(PARTIAL_SUFFIX) or not os.path.exists(manifest_path):
+            continue
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Snapshot manifest okunamadı ({name}): {e}")
+            continue
+        manifest["path"] = os.path.join(backup_root, name)
+        snapshots.append(manifest)
+    snapshots.sort(key=lambda item: item.get("created_at", ""))
+    return snapshots
+
+
+def prune_snapshots(backup_root: str, keep: int) -> List[str]:
+    """En yeni keep snapshot dışındakileri sil (hard link'ler diğerlerini etkilemez)"""
+    removed = []
+    snapshots = list_snapshots(backup_root)
+    for snapshot in snapshots[:max(0, len(snapshots) - keep)]:
+        shutil.rmtree(snapshot["path"], ignore_errors=True)
+        removed.append(snapshot["name"])
+    return removed
+
+
+def create_snapshot(
+    source_dir: str,
+    backup_root: str,
+    name: Optional[str] = None,
+    keep: Optional[int] = None,
+) -> Dict[str, Any]:
+    """source_dir'in artımlı snapshot'ını backup_root/<name> altına al"""
+    name = os.path.basename((name or "").strip()) or datetime.now().strftime("backup_%Y%m%d_%H%M%S")
+    if name in (".", "..") or name.endswith(PARTIAL_SUFFIX):
+        raise ValueError(f"Geçersiz backup adı: {name}")
+    target = os.path.join(backup_root, name)
+    if os.path.exists(target):
+        raise FileExistsError(f"Backup zaten var: {target}")
+
+    previous = (list_snapshots(backup_root) or [None])[-1]
+    previous_files = previous.get("files", {}) if previous else {}
+
+    partial = target + PARTIAL_SUFFIX
+    shutil.rmtree(partial, ignore_errors=True)
+    os.makedirs(partial)
+
+    backup_root_abs = os.path.abspath(backup_root)
+    files: Dict[str, Dict[str, Any]] = {}
+    counts = {"link": 0, "sqlite": 0, "clone": 0, "copy": 0}
+    bytes_written = 0
+    for root, dirs, filenames in os.walk(source_dir):
+        # Backup dizini Chroma dizininin içindeyse kendini kopyalamasın
+        dirs[:] = [d for d in dirs if os.path.abspath(os.path.join(root, d)) != backup_root_abs]
+        for filename in filenames:
+            if filename.endswith(_SKIP_SUFFIXES):
+                continue
+            src = os.path.join(root, filename)
+            rel = os.path.relpath(src, source_dir)
+            dst = os.path.join(partial, rel)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+
+            signature = _signature(src)
+            prev_entry = previous_files.get(rel)
+            prev_path = os.path.join(previous["path"], rel) if previous else None
+            if prev_entry and prev_entry.get("signature") == signature and os.path.exists(prev_path):
+                method = _link_or_copy(prev_path, dst)
+            elif is_sqlite_file(src):
+                method = _backup_sqlite(src, dst)
+            else:
+                method = _clone_or_copy(src, dst)
+
+            size = os.path.getsize(dst)
+            if method != "link":
+                bytes_written += size
+            counts[method] += 1
+            files[rel] = {"signature": signature, "size": size, "method": method}
+
+    manifest = {
+        "name": name,
+        "created_at": datetime.now().isoformat(),
+        "source": os.path.abspath(source_dir),
+        "base": previous["name"] if previous else None,
+        "files": files,
+        "file_count": len(files),
+        "total_mb": round(sum(entry["size"] for entry in files.values()) / (1024 * 1024), 2),
+        "written_mb": round(bytes_written / (1024 * 1024), 2),
+        "methods": counts,
+    }
+    with open(os.path.join(partial, SNAPSHOT_MANIFEST), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(partial, target)
+
+    if keep:
+        manifest["pruned"] = prune_snapshots(backup_root, keep)
+    manifest["path"] = target
+    return manifest
+
+
+def compact_sqlite(path: str) -> Dict[str, Any]:
+    """WAL'ı ana dosyaya işleyip kes, ardından VACUUM ile boş sayfaları geri ver"""
+    before = os.path.getsize(path) + (
+        os.path.getsize(f"{path}-wal") if os.path.exists(f"{path}-wal") else 0
+    )
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    try:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+    after = os.path.getsize(path) + (
+        os.path.getsize(f"{path}-wal") if os.path.exists(f"{path}-wal") else 0
+    )
+    return {
+        "file": os.path.basename(path),
+        "before_mb": round(before / (1024 * 1024), 2),
+        "after_mb": round(after / (1024 * 1024), 2),
+    }
@@ -0,0 +1,243 @@
+"""
+Kaynak dosya -> chunk ID kataloğu.
+
+Bir dosyanın chunk'larını bulmak için Chroma'da metadata filtresiyle
+(source_file $eq / $contains) arama yapmak yerine, ChromaDBManager her
+ekleme ve silmede ID'leri bu kataloğa da yazar. Silmeler doğrudan ID ile,
+"işlendi mi?" kontrolleri ve dosya başına chunk sayıları birincil anahtar
+okumasıyla yapılır. Katalog Chroma dizininde ayrı bir SQLite dosyasında
+tutulur; boşsa mevcut koleksiyondan bir kez sayfalı olarak doldurulur.
+"""
+import os
+import sqlite3
+import logging
+import threading
+from collections import Counter
+from typing import Dict, Any, List, Iterable, Iterator
+
+from store_registry import PathRegistry, SQLITE_ID_CHUNK
+
+logger = logging.getLogger(__name__)
+
+CATALOG_DB_FILENAME = "chunk_catalog.db"
+
+
+class ChunkCatalog:
+    """chunk_id -> source_file ve source_file -> chunk sayısı"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunk_catalog (
+                chunk_id TEXT PRIMARY KEY,
+                source_file TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_chunk_catalog_source ON chunk_catalog(source_file)"
+        )
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS catalog_sources (
+                source_file TEXT PRIMARY KEY,
+                chunk_count INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        # Son sıkıştırmadan beri silinen chunk sayısı (optimize_collection eşiği)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS catalog_meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _refresh_counts(self, sources: Iterable[str]):
+        """Verilen kaynakların chunk sayısını index üzerinden yeniden say (lock altında)"""
+        for source_file in set(sources):
+            count = self._conn.execute(
+                "SELECT COUNT(*) FROM chunk_catalog WHERE source_file = ?", (source_file,)
+            ).fetchone()[0]
+            if count:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO catalog_sources (source_file, chunk_count) VALUES (?, ?)",
+                    (source_file, count),
+                )
+            else:
+                self._conn.execute("DELETE FROM catalog_sources WHERE source_file = ?", (source_file,))
+
+    def add(self, ids_by_source: Dict[str, List[str]]) -> int:
+        """Eklenen chunk ID'lerini kaynaklarına göre kaydet"""
+        rows = [
+            (chunk_id, source_file)
+            for source_file, chunk_ids in ids_by_source.items()
+            if source_file
+            for chunk_id in chunk_ids
+        ]
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunk_catalog (chunk_id, source_file) VALUES (?, ?)", rows
+            )
+            self._refresh_counts(source_file for _, source_file in rows)
+        return len(rows)
+
+    def remove_ids(self, chunk_ids: Iterable[str]) -> int:
+        """Silinen chunk'ları katalogdan düş"""
+        chunk_ids = list(chunk_ids)
+        removed = 0
+        with self._lock, self._conn:
+            touched = set()
+            for start in range(0, len(chunk_ids), SQLITE_ID_CHUNK):
+                part = chunk_ids[start:start + SQLITE_ID_CHUNK]
+                placeholders = ",".join("?" for _ in part)
+                touched.update(
+                    row[0]
+                    for row in self._conn.execute(
+                        f"SELECT DISTINCT source_file FROM chunk_catalog WHERE chunk_id IN ({placeholders})",
+                        part,
+                    )
+                )
+                removed += self._conn.execute(
+                    f"DELETE FROM chunk_catalog WHERE chunk_id IN ({placeholders})", part
+                ).rowcount
+            self._refresh_counts(touched)
+            if removed:
+                self._conn.execute(
+                    """
+                    INSERT INTO catalog_meta (key, value) VALUES ('deleted_since_compact', ?)
+                    ON CONFLICT(key) DO UPDATE SET value = value + excluded.value
+                    """,
+                    (removed,),
+                )
+        return removed
+
+    def ids_for_source(self, source_file: str) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id FROM chunk_catalog WHERE source_file = ?", (source_file,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def iter_id_pages(self, page_size: int = 5000) -> Iterator[List[str]]:
+        """Tüm chunk ID'leri sıralı sayfalar halinde (keyset; OFFSET taraması yok)"""
+        last_id = ""
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT chunk_id FROM chunk_catalog WHERE chunk_id > ? ORDER BY chunk_id LIMIT ?",
+                    (last_id, page_size),
+                ).fetchall()
+            if not rows:
+                return
+            yield [row[0] for row in rows]
+            last_id = rows[-1][0]
+
+    def deleted_since_compact(self) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM catalog_meta WHERE key = 'deleted_since_compact'"
+            ).fetchone()
+        return row[0] if row else 0
+
+    def reset_deleted(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM catalog_meta WHERE key = 'deleted_since_compact'")
+
+    def chunk_count(self, source_file: str) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT chunk_count FROM catalog_sources WHERE source_file = ?", (source_file,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def has_source(self, source_file: str) -> bool:
+        return self.chunk_count(source_file) > 0
+
+    def resolve_sources(self, filename: str) -> List[str]:
+        """
+        Dosya adına karşılık gelen kaynak adları: önce tam eşleşme, yoksa adı
+        içeren kaynaklar (yol ile kaydedilmiş eski veriler için)
+        """
+        if self.has_source(filename):
+            return [filename]
+        pattern = "%" + filename.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT source_file FROM catalog_sources WHERE source_file LIKE ? ESCAPE '\\'",
+                (pattern,),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def sources(self) -> Dict[str, int]:
+        """source_file -> chunk sayısı"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT source_file, chunk_count FROM catalog_sources ORDER BY source_file"
+            ).fetchall()
+        return dict(rows)
+
+    def source_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM catalog_sources").fetchone()[0]
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM chunk_catalog LIMIT 1").fetchone() is None
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chunk_catalog")
+            self._conn.execute("DELETE FROM catalog_sources")
+            self._conn.execute("DELETE FROM catalog_meta")
+
+    def rebuild_from_collection(self, collection, page_size: int = 5000) -> int:
+        """Kataloğu mevcut Chroma koleksiyonundan sayfalı olarak yeniden kur"""
+        total = collection.count()
+        rows = []
+        for offset in range(0, total, page_size):
+            page = collection.get(limit=page_size, offset=offset, include=["metadatas"])
+            for chunk_id, metadata in zip(page.get("ids", []) or [], page.get("metadatas", []) or []):
+                source_file = (metadata or {}).get("source_file")
+                if source_file:
+                    rows.append((chunk_id, source_file))
+        counts = Counter(source_file for _, source_file in rows)
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chunk_catalog")
+            self._conn.execute("DELETE FROM catalog_sources")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunk_catalog (chunk_id, source_file) VALUES (?, ?)", rows
+            )
+            self._conn.executemany(
+                "INSERT INTO catalog_sources (source_file, chunk_count) VALUES (?, ?)", counts.items()
+            )
+        logger.info(f"✅ Chunk kataloğu koleksiyondan oluşturuldu: {len(rows)} chunk, {len(counts)} kaynak")
+        return len(rows)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            chunks = self._conn.execute("SELECT COUNT(*) FROM chunk_catalog").fetchone()[0]
+            sources = self._conn.execute("SELECT COUNT(*) FROM catalog_sources").fetchone()[0]
+        return {"chunks": chunks, "sources": sources, "deleted_since_compact": self.deleted_since_compact()}
+
+
+_catalogs = PathRegistry()
+
+
+def get_chunk_catalog(chroma_path: str = "./chroma") -> ChunkCatalog:
+    """Chroma dizini başına process genelinde tek katalog döndür"""
+    return _catalogs.get(
+        chroma_path, lambda: ChunkCatalog(os.path.join(chroma_path, CATALOG_DB_FILENAME))
+    )
@@ -10,6 +10,20 @@ class RAGConfig:
     EMBEDDING_DIMENSION = 384  # MiniLM dimension
     NORMALIZE_EMBEDDINGS = True
 
+    # Embedding Cache Configuration (memory-mapped vektör deposu)
+    EMBEDDING_CACHE_DIR = "./embedding_cache"
+    EMBEDDING_CACHE_DTYPE = "float32"  # "float16" diskte yarı yer kaplar
+    EMBEDDING_CACHE_MAX_ENTRIES = 500000  # Model başına üst sınır, aşılınca eski kayıtlar atılır
+    EMBEDDING_CACHE_FLUSH_EVERY = 100  # Kaç yeni vektörde bir diske yazılır
+
+    # Embedding Batching Configuration
+    EMBEDDING_MAX_BATCH_TOKENS = 8192  # Bir batch'in padding dahil token bütçesi (max_len * adet)
+    EMBEDDING_MAX_BATCH_SIZE = 256  # Bütçeden bağımsız batch başına en fazla metin
+
+    # Query Micro-Batching (eşzamanlı /api/chat sorguları tek encode'da)
+    QUERY_BATCH_MAX_WAIT_MS = 5  # İlk sorgudan sonra diğerleri için bekleme süresi
+    QUERY_BATCH_MAX_SIZE = 32  # Bir micro-batch'teki en fazla sorgu
+
     # Retrieval Configuration
     DEFAULT_N_RESULTS = 10  # Increased from 5
     MAX_N_RESULTS = 20  # Increased from 10
@@ -20,6 +34,19 @@ class RAGConfig:
     MAX_CHUNK_SIZE = 1024  # Increased from 512 - daha büyük chunk'lar
     CHUNK_OVERLAP = 100  # Increased from 50 - daha fazla overlap
     MAX_CONTEXT_LENGTH = 16000  # Increased from 4000 - çok daha fazla context
+    DOCUMENT_PROCESS_WORKERS = os.cpu_count() or 1  # base_docs paralel dosya işleme
+    PDF_SPLIT_MIN_PAGES = 150  # Bu sayfa sayısından büyük PDF'ler aralıklara bölünür
+    PDF_PAGES_PER_TASK = 50  # Process havuzuna gönderilen sayfa aralığı boyutu
+    JSONL_POLL_INTERVAL = 0.5  # Akış dosyasını takip eden aşamanın bekleme aralığı (sn)
+    JSONL_FOLLOW_TIMEOUT = 1800  # Önceki aşama bu süre boyunca yazmazsa takip bırakılır (sn)
+
+    # Tokenizer-aware chunking ("tokens": embedding modelinin token sınırına göre, "words": eski 1200 kelimelik chunk'lar)
+    CHUNKING_MODE = "tokens"
+    CHUNK_MAX_TOKENS = None  # None ise modelin max_seq_length'i (özel token'lar düşülerek)
+    CHUNK_OVERLAP_TOKENS = 16  # Ardışık child chunk'lar arası overlap
+    PARENT_CHUNKS_ENABLED = True  # LLM context'i için büyük parent pasajları sakla
+    PARENT_CHUNK_SIZE = 800  # Semantic (parent / "words" modu) chunk boyutu (kelime)
+    PARENT_CHUNK_OVERLAP = 100  # Semantic chunk'lar arası overlap (kelime)
 
     # LLM Configuration - Ollama Local Models
     LLM_MODEL = "deepseek-r1:latest"  # Local Ollama DeepSeek-R1 model
@@ -33,6 +60,37 @@ class RAGConfig:
         "tinyllama": "tinyllama:latest",
     }
 
+    # Conversation State (kullanıcı bazlı sohbet geçmişi)
+    CONVERSATION_MAX_USERS = 10000  # LRU ile tutulacak en fazla oturum
+    CONVERSATION_TTL_SECONDS = 30 * 60  # Bu süre boyunca kullanılmayan oturum düşer
+    CONVERSATION_MAX_HISTORY = 5  # Oturum başına son N soru-cevap
+
+    # Semantic Answer Cache (tekrarlanan sorular için LLM üretimini atla)
+    ANSWER_CACHE_ENABLED = True
+    ANSWER_CACHE_SIMILARITY_THRESHOLD = 0.95  # Normalize embedding'ler arası cosine
+    ANSWER_CACHE_MAX_ENTRIES = 2000
+    ANSWER_CACHE_TTL_SECONDS = 24 * 60 * 60
+
+    # Ingestion Queue (arka planda doküman işleme)
+    INGESTION_DB_PATH = "ingestion_jobs.db"
+    INGESTION_WORK_DIR = "ingestion_work"  # Aşama çıktıları (yeniden başlatmada devam için)
+    INGESTION_MAX_CONCURRENT_JOBS = 2  # Aynı anda çalışan en fazla iş
+    INGESTION_MAX_ATTEMPTS = 3  # Yarım kalan iş en fazla kaç kez yeniden denenir
+    INGESTION_EMBED_SLICE_SIZE = 512  # İlerleme raporu için embedding dilimi
+    INGESTION_POLL_INTERVAL = 5.0  # Boştaki worker'ın kuyruğu yoklama aralığı (sn)
+    INGESTION_HEARTBEAT_INTERVAL = 30.0  # Çalışan işlerin updated_at'i bu aralıkla yenilenir (sn)
+    INGESTION_LEASE_SECONDS = 300  # Bu süre heartbeat almayan "running" iş yarım kalmış sayılır (sn)
+
+    # ChromaDB bakım (snapshot / sıkıştırma)
+    CHROMA_BACKUP_DIR = "./chroma_backups"
+    CHROMA_BACKUP_KEEP = 7  # Saklanacak en fazla snapshot (eskiler silinir)
+    CHROMA_COMPACT_MIN_DELETED_RATIO = 0.2  # Silinen / toplam bu oranı geçince koleksiyon yeniden kurulur
+
+    # Dashboard istatistikleri (eski kaynak temizliği arka planda)
+    STATS_RECONCILE_INTERVAL = 300.0  # reconcile_sources çalıştırma aralığı (sn)
+    STATS_JSON_PATH = "stats.json"
+    STATS_JSON_MIN_INTERVAL = 10.0  # stats.json en fazla bu aralıkla yeniden yazılır (sn)
+
     # Quality Control
     MIN_ANSWER_LENGTH = 20
     MAX_ANSWER_LENGTH = 1000
@@ -0,0 +1,103 @@
+"""
+Kullanıcı bazlı sohbet geçmişi deposu.
+
+AdvancedRAGChatbot tek bir örnek olarak paylaşılır; her user_id'nin son
+soru-cevap çiftleri burada tutulur. Depo boyutu sınırlıdır (LRU) ve uzun
+süre kullanılmayan oturumlar TTL ile düşer.
+"""
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Tuple
+
+from config import config
+
+# (soru, cevap, timestamp)
+HistoryEntry = Tuple[str, str, float]
+
+
+class ConversationStore:
+    """user_id -> son N soru-cevap, LRU + TTL ile sınırlı"""
+
+    def __init__(
+        self,
+        max_users: int = config.CONVERSATION_MAX_USERS,
+        ttl_seconds: float = config.CONVERSATION_TTL_SECONDS,
+        max_history: int = config.CONVERSATION_MAX_HISTORY,
+    ):
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self.max_history = max_history
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._evicted = 0
+        self._expired = 0
+
+    def _is_expired(self, session: Dict[str, Any], now: float) -> bool:
+        return now - session["last_access"] > self.ttl_seconds
+
+    def _purge_expired(self, now: float):
+        """Süresi dolan oturumları baştan temizle (lock altında çağrılır)"""
+        # OrderedDict son erişim sırasında tutulduğu için en eski oturumlar baştadır
+        while self._sessions:
+            user_id, session = next(iter(self._sessions.items()))
+            if not self._is_expired(session, now):
+                break
+            del self._sessions[user_id]
+            self._expired += 1
+
+    def get_history(self, user_id: str) -> List[HistoryEntry]:
+        """Kullanıcının geçmişini döndür (kopya)"""
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(user_id)
+            if session is None:
+                return []
+            if self._is_expired(session, now):
+                del self._sessions[user_id]
+                self._expired += 1
+                return []
+            session["last_access"] = now
+            self._sessions.move_to_end(user_id)
+            return list(session["history"])
+
+    def append(self, user_id: str, question: str, answer: str):
+        """Soru-cevap çiftini ekle, geçmiş ve kullanıcı sayısını sınırla"""
+        now = time.time()
+        with self._lock:
+            self._purge_expired(now)
+
+            session = self._sessions.get(user_id)
+            if session is None:
+                session = {"history": [], "last_access": now}
+                self._sessions[user_id] = session
+
+            session["history"].append((question, answer, now))
+            if len(session["history"]) > self.max_history:
+                del session["history"][: -self.max_history]
+            session["last_access"] = now
+            self._sessions.move_to_end(user_id)
+
+            while len(self._sessions) > self.max_users:
+                self._sessions.popitem(last=False)
+                self._evicted += 1
+
+    def clear(self, user_id: str) -> bool:
+        """Tek kullanıcının geçmişini sil"""
+        with self._lock:
+            return self._sessions.pop(user_id, None) is not None
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "active_sessions": len(self._sessions),
+                "max_users": self.max_users,
+                "ttl_seconds": self.ttl_seconds,
+                "max_history": self.max_history,
+                "evicted": self._evicted,
+                "expired": self._expired,
+            }
+
+
+# Global store instance
+conversation_store = ConversationStore()
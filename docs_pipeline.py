@@ -0,0 +1,46 @@
+# docs_pipeline.py
+"""
+base_docs -> embedder_docs -> chroma_docs aşamalarını aynı anda çalıştırır.
+
+Her aşama bir öncekinin JSONL çıktısını --follow ile takip eder; böylece
+ilk dosya işlenir işlenmez embedding ve indeksleme başlar. Bir aşama hata
+ile biterse sonrakiler durdurulur.
+
+Kullanım: python docs_pipeline.py [--workers N] [--full]
+"""
+import os
+import sys
+import time
+import subprocess
+
+def main():
+    python = sys.executable
+    stages = [
+        ("base_docs", [python, "base_docs.py", *sys.argv[1:]]),
+        ("embedder_docs", [python, "embedder_docs.py", "--follow"]),
+        ("chroma_docs", [python, "chroma_docs.py", "--follow"]),
+    ]
+
+    # Takip eden aşamalar önceki çalıştırmanın tamamlanmış dosyalarını okumasın
+    for path in ["data.jsonl", "embedded_data.jsonl"]:
+        if os.path.exists(path):
+            os.remove(path)
+
+    started = time.perf_counter()
+    processes = [(name, subprocess.Popen(command)) for name, command in stages]
+
+    exit_code = 0
+    for index, (name, process) in enumerate(processes):
+        code = process.wait()
+        if code != 0:
+            print(f"[docs_pipeline] ❌ {name} hata ile bitti (kod {code}), sonraki aşamalar durduruluyor")
+            for _, later in processes[index + 1:]:
+                later.terminate()
+            exit_code = code
+            break
+        print(f"[docs_pipeline] ✅ {name} tamamlandı ({time.perf_counter() - started:.1f} sn)")
+
+    sys.exit(exit_code)
+
+if __name__ == "__main__":
+    main()
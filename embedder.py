@@ -87,76 +87,124 @@ from pathlib import Path
 import pickle
 from datetime import datetime, timedelta
 import threading
+import atexit
+import re
+import shutil
 from multiprocessing import cpu_count
 
 import requests
 from tqdm import tqdm
 from config import config
+from vector_store import MmapVectorStore
 
 logger = logging.getLogger(__name__)
 
 
 class EmbeddingCache:
-    """Embedding cache sistemi"""
+    """Embedding cache sistemi (model başına memory-mapped vektör deposu)"""
 
-    def __init__(self, cache_dir: str = "./embedding_cache"):
+    def __init__(
+        self,
+        cache_dir: str = config.EMBEDDING_CACHE_DIR,
+        dtype: str = config.EMBEDDING_CACHE_DTYPE,
+        max_entries: Optional[int] = config.EMBEDDING_CACHE_MAX_ENTRIES,
+        flush_every: int = config.EMBEDDING_CACHE_FLUSH_EVERY,
+    ):
         self.cache_dir = cache_dir
         os.makedirs(cache_dir, exist_ok=True)
-        self.cache_file = os.path.join(cache_dir, "embedding_cache.pkl")
-        self.cache = self._load_cache()
-
-    def _load_cache(self) -> Dict[str, np.ndarray]:
-        """Cache'i yükle"""
-        if os.path.exists(self.cache_file):
-            try:
-                with open(self.cache_file, "rb") as f:
-                    return pickle.load(f)
-            except Exception as e:
-                logger.warning(f"Cache yüklenemedi: {e}")
-        return {}
+        self.dtype = dtype
+        self.max_entries = max_entries
+        self.flush_every = flush_every
+        self._lock = threading.RLock()
+        self._stores: Dict[str, MmapVectorStore] = {}
+
+        legacy_file = os.path.join(cache_dir, "embedding_cache.pkl")
+        if os.path.exists(legacy_file):
+            logger.info(f"ℹ️ Eski pickle cache kullanılmıyor, silinebilir: {legacy_file}")
+
+    def _namespace(self, model_name: str) -> str:
+        """Model adından dosya sistemi için güvenli namespace adı üret"""
+        return re.sub(r"[^A-Za-z0-9._-]", "_", model_name)
+
+    def _get_store(self, namespace: str) -> MmapVectorStore:
+        """Namespace deposunu (gerekirse açarak) döndür"""
+        store = self._stores.get(namespace)
+        if store is None:
+            with self._lock:
+                store = self._stores.get(namespace)
+                if store is None:
+                    store = MmapVectorStore(
+                        os.path.join(self.cache_dir, namespace),
+                        dtype=self.dtype,
+                        max_entries=self.max_entries,
+                    )
+                    self._stores[namespace] = store
+        return store
 
     def _save_cache(self):
-        """Cache'i kaydet"""
-        try:
-            with open(self.cache_file, "wb") as f:
-                pickle.dump(self.cache, f)
-        except Exception as e:
-            logger.error(f"Cache kaydedilemedi: {e}")
+        """Bekleyen vektörleri diske yaz"""
+        with self._lock:
+            for store in self._stores.values():
+                try:
+                    store.flush()
+                except Exception as e:
+                    logger.error(f"Cache kaydedilemedi: {e}")
 
     def get_hash(self, text: str, model_name: str) -> str:
         """Text + model için hash oluştur"""
         combined = f"{model_name}:{text}"
         return hashlib.md5(combined.encode()).hexdigest()
 
+    def _digest(self, text: str, model_name: str) -> bytes:
+        return hashlib.md5(f"{model_name}:{text}".encode()).digest()
+
     def get(self, text: str, model_name: str) -> Optional[np.ndarray]:
         """Cache'den embedding al"""
-        hash_key = self.get_hash(text, model_name)
-        return self.cache.get(hash_key)
+        store = self._get_store(self._namespace(model_name))
+        return store.get(self._digest(text, model_name))
 
     def set(self, text: str, model_name: str, embedding: np.ndarray):
-        """Cache'e embedding ekle"""
-        hash_key = self.get_hash(text, model_name)
-        self.cache[hash_key] = embedding
-
-        # Periyodik kaydetme (her 100 yeni embedding'de)
-        if len(self.cache) % 100 == 0:
-            self._save_cache()
+        """Cache'e embedding ekle (sıfır vektörler - başarısız encode - kalıcı olarak saklanmaz)"""
+        if not np.any(embedding):
+            return
+        store = self._get_store(self._namespace(model_name))
+        if store.put(self._digest(text, model_name), embedding):
+            # Periyodik kaydetme (her flush_every yeni embedding'de)
+            if store.pending_count >= self.flush_every:
+                try:
+                    store.flush()
+                except Exception as e:
+                    logger.error(f"Cache kaydedilemedi: {e}")
 
     def clear(self):
         """Cache'i temizle"""
-        self.cache.clear()
-        if os.path.exists(self.cache_file):
-            os.remove(self.cache_file)
+        with self._lock:
+            for store in self._stores.values():
+                store.clear()
+            self._stores = {}
+            for name in os.listdir(self.cache_dir):
+                path = os.path.join(self.cache_dir, name)
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                elif name == "embedding_cache.pkl":
+                    os.remove(path)
 
     def get_stats(self) -> Dict[str, Any]:
         """Cache istatistikleri"""
+        with self._lock:
+            # Diskte olup henüz açılmamış namespace'leri de say
+            for name in os.listdir(self.cache_dir):
+                if os.path.isfile(os.path.join(self.cache_dir, name, "meta.json")):
+                    self._get_store(name)
+            namespaces = {name: store.get_stats() for name, store in self._stores.items()}
+
         return {
-            "total_embeddings": len(self.cache),
-            "cache_size_mb": (
-                os.path.getsize(self.cache_file) / (1024 * 1024)
-                if os.path.exists(self.cache_file)
-                else 0
-            ),
+            "total_embeddings": sum(ns["entries"] for ns in namespaces.values()),
+            "cache_size_mb": sum(ns["size_mb"] for ns in namespaces.values()),
+            "backend": "mmap",
+            "dtype": self.dtype,
+            "max_entries_per_model": self.max_entries,
+            "namespaces": namespaces,
         }
 
 
@@ -186,12 +234,13 @@ class LocalEmbedder:
         self.retry_delay = retry_delay
         self.custom_dimensions = custom_dimensions
         
-        # SentenceTransformer modelini yükle
-        print(f"🤖 SentenceTransformer modeli yükleniyor: {self.model}")
-        self.client = SentenceTransformer(self.model)
+        # SentenceTransformer modeli process genelinde bir kez yüklenir
+        shared = load_shared_model(self.model)
+        self.client = shared["model"]
+        self._encode_lock = shared["lock"]
         
-        # Cache'i başlat
-        self.cache = EmbeddingCache() if enable_cache else None
+        # Cache'i başlat (aynı dizin için tek örnek)
+        self.cache = get_shared_cache() if enable_cache else None
         
         # Model bilgilerini al
         self.model_info = self.SUPPORTED_MODELS.get(model, {
@@ -199,6 +248,9 @@ class LocalEmbedder:
             "max_tokens": 128
         })
         
+        # Son embed_batch çağrısının throughput / padding istatistikleri
+        self.last_batch_stats: Dict[str, Any] = {}
+        
         logger.info(f"🤖 Local Embedder başlatıldı")
         print(f"   Model: {self.model}")
         logger.info(f"   Dimensions: {self.model_info['dimensions']}")
@@ -224,54 +276,42 @@ class LocalEmbedder:
         
         return text
 
-    def _call_embedding_api(self, texts: List[str], attempt: int = 1) -> List[np.ndarray]:
-        """Local SentenceTransformer ile embedding üret"""
+    def _call_embedding_api(
+        self, texts: List[str], attempt: int = 1, raise_on_failure: bool = False
+    ) -> np.ndarray:
+        """
+        Local SentenceTransformer ile embedding üret; (len(texts), dim) float32 matris.
+        Denemeler tükenirse sıfır vektörler döner, raise_on_failure ise son hata fırlatılır.
+        """
         try:
             # Metinleri valide et
-            validated_texts = []
-            for text in texts:
-                validated_text = self._validate_text(text)
-                validated_texts.append(validated_text)
-            
-            # Boş metinleri filtrele
-            non_empty_texts = [t for t in validated_texts if t]
-            if not non_empty_texts:
+            validated_texts = [self._validate_text(text) for text in texts]
+
+            # Boş metinler sıfır satır olarak kalır
+            dimension = self.model_info["dimensions"]
+            result = np.zeros((len(texts), dimension), dtype=np.float32)
+            non_empty = [i for i, text in enumerate(validated_texts) if text]
+            if not non_empty:
                 logger.warning("Tüm metinler boş, sıfır vektörler döndürülüyor")
-                dimension = self.model_info["dimensions"]
-                return [np.zeros(dimension, dtype=np.float32) for _ in texts]
-            
+                return result
+
             # SentenceTransformer ile embedding üret
-            api_embeddings = self.client.encode(
-                non_empty_texts,
-                convert_to_numpy=True,
-                show_progress_bar=False,
-                normalize_embeddings=False
-            )
-            
-            # Sonuçları liste olarak dönüştür
-            if len(api_embeddings.shape) == 1:
-                api_embeddings = [api_embeddings]
-            else:
-                api_embeddings = [emb for emb in api_embeddings]
-            
-            # Boş metinler için sıfır vektör ekle
-            final_embeddings = []
-            api_idx = 0
-            
-            for original_text in validated_texts:
-                if original_text:  # Boş değilse model sonucunu kullan
-                    if api_idx < len(api_embeddings):
-                        final_embeddings.append(api_embeddings[api_idx].astype(np.float32))
-                        api_idx += 1
-                    else:
-                        # Fallback
-                        dimension = self.model_info["dimensions"]
-                        final_embeddings.append(np.zeros(dimension, dtype=np.float32))
-                else:  # Boş ise sıfır vektör
-                    dimension = self.model_info["dimensions"]
-                    final_embeddings.append(np.zeros(dimension, dtype=np.float32))
-            
-            return final_embeddings
+            # (tokenizer eşzamanlı çağrılarda güvenli değil, model başına kilit)
+            # batch_size: batch'i planlayan çağıran taraf, encode tekrar bölmesin
+            with self._encode_lock:
+                api_embeddings = self.client.encode(
+                    [validated_texts[i] for i in non_empty],
+                    batch_size=len(non_empty),
+                    convert_to_numpy=True,
+                    show_progress_bar=False,
+                    normalize_embeddings=False
+                )
+
+            # Model çıktısı satır satır değil tek kopyada yerleştirilir
+            api_embeddings = np.asarray(api_embeddings, dtype=np.float32).reshape(-1, dimension)
+            count = min(len(non_empty), len(api_embeddings))
+            result[non_empty[:count]] = api_embeddings[:count]
+            return result
             
         except Exception as e:
             logger.error(f"Embedding hatası (deneme {attempt}/{self.max_retries}): {e}")
@@ -280,12 +320,54 @@ class LocalEmbedder:
                 delay = self.retry_delay * (2 ** (attempt - 1))  # Exponential backoff
                 logger.info(f"⏳ {delay:.1f}s beklenip tekrar denenecek...")
                 time.sleep(delay)
-                return self._call_embedding_api(texts, attempt + 1)
+                return self._call_embedding_api(texts, attempt + 1, raise_on_failure)
+            elif raise_on_failure:
+                raise
             else:
                 # Son deneme başarısız - sıfır vektör döndür
                 logger.error("Embedding üretimi başarısız, sıfır vektörler döndürülüyor")
-                dimension = self.model_info["dimensions"]
-                return [np.zeros(dimension, dtype=np.float32) for _ in texts]
+                return np.zeros((len(texts), self.model_info["dimensions"]), dtype=np.float32)
+
+    def _max_seq_length(self) -> int:
+        """Modelin kırptığı token sınırı"""
+        return getattr(self.client, "max_seq_length", None) or self.model_info["max_tokens"]
+
+    def _count_tokens(self, texts: List[str]) -> List[int]:
+        """Metinlerin model tokenizer'ına göre uzunlukları (max_seq_length ile sınırlı)"""
+        max_len = self._max_seq_length()
+        tokenizer = getattr(self.client, "tokenizer", None)
+        if tokenizer is not None:
+            try:
+                with self._encode_lock:
+                    encoded = tokenizer(texts, add_special_tokens=True, truncation=False)["input_ids"]
+                return [min(len(ids), max_len) for ids in encoded]
+            except Exception as e:
+                logger.debug(f"Tokenizer ile uzunluk hesaplanamadı, kelime sayısı kullanılıyor: {e}")
+
+        # Yaklaşık değer: alt-kelime tokenizer'ları kelime başına ~1.3 token üretir
+        return [min(int(len(text.split()) * 1.3) + 2, max_len) for text in texts]
+
+    @staticmethod
+    def _plan_batches(
+        token_lengths: List[int], max_batch_tokens: int, max_batch_size: int
+    ) -> List[List[int]]:
+        """
+        Metinleri uzunluğa göre sıralayıp padding dahil token bütçesine göre
+        gruplar. Batch maliyeti = en uzun metin * metin sayısı.
+        """
+        order = sorted(range(len(token_lengths)), key=lambda i: token_lengths[i])
+        batches = []
+        current = []
+        for idx in order:
+            # Sıralı olduğu için batch'in en uzunu her zaman son eklenen
+            padded_cost = (len(current) + 1) * max(token_lengths[idx], 1)
+            if current and (padded_cost > max_batch_tokens or len(current) >= max_batch_size):
+                batches.append(current)
+                current = []
+            current.append(idx)
+        if current:
+            batches.append(current)
+        return batches
 
     def embed_single(self, text: str, normalize: bool = False) -> np.ndarray:
         """Tek metin için embedding"""
@@ -321,17 +403,54 @@ class LocalEmbedder:
     def embed_batch(
         self,
         texts: List[str],
-        batch_size: int = 50,  # Local için batch size
+        batch_size: int = config.EMBEDDING_MAX_BATCH_SIZE,  # Batch başına en fazla metin
         normalize: bool = False,
         show_progress: bool = True,
+        max_batch_tokens: Optional[int] = None,
+        length_bucketing: bool = True,
     ) -> List[np.ndarray]:
-        """Batch embedding işlemi"""
+        """Batch embedding işlemi; embed_batch_array satırları (kopyasız görünümler)"""
         if not texts:
             logger.warning("Boş metin listesi")
             return []
+        return list(
+            self.embed_batch_array(
+                texts,
+                batch_size=batch_size,
+                normalize=normalize,
+                show_progress=show_progress,
+                max_batch_tokens=max_batch_tokens,
+                length_bucketing=length_bucketing,
+            )
+        )
+
+    def embed_batch_array(
+        self,
+        texts: List[str],
+        batch_size: int = config.EMBEDDING_MAX_BATCH_SIZE,  # Batch başına en fazla metin
+        normalize: bool = False,
+        show_progress: bool = True,
+        max_batch_tokens: Optional[int] = None,
+        length_bucketing: bool = True,
+    ) -> np.ndarray:
+        """
+        Batch embedding işlemi; sonuç orijinal sırayla tek bir (len(texts), dim)
+        float32 matristir. Ingestion hattı bu matrisi Chroma'ya kadar satır başına
+        Python nesnesi üretmeden taşır.
+
+        length_bucketing açıkken metinler token uzunluğuna göre sıralanır ve
+        padding dahil max_batch_tokens bütçesini aşmayan batch'ler halinde
+        işlenir.
+        """
+        dimension = self.model_info["dimensions"]
+        # Boş / geçersiz metinler sıfır satır olarak kalır
+        result = np.zeros((len(texts), dimension), dtype=np.float32)
+        if not texts:
+            logger.warning("Boş metin listesi")
+            return result
 
         logger.info(f"📊 {len(texts)} metin için embedding hesaplanıyor...")
-        logger.info(f"Model: {self.model}, Batch size: {batch_size}")
+        logger.info(f"Model: {self.model}, Batch size (max): {batch_size}")
 
         # Metinleri valide et
         validated_texts = []
@@ -342,88 +461,97 @@ class LocalEmbedder:
                 logger.warning(f"Boş metin tespit edildi (index: {i})")
 
         # Cache kontrolü
-        embeddings = []
-        cached_results = {}
         texts_to_process = []
         text_indices = []
-
+        cache_hits = 0
+        for i, text in enumerate(validated_texts):
+            if not text:
+                continue
+            cached = self.cache.get(text, self.model) if self.cache else None
+            if cached is not None:
+                result[i] = cached
+                cache_hits += 1
+            else:
+                texts_to_process.append(text)
+                text_indices.append(i)
         if self.cache:
-            cache_hits = 0
-            for i, text in enumerate(validated_texts):
-                if not text:
-                    cached_results[i] = np.zeros(self.model_info["dimensions"], dtype=np.float32)
-                else:
-                    cached = self.cache.get(text, self.model)
-                    if cached is not None:
-                        cached_results[i] = cached
-                        cache_hits += 1
-                    else:
-                        texts_to_process.append(text)
-                        text_indices.append(i)
-            
             logger.info(f"💾 Cache hits: {cache_hits}/{len(validated_texts)}")
-        else:
-            texts_to_process = []
-            text_indices = []
-            for i, text in enumerate(validated_texts):
-                if not text:
-                    cached_results[i] = np.zeros(self.model_info["dimensions"], dtype=np.float32)
-                else:
-                    texts_to_process.append(text)
-                    text_indices.append(i)
 
-        # API çağrıları
+        # Model çağrıları
         if texts_to_process:
-            logger.info(f"🔄 API ile işlenecek metin sayısı: {len(texts_to_process)}")
+            logger.info(f"🔄 Model ile işlenecek metin sayısı: {len(texts_to_process)}")
             progress_bar = tqdm(total=len(texts_to_process), desc="Embedding", disable=not show_progress)
-            
-            for i in range(0, len(texts_to_process), batch_size):
-                batch = texts_to_process[i:i + batch_size]
-                logger.debug(f"Batch işleniyor: {i//batch_size + 1}/{(len(texts_to_process)-1)//batch_size + 1}")
+
+            token_lengths = self._count_tokens(texts_to_process)
+            if length_bucketing:
+                batches = self._plan_batches(
+                    token_lengths,
+                    max_batch_tokens or config.EMBEDDING_MAX_BATCH_TOKENS,
+                    batch_size,
+                )
+            else:
+                batches = [
+                    list(range(i, min(i + batch_size, len(texts_to_process))))
+                    for i in range(0, len(texts_to_process), batch_size)
+                ]
+
+            real_tokens = 0
+            padded_tokens = 0
+            start_time = time.time()
+
+            for batch_num, positions in enumerate(batches, 1):
+                batch = [texts_to_process[p] for p in positions]
+                batch_lengths = [token_lengths[p] for p in positions]
+                real_tokens += sum(batch_lengths)
+                padded_tokens += max(batch_lengths) * len(batch_lengths)
+                logger.debug(f"Batch işleniyor: {batch_num}/{len(batches)} ({len(batch)} metin)")
                 
                 batch_embeddings = self._call_embedding_api(batch)
-                
-                # Sonuçları kaydet
-                for j, embedding in enumerate(batch_embeddings):
-                    if i + j < len(text_indices):
-                        text_idx = text_indices[i + j]
-                        text = texts_to_process[i + j]
-                        
-                        # Embedding kontrolü
-                        if embedding is None or np.isnan(embedding).any():
-                            logger.warning(f"Geçersiz embedding tespit edildi (index: {text_idx})")
-                            embedding = np.zeros(self.model_info["dimensions"], dtype=np.float32)
-                        
-                        # Normalize (gerekirse)
-                        if normalize:
-                            norm = np.linalg.norm(embedding)
-                            if norm > 0:
-                                embedding = embedding / norm
-                        
-                        # Cache'e kaydet
-                        if self.cache and text:
-                            self.cache.set(text, self.model, embedding)
-                        
-                        cached_results[text_idx] = embedding
+
+                # Embedding kontrolü (NaN içeren satırlar sıfırlanır)
+                invalid = np.isnan(batch_embeddings).any(axis=1)
+                if invalid.any():
+                    logger.warning(f"{int(invalid.sum())} geçersiz embedding tespit edildi (batch {batch_num})")
+                    batch_embeddings[invalid] = 0.0
+
+                # Normalize (gerekirse)
+                if normalize:
+                    norms = np.linalg.norm(batch_embeddings, axis=1, keepdims=True)
+                    np.divide(batch_embeddings, norms, out=batch_embeddings, where=norms > 0)
+
+                # Sonuçları orijinal sıraya yerleştir
+                rows = [text_indices[p] for p in positions]
+                result[rows] = batch_embeddings
+
+                # Cache'e kaydet (cache satırları kendi kopyasını tutar)
+                if self.cache:
+                    for text, embedding in zip(batch, batch_embeddings):
+                        self.cache.set(text, self.model, embedding.copy())
                 
                 progress_bar.update(len(batch))
-                
-                # Rate limiting (Local processing)
-                time.sleep(0.1)
             
             progress_bar.close()
 
-        # Sonuçları sırala
-        final_embeddings = []
-        for i in range(len(texts)):
-            if i in cached_results:
-                final_embeddings.append(cached_results[i])
-            else:
-                logger.warning(f"Embedding eksik (index: {i}), sıfır vektör ekleniyor")
-                final_embeddings.append(np.zeros(self.model_info["dimensions"], dtype=np.float32))
+            duration = time.time() - start_time
+            self.last_batch_stats = {
+                "texts": len(texts_to_process),
+                "batches": len(batches),
+                "length_bucketing": length_bucketing,
+                "real_tokens": real_tokens,
+                "padded_tokens": padded_tokens,
+                "padding_ratio": 1 - real_tokens / padded_tokens if padded_tokens else 0.0,
+                "duration_seconds": round(duration, 3),
+                "tokens_per_second": real_tokens / duration if duration > 0 else 0.0,
+                "texts_per_second": len(texts_to_process) / duration if duration > 0 else 0.0,
+            }
+            logger.info(
+                f"⚡ {self.last_batch_stats['tokens_per_second']:.0f} token/sn, "
+                f"padding oranı: {self.last_batch_stats['padding_ratio']:.1%}, "
+                f"{len(batches)} batch"
+            )
 
-        logger.info(f"✅ {len(final_embeddings)} embedding hazırlandı")
-        return final_embeddings
+        logger.info(f"✅ {len(result)} embedding hazırlandı")
+        return result
 
     def embed_with_ensemble(
         self,
@@ -441,29 +569,14 @@ class LocalEmbedder:
         logger.info(f"🔗 Ensemble embedding: {len(models)} model")
 
         all_embeddings = []
-        original_model = self.model
 
-        # Her model için embedding hesapla
+        # Her model için embedding hesapla (paylaşılan örnek değiştirilmez)
         for model_name, weight in zip(models, weights):
             logger.info(f"📊 Model işleniyor: {model_name} (ağırlık: {weight})")
-            
-            # Geçici olarak modeli değiştir
-            self.model = model_name
-            self.model_info = self.SUPPORTED_MODELS.get(model_name, {
-                "dimensions": 1536,
-                "max_tokens": 8192
-            })
-            
-            model_embeddings = self.embed_batch(texts, show_progress=False)
+            model_embedder = get_embedder(model_name, enable_cache=self.cache is not None)
+            model_embeddings = model_embedder.embed_batch(texts, show_progress=False)
             all_embeddings.append((model_embeddings, weight))
 
-        # Orijinal modeli geri yükle
-        self.model = original_model
-        self.model_info = self.SUPPORTED_MODELS.get(original_model, {
-            "dimensions": 1536,
-            "max_tokens": 8192
-        })
-
         # Ağırlıklı ortalama
         logger.info("🔄 Ensemble birleştirme yapılıyor...")
         ensemble_embeddings = []
@@ -511,20 +624,19 @@ class LocalEmbedder:
         logger.info("🏃 Model benchmark başlıyor...")
         
         results = {}
-        original_model = self.model
 
         for model_name in self.SUPPORTED_MODELS.keys():
             logger.info(f"⏱️ Test ediliyor: {model_name}")
 
             try:
-                # Geçici olarak modeli değiştir
-                self.model = model_name
-                self.model_info = self.SUPPORTED_MODELS[model_name]
+                # Paylaşılan örneği değiştirmeden modelin kendi embedder'ını kullan
+                model_embedder = get_embedder(model_name, enable_cache=False)
+                model_info = model_embedder.model_info
                 
                 start_time = time.time()
 
                 # Test embedding
-                embeddings = self.embed_batch(test_texts, show_progress=False)
+                embeddings = model_embedder.embed_batch(test_texts, show_progress=False)
 
                 end_time = time.time()
                 duration = end_time - start_time
@@ -540,24 +652,18 @@ class LocalEmbedder:
                     "duration_seconds": duration,
                     "texts_per_second": len(test_texts) / duration if duration > 0 else 0,
                     "avg_embedding_norm": float(avg_norm),
-                    "embedding_dimension": self.model_info["dimensions"],
-                    "max_tokens": self.model_info["max_tokens"],
+                    "embedding_dimension": model_info["dimensions"],
+                    "max_tokens": model_info["max_tokens"],
                     "valid_embeddings": len(valid_embeddings),
+                    "model_load": get_model_load_stats().get(model_name, {}),
                 }
 
-                logger.info(f"   ⚡ {len(test_texts)/duration:.1f} text/sec, dim: {self.model_info['dimensions']}")
+                logger.info(f"   ⚡ {len(test_texts)/duration:.1f} text/sec, dim: {model_info['dimensions']}")
 
             except Exception as e:
                 logger.error(f"   ❌ Benchmark hatası {model_name}: {e}")
                 results[model_name] = {"error": str(e)}
 
-        # Orijinal modeli geri yükle
-        self.model = original_model
-        self.model_info = self.SUPPORTED_MODELS.get(original_model, {
-            "dimensions": 1536,
-            "max_tokens": 8192
-        })
-
         return results
 
     def get_model_info(self) -> Dict[str, Any]:
@@ -569,11 +675,16 @@ class LocalEmbedder:
             "custom_dimensions": self.custom_dimensions,
             "cache_enabled": self.cache is not None,
             "supported_models": list(self.SUPPORTED_MODELS.keys()),
+            "last_batch_stats": self.last_batch_stats,
         }
 
         if self.cache:
             info["cache_stats"] = self.cache.get_stats()
 
+        # Model yükleme süresi ve bellek ayak izi
+        info["model_load"] = get_model_load_stats().get(self.model, {})
+        info["process_rss_mb"] = _get_rss_mb()
+
         return info
 
     def cleanup(self):
@@ -583,6 +694,161 @@ class LocalEmbedder:
         logger.info("🧹 Cleanup tamamlandı")
 
 
+# ---------------------------------------------------------------------- #
+# Process genelinde paylaşılan model / embedder kayıt defteri
+# ---------------------------------------------------------------------- #
+_model_registry: Dict[str, Dict[str, Any]] = {}
+_embedder_registry: Dict[tuple, "LocalEmbedder"] = {}
+_cache_registry: Dict[str, EmbeddingCache] = {}
+_tokenizer_registry: Dict[str, Any] = {}
+_registry_lock = threading.RLock()
+
+
+def _get_rss_mb() -> Optional[float]:
+    """Process'in resident memory kullanımı (MB)"""
+    try:
+        import psutil
+
+        return psutil.Process(os.getpid()).memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        # Linux'ta /proc anlık RSS verir
+        with open("/proc/self/statm") as f:
+            rss_pages = int(f.read().split()[1])
+        return rss_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except Exception:
+        pass
+    try:
+        import resource
+
+        # ru_maxrss: Linux'ta KB, macOS'ta byte (tepe değer)
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        divisor = 1024 * 1024 if os.uname().sysname == "Darwin" else 1024
+        return maxrss / divisor
+    except Exception:
+        return None
+
+
+def load_shared_model(model_name: str) -> Dict[str, Any]:
+    """SentenceTransformer modelini process başına bir kez yükler"""
+    with _registry_lock:
+        entry = _model_registry.get(model_name)
+        if entry is not None:
+            return entry
+
+        print(f"🤖 SentenceTransformer modeli yükleniyor: {model_name}")
+        rss_before = _get_rss_mb()
+        start_time = time.time()
+        model = SentenceTransformer(model_name)
+        load_time = time.time() - start_time
+        rss_after = _get_rss_mb()
+
+        entry = {
+            "model": model,
+            "lock": threading.Lock(),
+            "load_time_seconds": round(load_time, 3),
+            "rss_before_mb": round(rss_before, 1) if rss_before is not None else None,
+            "rss_after_mb": round(rss_after, 1) if rss_after is not None else None,
+            "rss_delta_mb": (
+                round(rss_after - rss_before, 1)
+                if rss_before is not None and rss_after is not None
+                else None
+            ),
+            "loaded_at": datetime.now().isoformat(),
+        }
+        _model_registry[model_name] = entry
+        logger.info(
+            f"✅ Model yüklendi: {model_name} ({load_time:.2f}s, "
+            f"RSS +{entry['rss_delta_mb']} MB)"
+        )
+        return entry
+
+
+def get_shared_cache(cache_dir: str = config.EMBEDDING_CACHE_DIR) -> EmbeddingCache:
+    """Aynı cache dizini için tek EmbeddingCache örneği döndürür"""
+    key = os.path.abspath(cache_dir)
+    with _registry_lock:
+        if key not in _cache_registry:
+            cache = EmbeddingCache(cache_dir)
+            # Çıkışta bekleyen vektörler kaybolmasın
+            atexit.register(cache._save_cache)
+            _cache_registry[key] = cache
+        return _cache_registry[key]
+
+
+def get_embedder(
+    model: Optional[str] = None,
+    enable_cache: bool = True,
+    custom_dimensions: Optional[int] = None,
+    max_retries: int = 3,
+    retry_delay: float = 1.0,
+) -> LocalEmbedder:
+    """
+    Paylaşılan, thread-safe LocalEmbedder döndürür.
+
+    api.py, HybridRetriever, ChromaDBManager ve embedding pipeline'ı aynı
+    modeli ve cache'i kullanır; model process başına bir kez yüklenir.
+    """
+    model = model or config.EMBEDDING_MODEL
+    key = (model, enable_cache, custom_dimensions)
+    with _registry_lock:
+        if key not in _embedder_registry:
+            _embedder_registry[key] = LocalEmbedder(
+                model=model,
+                enable_cache=enable_cache,
+                max_retries=max_retries,
+                retry_delay=retry_delay,
+                custom_dimensions=custom_dimensions,
+            )
+        return _embedder_registry[key]
+
+
+def get_tokenizer(model_name: str = config.EMBEDDING_MODEL):
+    """
+    Chunk boyutlandırma için modelin tokenizer'ı. Model bu process'te zaten
+    yüklüyse onun tokenizer'ı, değilse yalnızca tokenizer yüklenir (chunklama
+    worker'ları tüm modeli yüklemez). Bulunamazsa None.
+    """
+    with _registry_lock:
+        if model_name in _tokenizer_registry:
+            return _tokenizer_registry[model_name]
+
+        tokenizer = None
+        entry = _model_registry.get(model_name)
+        if entry is not None:
+            tokenizer = getattr(entry["model"], "tokenizer", None)
+        if tokenizer is None:
+            try:
+                from transformers import AutoTokenizer
+
+                repo = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+                tokenizer = AutoTokenizer.from_pretrained(repo)
+            except Exception as e:
+                logger.warning(f"⚠️ Tokenizer yüklenemedi ({model_name}), tahmini token sayısı kullanılacak: {e}")
+        _tokenizer_registry[model_name] = tokenizer
+        return tokenizer
+
+
+def get_model_max_tokens(model_name: str = config.EMBEDDING_MODEL) -> int:
+    """Modelin kırptığı token sınırı (özel token'lar dahil)"""
+    entry = _model_registry.get(model_name)
+    if entry is not None:
+        max_seq_length = getattr(entry["model"], "max_seq_length", None)
+        if max_seq_length:
+            return int(max_seq_length)
+    return LocalEmbedder.SUPPORTED_MODELS.get(model_name, {}).get("max_tokens", 128)
+
+
+def get_model_load_stats() -> Dict[str, Dict[str, Any]]:
+    """Yüklü modellerin yükleme süresi ve bellek istatistikleri"""
+    with _registry_lock:
+        return {
+            name: {k: v for k, v in entry.items() if k not in ("model", "lock")}
+            for name, entry in _model_registry.items()
+        }
+
+
 def validate_input_data(data: List[Dict[str, Any]]) -> Dict[str, Any]:
     """Input verisini valide et"""
     stats = {
@@ -623,10 +889,20 @@ def validate_input_data(data: List[Dict[str, Any]]) -> Dict[str, Any]:
 
 
 def process_documents_with_embeddings(
-    input_file: str, output_file: str, model_config: Optional[Dict[str, Any]] = None
+    input_file: str,
+    output_file: str,
+    model_config: Optional[Dict[str, Any]] = None,
+    follow: bool = False,
 ) -> Dict[str, Any]:
-    """Dokümanları embedding'lerle işle"""
-    print("🚀 Embedding işlemi başlıyor...")
+    """
+    Dokümanları embedding'lerle işle (JSONL akışı).
+
+    Girdi kayıt kayıt okunur, her dokümanın embedding'leri hesaplanıp base64
+    float32 olarak hemen çıktıya yazılır. follow=True ise girdi dosyası önceki
+    aşama tarafından hâlâ yazılırken takip edilir.
+    """
+    from jsonl_io import iter_records, JsonlWriter
+
     # Default config
     default_config = {
         "model": "paraphrase-multilingual-MiniLM-L12-v2",
@@ -647,39 +923,8 @@ def process_documents_with_embeddings(
     print(f"📄 Girdi: {input_file}")
     print(f"💾 Çıktı: {output_file}")
 
-    # Input dosyasını yükle
-    try:
-        with open(input_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception as e:
-        print(f"❌ Input dosyası okunamadı: {e}")
-        raise
-
-    if not data:
-        logger.error("❌ Input dosyası boş")
-        return {"error": "Empty input file"}
-
-    # Input verisini valide et
-    if default_config["validate_input"]:
-        logger.info("🔍 Input verisi valide ediliyor...")
-        validation_stats = validate_input_data(data)
-        
-        logger.info("📊 VERİ VALİDASYON SONUÇLARI:")
-        logger.info(f"   Toplam doküman: {validation_stats['total_documents']}")
-        logger.info(f"   Chunk'lı doküman: {validation_stats['documents_with_chunks']}")
-        logger.info(f"   Toplam chunk: {validation_stats['total_chunks']}")
-        logger.info(f"   Geçerli chunk: {validation_stats['valid_chunks']}")
-        logger.info(f"   Boş chunk: {validation_stats['empty_chunks']}")
-        
-        if validation_stats["issues"]:
-            logger.warning(f"⚠️ {len(validation_stats['issues'])} sorun tespit edildi")
-            for issue in validation_stats["issues"][:10]:  # İlk 10 sorunu göster
-                logger.warning(f"   - {issue}")
-            if len(validation_stats["issues"]) > 10:
-                logger.warning(f"   ... ve {len(validation_stats['issues']) - 10} sorun daha")
-
-    # Embedder oluştur
-    embedder = LocalEmbedder(
+    # Paylaşılan embedder'ı al (model zaten yüklüyse yeniden yüklenmez)
+    embedder = get_embedder(
         model=default_config["model"],
         enable_cache=default_config["use_cache"],
         max_retries=default_config["max_retries"],
@@ -688,68 +933,75 @@ def process_documents_with_embeddings(
     )
 
     # İstatistikler
-    total_documents = len(data)
-    total_chunks = sum(len(item.get("chunks", [])) for item in data)
+    total_documents = 0
+    total_chunks = 0
     processed_chunks = 0
     successful_documents = 0
+    validation_stats = {"empty_chunks": 0, "valid_chunks": 0, "issues": []}
 
-    print(f"📊 {total_documents} doküman, {total_chunks} chunk işlenecek")
+    # Backup eski dosya
+    if os.path.exists(output_file):
+        backup_file = f"{output_file}.backup_{int(time.time())}"
+        os.rename(output_file, backup_file)
+        logger.info(f"📁 Backup oluşturuldu: {backup_file}")
 
     try:
-        for doc_idx, item in enumerate(data, 1):
-            chunks = item.get("chunks", [])
-            if not chunks:
-                logger.warning(f"⚠️ Doküman {doc_idx} chunk'ları boş, atlanıyor")
-                item["embeddings"] = []
-                continue
-
-            filename = item.get("filename", f"Document_{doc_idx}")
-            logger.info(f"[{doc_idx}/{total_documents}] İşleniyor: {filename}")
-
-            try:
-                # Embedding hesapla
-                if default_config["use_ensemble"] and default_config["ensemble_models"]:
-                    embeddings = embedder.embed_with_ensemble(
-                        chunks, models=default_config["ensemble_models"]
-                    )
-                else:
-                    embeddings = embedder.embed_batch(
-                        chunks, 
-                        batch_size=default_config["batch_size"], 
-                        show_progress=False
+        with JsonlWriter(output_file) as writer:
+            for doc_idx, item in enumerate(iter_records(input_file, follow=follow), 1):
+                total_documents += 1
+                chunks = item.get("chunks", [])
+                total_chunks += len(chunks)
+
+                # Input verisini kayıt bazında valide et
+                if default_config["validate_input"]:
+                    item_stats = validate_input_data([item])
+                    validation_stats["empty_chunks"] += item_stats["empty_chunks"]
+                    validation_stats["valid_chunks"] += item_stats["valid_chunks"]
+                    validation_stats["issues"].extend(
+                        f"{item.get('filename', doc_idx)}: {issue}" for issue in item_stats["issues"]
                     )
 
-                # Numpy array'leri liste'ye çevir
-                embeddings_list = []
-                for emb in embeddings:
-                    if emb is not None:
-                        embeddings_list.append(emb.tolist())
+                if not chunks:
+                    logger.warning(f"⚠️ Doküman {doc_idx} chunk'ları boş, atlanıyor")
+                    item["embeddings"] = np.zeros((0, embedder.model_info["dimensions"]), dtype=np.float32)
+                    writer.write(item)
+                    continue
+
+                filename = item.get("filename", f"Document_{doc_idx}")
+                logger.info(f"[{doc_idx}] İşleniyor: {filename}")
+
+                try:
+                    # Embedding hesapla
+                    if default_config["use_ensemble"] and default_config["ensemble_models"]:
+                        embeddings = np.stack(
+                            embedder.embed_with_ensemble(chunks, models=default_config["ensemble_models"])
+                        ).astype(np.float32, copy=False)
                     else:
-                        # Fallback: sıfır vektör
-                        embeddings_list.append([0.0] * embedder.model_info["dimensions"])
-
-                item["embeddings"] = embeddings_list
-                processed_chunks += len(chunks)
-                successful_documents += 1
-
-                print(f"   ✅ {len(chunks)} chunk embedding tamamlandı")
-
-            except Exception as e:
-                logger.error(f"   ❌ Doküman {doc_idx} embedding hatası: {e}")
-                # Fallback: boş embedding listesi
-                item["embeddings"] = [[0.0] * embedder.model_info["dimensions"]] * len(chunks)
-
-        # Sonuçları kaydet
-        logger.info("💾 Sonuçlar kaydediliyor...")
+                        # Tek (n, dim) float32 matris; JSONL'a base64 olarak aynen yazılır
+                        embeddings = embedder.embed_batch_array(
+                            chunks,
+                            batch_size=default_config["batch_size"],
+                            show_progress=False
+                        )
+                    item["embeddings"] = embeddings
+                    processed_chunks += len(chunks)
+                    successful_documents += 1
+
+                    print(f"   ✅ {len(chunks)} chunk embedding tamamlandı")
+
+                except Exception as e:
+                    logger.error(f"   ❌ Doküman {doc_idx} embedding hatası: {e}")
+                    # Fallback: sıfır embedding'ler
+                    item["embeddings"] = np.zeros(
+                        (len(chunks), embedder.model_info["dimensions"]), dtype=np.float32
+                    )
 
-        # Backup eski dosya
-        if os.path.exists(output_file):
-            backup_file = f"{output_file}.backup_{int(time.time())}"
-            os.rename(output_file, backup_file)
-            logger.info(f"📁 Backup oluşturuldu: {backup_file}")
+                writer.write(item)
 
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        if validation_stats["issues"]:
+            logger.warning(f"⚠️ {len(validation_stats['issues'])} sorun tespit edildi")
+            for issue in validation_stats["issues"][:10]:  # İlk 10 sorunu göster
+                logger.warning(f"   - {issue}")
 
         # Dosya boyutu kontrolü
         file_size = os.path.getsize(output_file) / (1024 * 1024)
@@ -761,6 +1013,7 @@ def process_documents_with_embeddings(
             "successful_documents": successful_documents,
             "total_chunks": total_chunks,
             "processed_chunks": processed_chunks,
+            "empty_chunks": validation_stats["empty_chunks"],
             "output_file_size_mb": file_size,
             "model_info": embedder.get_model_info(),
             "success_rate": (successful_documents / total_documents) * 100 if total_documents > 0 else 0,
@@ -785,9 +1038,9 @@ def process_documents_with_embeddings(
 
 
 def main():
-    """uploads_base.json'daki verileri embed ederek uploads_with_embed.json'a kaydeder"""
-    input_file = "uploads_base.json"
-    output_file = "uploads_with_embed.json"
+    """uploads_base.jsonl'daki verileri embed ederek uploads_with_embed.jsonl'a kaydeder"""
+    input_file = "uploads_base.jsonl"
+    output_file = "uploads_with_embed.jsonl"
 
     embedding_config = {
         "model": "text-embedding-3-small",  # Veya "text-embedding-3-large"
@@ -807,13 +1060,13 @@ def main():
     )
 
     try:
-        logger.info("🚀 uploads_base.json embedding işlemi başlıyor...")
+        logger.info("🚀 uploads_base.jsonl embedding işlemi başlıyor...")
         stats = process_documents_with_embeddings(
             input_file=input_file,
             output_file=output_file,
             model_config=embedding_config,
         )
-        logger.info(f"✅ uploads_with_embed.json kaydedildi. İstatistikler: {stats}")
+        logger.info(f"✅ uploads_with_embed.jsonl kaydedildi. İstatistikler: {stats}")
     except Exception as e:
         logger.error(f"❌ Ana işlem hatası: {e}")
         raise
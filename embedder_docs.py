@@ -1,18 +1,29 @@
 # embedder_docs.py
 """
-Sadece data.json'u embedleyip embedded_data.json olarak kaydeder.
+Sadece data.jsonl'u embedleyip embedded_data.jsonl olarak kaydeder.
+
+--follow ile base_docs data.jsonl'u hâlâ yazarken kayıtları tüketir.
+
+Kullanım: python embedder_docs.py [--follow]
 """
 import os
+import sys
 from embedder import process_documents_with_embeddings
 
 def main():
-    INPUT_JSON = "data.json"
-    OUTPUT_JSON = "embedded_data.json"
-    if not os.path.exists(INPUT_JSON):
-        print(f"[embedder_docs] {INPUT_JSON} yok.")
+    INPUT_JSONL = "data.jsonl"
+    OUTPUT_JSONL = "embedded_data.jsonl"
+    follow = "--follow" in sys.argv[1:]
+    if not follow and not os.path.exists(INPUT_JSONL):
+        print(f"[embedder_docs] {INPUT_JSONL} yok.")
         return
-    process_documents_with_embeddings(INPUT_JSON, OUTPUT_JSON)
-    print(f"[embedder_docs] {OUTPUT_JSON} kaydedildi.")
+
+    # Değişen dosya yoksa çıktı yalnızca bitiş satırından oluşur, önceki çıktı tekrar kullanılmaz
+    stats = process_documents_with_embeddings(INPUT_JSONL, OUTPUT_JSONL, follow=follow)
+    print(
+        f"[embedder_docs] {OUTPUT_JSONL} kaydedildi. "
+        f"{stats.get('total_documents', 0)} doküman, {stats.get('processed_chunks', 0)} chunk."
+    )
 
 if __name__ == "__main__":
     main()
@@ -1,8 +1,9 @@
 import os
+import time
+import shutil
+import threading
 from flask import Blueprint, request, jsonify, send_from_directory
 from werkzeug.utils import secure_filename
-import shutil
-import subprocess
 
 UPLOAD_FOLDER = 'newdocs'
 DOCS_FOLDER = 'docs'
@@ -12,32 +13,103 @@ file_api = Blueprint('file_api', __name__)
 
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# API process'inde zaten yüklü olan bileşenler (init_file_api ile verilir)
+_components = {'processor': None, 'embedder': None, 'chroma_manager': None}
+# Aynı anda iki istek newdocs klasörünü işleyip taşımasın
+_process_lock = threading.Lock()
+
+
+def init_file_api(processor=None, embedder=None, chroma_manager=None):
+    """Blueprint'in kullanacağı paylaşılan processor / embedder / chroma_manager'ı ayarla"""
+    _components.update(processor=processor, embedder=embedder, chroma_manager=chroma_manager)
+
+
+def _get_components():
+    """Ayarlanmamış bileşenleri ilk kullanımda oluştur (model bir kez yüklenir)"""
+    if _components['processor'] is None:
+        from base import AdvancedDocumentProcessor
+        _components['processor'] = AdvancedDocumentProcessor()
+    if _components['embedder'] is None:
+        from config import config
+        from embedder import get_embedder
+        _components['embedder'] = get_embedder(config.EMBEDDING_MODEL)
+    if _components['chroma_manager'] is None:
+        from chroma import get_chroma_manager
+        _components['chroma_manager'] = get_chroma_manager()
+    return _components['processor'], _components['embedder'], _components['chroma_manager']
+
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+
+def _index_file(file_path, processor, embedder, chroma_manager):
+    """Tek dosyayı bellekte extract -> chunk -> embed -> index et, süreleri döndür"""
+    timings = {}
+
+    # 1. Metin çıkarma + chunklama
+    started = time.perf_counter()
+    record = processor.process_file(file_path)
+    timings['chunk_seconds'] = round(time.perf_counter() - started, 3)
+    if not record:
+        return None, timings
+
+    # 2. Embedding (paylaşılan model, diske ara dosya yazılmaz)
+    started = time.perf_counter()
+    record['embeddings'] = embedder.embed_batch_array(record['chunks'], show_progress=False)
+    timings['embed_seconds'] = round(time.perf_counter() - started, 3)
+
+    # 3. ChromaDB + BM25 (eski sürümden yalnızca değişen chunk'lar yazılır / silinir)
+    started = time.perf_counter()
+    filename = record['filename']
+    checksum = record.get('document_metadata', {}).get('checksum')
+    chroma_stats = chroma_manager.add_documents_batch([record], batch_size=1000, skip_duplicates=True)
+    timings['index_seconds'] = round(time.perf_counter() - started, 3)
+
+    return {
+        'filename': filename,
+        'checksum': checksum,
+        'chunk_count': record['chunk_count'],
+        'total_added': chroma_stats.get('total_added', 0),
+        'chunk_ids': chroma_stats.get('ids_by_source', {}).get(filename, []),
+    }, timings
+
+
 @file_api.route('/api/docs/process_new', methods=['POST'])
 def process_new_docs():
-    # 1. base.py ile new_data.json oluştur
-    base_result = subprocess.run(['python', 'base.py', '--input', UPLOAD_FOLDER, '--output', 'new_data.json'], capture_output=True, text=True)
-    if base_result.returncode != 0:
-        return jsonify({'error': 'base.py failed', 'details': base_result.stderr}), 500
-    # 2. embedder.py ile new_data_with_embeddings.json oluştur
-    embed_result = subprocess.run(['python', 'embedder.py', '--input', 'new_data.json', '--output', 'new_data_with_embeddings.json'], capture_output=True, text=True)
-    if embed_result.returncode != 0:
-        return jsonify({'error': 'embedder.py failed', 'details': embed_result.stderr}), 500
-    # 3. chroma.py ile chroma'ya ekle
-    chroma_result = subprocess.run(['python', 'chroma.py', '--input', 'new_data_with_embeddings.json'], capture_output=True, text=True)
-    if chroma_result.returncode != 0:
-        return jsonify({'error': 'chroma.py failed', 'details': chroma_result.stderr}), 500
-    # 4. newdocs içindekileri docs'a taşı
-    for fname in os.listdir(UPLOAD_FOLDER):
-        shutil.move(os.path.join(UPLOAD_FOLDER, fname), os.path.join(DOCS_FOLDER, fname))
-    # 5. new jsonları ana jsonlara ekle/taşı (örnek: eduroam_data.json)
-    # Burada birleştirme veya taşıma işlemi yapılabilir, örnek olarak taşıyalım:
-    shutil.move('new_data.json', 'eduroam_data.json')
-    shutil.move('new_data_with_embeddings.json', 'eduroam_data_with_embeddings.json')
-    # 6. newdocs klasörünü temizle
-    for fname in os.listdir(UPLOAD_FOLDER):
-        os.remove(os.path.join(UPLOAD_FOLDER, fname))
-    return jsonify({'success': True})
+    """newdocs klasöründeki dosyaları API process'i içinde işleyip docs'a taşı"""
+    if not _process_lock.acquire(blocking=False):
+        return jsonify({'error': 'Başka bir işleme devam ediyor'}), 409
+    try:
+        processor, embedder, chroma_manager = _get_components()
+        os.makedirs(DOCS_FOLDER, exist_ok=True)
+
+        processed, failed = [], []
+        for file_path in processor._get_supported_files(UPLOAD_FOLDER):
+            fname = os.path.basename(file_path)
+            try:
+                result, timings = _index_file(file_path, processor, embedder, chroma_manager)
+            except Exception as e:
+                failed.append({'filename': fname, 'error': str(e)})
+                continue
+            if not result:
+                failed.append({'filename': fname, 'error': 'Chunk oluşturulamadı'})
+                continue
+
+            # 4. docs'a taşı ve manifest'e işle
+            docs_path = os.path.join(DOCS_FOLDER, fname)
+            shutil.move(file_path, docs_path)
+            if result['chunk_ids']:
+                chroma_manager.manifest.record(fname, docs_path, result['checksum'], result['chunk_ids'])
+            processed.append({
+                'filename': fname,
+                'chunk_count': result['chunk_count'],
+                'total_added': result['total_added'],
+                **timings,
+            })
+
+        # İşlenemeyen dosyalar tekrar denenebilmesi için newdocs'ta kalır
+        status = 200 if not failed else 207
+        return jsonify({'success': not failed, 'processed': processed, 'failed': failed}), status
+    finally:
+        _process_lock.release()
@@ -326,7 +326,7 @@ const ChatBot: React.FC = () => {
 
   useEffect(() => {
     // En çok sorulan soruları backend'den çek
-    fetch("/api/admin/stats", { cache: "no-store" })
+    fetch("/api/admin/stats", { cache: "no-cache" })
       .then((res) => res.json())
       .then((data) => {
         if (data.topQuestions && data.topQuestions.length > 0) {
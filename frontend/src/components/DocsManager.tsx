@@ -63,6 +63,24 @@ interface DocFile {
   keyword?: string;
 }
 
+interface IngestionJob {
+  id: string;
+  filename: string;
+  status: 'queued' | 'running' | 'completed' | 'failed';
+  stage?: 'extract' | 'chunk' | 'embed' | 'index';
+  progress: number;
+  error?: string;
+}
+
+const STAGE_LABELS: Record<string, string> = {
+  extract: 'Metin çıkarılıyor',
+  chunk: 'Parçalanıyor',
+  embed: 'Embedding hesaplanıyor',
+  index: 'Veritabanına ekleniyor',
+};
+
+const JOB_POLL_INTERVAL_MS = 1500;
+
 interface SnackbarState {
   open: boolean;
   message: string;
@@ -80,6 +98,7 @@ const DocsManager: React.FC = () => {
   const [pendingFile, setPendingFile] = useState<File | null>(null);
   const [keyword, setKeyword] = useState('');
   const [uploading, setUploading] = useState(false);
+  const [uploadJob, setUploadJob] = useState<IngestionJob | null>(null);
   const [dropActive, setDropActive] = useState(false);
   const [selectMenuAnchor, setSelectMenuAnchor] = useState<null | HTMLElement>(null);
   const fileInputRef = useRef<HTMLInputElement>(null);
@@ -200,17 +219,40 @@ const DocsManager: React.FC = () => {
         setUploading(false);
         return;
       }
-      setSnackbar({open: true, message: 'Dosya başarıyla yüklendi ve işlendi.', severity: 'success'});
-      setKeyword('');
-      setPendingFile(null);
-      fetchDocs();
+      // İşlem arka planda sürüyor; iş durumunu tamamlanana kadar yokla
+      const job = await waitForIngestionJob(uploadData.job_id);
+      if (job.status === 'failed') {
+        setSnackbar({open: true, message: `İşleme hatası: ${job.error || 'Bilinmeyen hata'}`, severity: 'error'});
+      } else {
+        setSnackbar({open: true, message: 'Dosya başarıyla yüklendi ve işlendi.', severity: 'success'});
+        setKeyword('');
+        setPendingFile(null);
+        fetchDocs();
+      }
     } catch (err) {
       console.error('Upload error:', err);
       setSnackbar({open: true, message: `Sunucu hatası: ${err instanceof Error ? err.message : 'Bilinmeyen hata'}`, severity: 'error'});
     }
+    setUploadJob(null);
     setUploading(false);
   };
 
+  const waitForIngestionJob = async (jobId: string): Promise<IngestionJob> => {
+    while (true) {
+      const res = await fetch(`/api/admin/ingestion/jobs/${jobId}`);
+      const data = await res.json();
+      if (!res.ok) {
+        throw new Error(data.error || 'İş durumu alınamadı');
+      }
+      const job: IngestionJob = data.job;
+      setUploadJob(job);
+      if (job.status === 'completed' || job.status === 'failed') {
+        return job;
+      }
+      await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+    }
+  };
+
   const normalize = (str: string) =>
     (str || '')
       .toLocaleLowerCase('tr-TR')
@@ -1041,8 +1083,17 @@ const DocsManager: React.FC = () => {
               )}
             </Button>
             
+            {uploading && uploadJob && (
+              <Typography variant="body2" sx={{ mt: 2, color: '#64748b' }}>
+                {uploadJob.status === 'queued'
+                  ? 'Sırada bekliyor...'
+                  : `${STAGE_LABELS[uploadJob.stage || 'extract']} (%${Math.round(uploadJob.progress * 100)})`}
+              </Typography>
+            )}
             {uploading && (
               <LinearProgress 
+                variant={uploadJob ? 'determinate' : 'indeterminate'}
+                value={uploadJob ? uploadJob.progress * 100 : undefined}
                 sx={{ 
                   mt: 2, 
                   borderRadius: 1,
@@ -105,7 +105,7 @@ const Stats: React.FC = () => {
   const fetchStats = async () => {
     setLoading(true);
     try {
-      const res = await fetch("/api/admin/stats", { cache: "no-store" });
+      const res = await fetch("/api/admin/stats", { cache: "no-cache" });
       if (!res.ok) throw new Error("API hatası");
       const data = await res.json();
       
@@ -1,42 +1,23 @@
-import chromadb
 import re
 from typing import List, Dict, Any, Tuple, Optional, Union
-from embedder import LocalEmbedder
+from embedder import get_embedder
+from chroma import get_chroma_manager
 from config import config
 from query_processor import QueryProcessor
+from bm25_index import get_bm25_index
+from micro_batcher import get_query_batcher
 
 
 class HybridRetriever:
     """Semantic ve keyword-based aramayı birleştiren hibrit retrieval sistemi"""
 
     def __init__(self, chroma_path: str = "./chroma"):
-        self.client = chromadb.PersistentClient(path=chroma_path)
-        self.model = LocalEmbedder(model=config.EMBEDDING_MODEL)
+        # Koleksiyon paylaşılan manager üzerinden okunur; optimize_collection
+        # koleksiyonu yeniden kurduğunda eski referans kalmaz
+        self.chroma_manager = get_chroma_manager(chroma_path)
+        self.model = get_embedder(config.EMBEDDING_MODEL)
+        self.query_batcher = get_query_batcher(self.model)
         self.query_processor = QueryProcessor()
-        
-        # Local embedding function tanımla
-        def embedding_function(texts):
-            if isinstance(texts, str):
-                texts = [texts]
-            embeddings = []
-            for text in texts:
-                embedding = self.model.embed_single(text)
-                embeddings.append(embedding.tolist())
-            return embeddings
-        
-        # Custom embedding function class
-        class LocalEmbeddingFunction:
-            def __call__(self, input):
-                return embedding_function(input)
-        
-        # Collection'ı oluştur
-        try:
-            self.collection = self.client.get_collection("rag_documents")
-        except:
-            self.collection = self.client.create_collection(
-                name="rag_documents",
-                embedding_function=LocalEmbeddingFunction()
-            )
 
         # TF-IDF için basit implementasyon
         self.keyword_weights = {
@@ -48,10 +29,32 @@ class HybridRetriever:
             "şart": 2.0,
         }
 
+        # Keyword arama için kalıcı BM25 inverted index
+        self.bm25_index = get_bm25_index(chroma_path)
+        self._ensure_bm25_index()
+
+    @property
+    def collection(self):
+        return self.chroma_manager.collection
+
+    def _ensure_bm25_index(self):
+        """Index boşsa (ilk çalıştırma / eski kurulum) koleksiyondan oluştur"""
+        try:
+            if len(self.bm25_index) == 0 and self.collection.count() > 0:
+                self.bm25_index.rebuild_from_collection(self.collection)
+        except Exception as e:
+            print(f"⚠️ BM25 index oluşturulamadı: {e}")
+
     def embed_query(self, text: str) -> List[float]:
-        embedding = self.model.embed_single(text)
+        # Eşzamanlı sorgular micro-batcher'da tek encode çağrısında birleşir
+        embedding = self.query_batcher.embed(text)
         return embedding.tolist()
 
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Birden fazla sorguyu aynı micro-batch'te embed et"""
+        futures = [self.query_batcher.submit(text) for text in texts]
+        return [future.result(timeout=30.0).tolist() for future in futures]
+
     def semantic_search(
         self, query: str, n_results: Optional[int] = None
     ) -> Dict[str, Any]:
@@ -69,6 +72,7 @@ class HybridRetriever:
 
         # ChromaDB QueryResult'ı Dict'e çevir
         return {
+            "ids": results.get("ids", [[]]),
             "documents": results.get("documents", [[]]),
             "metadatas": results.get("metadatas", [[]]),
             "distances": results.get("distances", [[]]),
@@ -78,30 +82,44 @@ class HybridRetriever:
         self, query: str, n_results: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """Keyword-based arama"""
+        return self.keyword_search_many([query], n_results)[0]
+
+    def keyword_search_many(
+        self, queries: List[str], n_results: Optional[int] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """Birden fazla sorgu için keyword arama (tek aday geçişi, tek Chroma okuması)"""
         if n_results is None:
             n_results = config.DEFAULT_N_RESULTS
 
-        # Tüm dokümanları al (bu gerçek uygulamada optimize edilmeli)
-        all_docs = self.collection.get(include=["documents", "metadatas"])
-
-        processed_query = self.query_processor.process_query(query)
-        keywords = processed_query["keywords"]
-
-        scored_docs = []
-
-        # None check'leri ekle
-        documents = all_docs.get("documents", [])
-        metadatas = all_docs.get("metadatas", [])
-        ids = all_docs.get("ids", [])
-
-        if not documents or not metadatas:
-            return []
+        keywords_per_query = [
+            self.query_processor.process_query(query)["keywords"] for query in queries
+        ]
 
-        for i, (doc, metadata) in enumerate(zip(documents, metadatas)):
+        # Inverted index üzerinden top-k seçimi, sadece kazanan chunk'lar çekilir
+        hits_per_query = self.bm25_index.search_many(
+            keywords_per_query, n_results, term_weights=self.keyword_weights
+        )
+        hit_ids = list({doc_id for hits in hits_per_query for doc_id, _ in hits})
+        if not hit_ids:
+            return [[] for _ in queries]
+
+        fetched = self.collection.get(ids=hit_ids, include=["documents", "metadatas"])
+
+        by_id = {}
+        for doc_id, doc, metadata in zip(
+            fetched.get("ids", []) or [],
+            fetched.get("documents", []) or [],
+            fetched.get("metadatas", []) or [],
+        ):
             if doc and metadata:  # None check
-                score = self.calculate_keyword_score(doc, keywords)
-                if score > 0:
-                    doc_id = ids[i] if i < len(ids) else f"doc_{i}"
+                by_id[doc_id] = (doc, metadata)
+
+        results = []
+        for hits in hits_per_query:
+            scored_docs = []
+            for doc_id, score in hits:
+                if doc_id in by_id:
+                    doc, metadata = by_id[doc_id]
                     scored_docs.append(
                         {
                             "document": doc,
@@ -110,11 +128,9 @@ class HybridRetriever:
                             "id": doc_id,
                         }
                     )
+            results.append(scored_docs)
 
-        # Score'a göre sırala
-        scored_docs.sort(key=lambda x: x["score"], reverse=True)
-
-        return scored_docs[:n_results]
+        return results
 
     def calculate_keyword_score(self, document: str, keywords: List[str]) -> float:
         """Doküman için keyword score hesapla"""
@@ -153,19 +169,38 @@ class HybridRetriever:
         # Keyword arama
         keyword_results = self.keyword_search(query, n_results * 2)
 
-        # Sonuçları birleştir ve skorla
+        return self._fuse_results(
+            semantic_results.get("ids", [[]])[0],
+            semantic_results.get("documents", [[]])[0],
+            semantic_results.get("metadatas", [[]])[0],
+            semantic_results.get("distances", [[]])[0],
+            keyword_results,
+            n_results,
+            semantic_weight,
+            keyword_weight,
+        )
+
+    def _fuse_results(
+        self,
+        ids: List[str],
+        docs: List[str],
+        metadatas: List[Dict[str, Any]],
+        distances: List[float],
+        keyword_results: List[Dict[str, Any]],
+        n_results: int,
+        semantic_weight: float = 0.7,
+        keyword_weight: float = 0.3,
+    ) -> List[Dict[str, Any]]:
+        """Semantic ve keyword sonuçlarını doküman metnine göre birleştirip skorla"""
         combined_results = {}
 
         # Semantic sonuçlar
-        docs = semantic_results.get("documents", [[]])[0]
-        metadatas = semantic_results.get("metadatas", [[]])[0]
-        distances = semantic_results.get("distances", [[]])[0]
-
-        for i, (doc, metadata, distance) in enumerate(zip(docs, metadatas, distances)):
-            doc_id = f"semantic_{i}"
+        if not ids:
+            ids = [None] * len(docs)
+        for doc_id, doc, metadata, distance in zip(ids, docs, metadatas, distances):
             semantic_score = 1.0 - distance  # Distance'i similarity'ye çevir
-
-            combined_results[doc_id] = {
+            combined_results[doc] = {
+                "id": doc_id,
                 "document": doc,
                 "metadata": metadata,
                 "semantic_score": semantic_score,
@@ -177,25 +212,19 @@ class HybridRetriever:
         # Keyword sonuçları ekle/güncelle
         for result in keyword_results:
             doc = result["document"]
-            # Aynı dokümanı bul
-            doc_id = None
-            for existing_id, existing_result in combined_results.items():
-                if existing_result["document"] == doc:
-                    doc_id = existing_id
-                    break
-
-            if doc_id:
+            existing = combined_results.get(doc)
+            if existing:
                 # Mevcut sonucu güncelle
-                combined_results[doc_id]["keyword_score"] = result["score"]
-                combined_results[doc_id]["combined_score"] = (
-                    combined_results[doc_id]["semantic_score"] * semantic_weight
+                existing["keyword_score"] = result["score"]
+                existing["combined_score"] = (
+                    existing["semantic_score"] * semantic_weight
                     + result["score"] * keyword_weight
                 )
-                combined_results[doc_id]["source"] = "hybrid"
+                existing["source"] = "hybrid"
             else:
                 # Yeni sonuç ekle
-                new_id = f"keyword_{len(combined_results)}"
-                combined_results[new_id] = {
+                combined_results[doc] = {
+                    "id": result.get("id"),
                     "document": doc,
                     "metadata": result["metadata"],
                     "semantic_score": 0.0,
@@ -221,11 +250,33 @@ class HybridRetriever:
         # Query'yi işle
         processed_query = self.query_processor.process_query(query)
 
-        # Farklı query varyantları dene
+        # Farklı query varyantları (en fazla 3) tek seferde işlenir:
+        # tek embedding batch'i, tek collection.query, tek keyword aday geçişi
+        variants = processed_query["expanded"][:3] or [query]
         all_results = []
 
-        for variant in processed_query["expanded"][:3]:  # En fazla 3 varyant
-            results = self.hybrid_search(variant, n_results)
+        variant_embeddings = self.embed_queries(variants)
+        semantic_results = self.collection.query(
+            query_embeddings=variant_embeddings,
+            n_results=min(n_results * 2, config.MAX_N_RESULTS),
+            include=["documents", "metadatas", "distances"],
+        )
+        keyword_results = self.keyword_search_many(variants, n_results * 2)
+
+        ids_per_variant = semantic_results.get("ids") or [[] for _ in variants]
+        docs_per_variant = semantic_results.get("documents") or [[] for _ in variants]
+        metas_per_variant = semantic_results.get("metadatas") or [[] for _ in variants]
+        dists_per_variant = semantic_results.get("distances") or [[] for _ in variants]
+
+        for i in range(len(variants)):
+            results = self._fuse_results(
+                ids_per_variant[i],
+                docs_per_variant[i],
+                metas_per_variant[i],
+                dists_per_variant[i],
+                keyword_results[i],
+                n_results,
+            )
             all_results.extend(results)
 
         # Sonuçları deduplicate et ve skorla
@@ -0,0 +1,252 @@
+"""
+Artımlı yeniden indeksleme için ingestion manifest'i.
+
+Chroma dizininde tutulan ingestion_manifest.json her indekslenmiş dosya için
+checksum, boyut/mtime, chunk ID'leri ve embedding modelini saklar.
+base_docs bu kayda bakarak yalnızca yeni veya değişmiş dosyaları işler;
+chroma_docs değişen dosyaların eski chunk'larını ve silinen dosyaların tüm
+chunk'larını kaldırıp manifest'i günceller. Boyut ve mtime değişmediyse dosya
+hash'lenmez, böylece değişmemiş bir korpusun taranması saniyeler sürer.
+"""
+import os
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterable
+
+from config import config
+from store_registry import PathRegistry
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "ingestion_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def chunking_fingerprint() -> str:
+    """
+    Chunk'ları belirleyen ayarların özeti; değişirse (ör. CHUNKING_MODE)
+    dosyalar model değişikliğindeki gibi yeniden işlenir
+    """
+    parts = [
+        config.CHUNKING_MODE,
+        f"parent={config.PARENT_CHUNK_SIZE}/{config.PARENT_CHUNK_OVERLAP}",
+    ]
+    if config.CHUNKING_MODE == "tokens":
+        max_tokens = config.CHUNK_MAX_TOKENS
+        if not max_tokens:
+            from embedder import get_model_max_tokens
+
+            max_tokens = f"model{get_model_max_tokens(config.EMBEDDING_MODEL)}"
+        parts.append(f"child={max_tokens}/{config.CHUNK_OVERLAP_TOKENS}")
+        parts.append(f"parents={int(bool(config.PARENT_CHUNKS_ENABLED))}")
+    return ";".join(parts)
+
+
+def is_current(entry: Optional[Dict[str, Any]], embedding_model: str = config.EMBEDDING_MODEL) -> bool:
+    """Kayıt güncel model ve chunking ayarlarıyla mı indekslendi"""
+    return bool(entry) and (
+        entry.get("embedding_model") == embedding_model
+        and entry.get("chunking") == chunking_fingerprint()
+    )
+
+
+def file_checksum(file_path: str) -> str:
+    """AdvancedDocumentProcessor._calculate_checksum ile aynı MD5"""
+    hasher = hashlib.md5()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class IngestionManifest:
+    """filename -> {path, checksum, size, mtime_ns, chunk_ids, embedding_model, chunking}"""
+
+    def __init__(self, manifest_path: str):
+        self.manifest_path = manifest_path
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self._loaded_mtime: Optional[float] = None
+        # persist=False ile yapılıp henüz save() edilmemiş değişiklikler (None = silindi)
+        self._pending: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._lock = threading.RLock()
+        self._load()
+
+    def _load(self):
+        with self._lock:
+            self.files = {}
+            if not os.path.exists(self.manifest_path):
+                return
+            try:
+                with open(self.manifest_path, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+                if state.get("version") != MANIFEST_VERSION:
+                    logger.warning("Ingestion manifest sürümü uyumsuz, tüm dosyalar yeniden işlenecek")
+                    return
+                self.files = state.get("files", {})
+                self._loaded_mtime = os.path.getmtime(self.manifest_path)
+            except Exception as e:
+                logger.warning(f"Ingestion manifest okunamadı: {e}")
+
+    def _maybe_reload(self):
+        """
+        Başka bir process manifest'i güncellediyse yeniden yükle; kaydedilmemiş
+        değişiklikler yeni içeriğin üzerine tekrar uygulanır.
+        """
+        try:
+            mtime = os.path.getmtime(self.manifest_path)
+        except OSError:
+            return
+        if self._loaded_mtime is None or mtime > self._loaded_mtime:
+            self._load()
+            for filename, entry in self._pending.items():
+                if entry is None:
+                    self.files.pop(filename, None)
+                else:
+                    self.files[filename] = entry
+
+    def save(self):
+        """Manifest'i atomik olarak yaz"""
+        with self._lock:
+            directory = os.path.dirname(self.manifest_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.manifest_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"version": MANIFEST_VERSION, "files": self.files},
+                    f,
+                    ensure_ascii=False,
+                    indent=1,
+                )
+            os.replace(tmp_path, self.manifest_path)
+            self._loaded_mtime = os.path.getmtime(self.manifest_path)
+            self._pending = {}
+
+    def get(self, filename: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._maybe_reload()
+            entry = self.files.get(filename)
+            return dict(entry) if entry else None
+
+    def plan(
+        self,
+        file_paths: List[str],
+        embedding_model: str = config.EMBEDDING_MODEL,
+    ) -> Dict[str, List[str]]:
+        """
+        Dosyaları new / changed / unchanged olarak sınıflandır, manifest'te olup
+        artık listede olmayan dosya adlarını removed olarak döndür.
+        """
+        plan = {"new": [], "changed": [], "unchanged": [], "removed": []}
+        touched = False
+        with self._lock:
+            self._maybe_reload()
+            seen = set()
+            for file_path in file_paths:
+                filename = os.path.basename(file_path)
+                seen.add(filename)
+                entry = self.files.get(filename)
+                if entry is None:
+                    plan["new"].append(file_path)
+                    continue
+                if not is_current(entry, embedding_model):
+                    plan["changed"].append(file_path)
+                    continue
+
+                stat = os.stat(file_path)
+                if entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+                    plan["unchanged"].append(file_path)
+                    continue
+
+                # Boyut/mtime farklı: içerik gerçekten değişti mi?
+                if file_checksum(file_path) == entry.get("checksum"):
+                    entry["size"] = stat.st_size
+                    entry["mtime_ns"] = stat.st_mtime_ns
+                    touched = True
+                    plan["unchanged"].append(file_path)
+                else:
+                    plan["changed"].append(file_path)
+
+            plan["removed"] = sorted(name for name in self.files if name not in seen)
+            if touched:
+                self.save()
+        return plan
+
+    def record(
+        self,
+        filename: str,
+        file_path: Optional[str],
+        checksum: str,
+        chunk_ids: List[str],
+        embedding_model: str = config.EMBEDDING_MODEL,
+        persist: bool = True,
+    ):
+        """İndekslenen dosyanın kaydını ekle / güncelle"""
+        entry = {
+            "path": file_path,
+            "checksum": checksum,
+            "size": None,
+            "mtime_ns": None,
+            "chunk_ids": list(chunk_ids),
+            "chunk_count": len(chunk_ids),
+            "embedding_model": embedding_model,
+            "chunking": chunking_fingerprint(),
+            "indexed_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        if file_path and os.path.exists(file_path):
+            stat = os.stat(file_path)
+            entry["size"] = stat.st_size
+            entry["mtime_ns"] = stat.st_mtime_ns
+        with self._lock:
+            self._maybe_reload()
+            self.files[filename] = entry
+            self._pending[filename] = entry
+            if persist:
+                self.save()
+
+    def remove(self, filenames: Iterable[str], persist: bool = True) -> List[str]:
+        """Kayıtları sil, silinen kayıtların chunk ID'lerini döndür"""
+        chunk_ids: List[str] = []
+        with self._lock:
+            self._maybe_reload()
+            removed = False
+            for filename in filenames:
+                entry = self.files.pop(filename, None)
+                if entry:
+                    self._pending[filename] = None
+                    chunk_ids.extend(entry.get("chunk_ids", []))
+                    removed = True
+            if persist and removed:
+                self.save()
+        return chunk_ids
+
+    def missing_files(self) -> List[str]:
+        """Kaydı olup diskteki dosyası artık bulunmayan dosya adları"""
+        with self._lock:
+            self._maybe_reload()
+            return sorted(
+                filename
+                for filename, entry in self.files.items()
+                if entry.get("path") and not os.path.exists(entry["path"])
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._maybe_reload()
+            return {
+                "files": len(self.files),
+                "chunks": sum(entry.get("chunk_count", 0) for entry in self.files.values()),
+            }
+
+
+_manifests = PathRegistry()
+
+
+def get_ingestion_manifest(chroma_path: str = "./chroma") -> IngestionManifest:
+    """Chroma dizini başına process genelinde tek manifest örneği döndür"""
+    return _manifests.get(
+        chroma_path, lambda: IngestionManifest(os.path.join(chroma_path, MANIFEST_FILENAME))
+    )
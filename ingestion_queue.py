@@ -0,0 +1,625 @@
+"""
+Kalıcı doküman işleme (ingestion) kuyruğu.
+
+/api/admin/upload_and_process dosyayı kaydedip yalnızca bir iş (job)
+oluşturur; çıkarma, chunklama, embedding ve ChromaDB'ye ekleme işleri arka
+plandaki worker thread'lerinde yapılır. İşler SQLite'ta tutulur, her aşamanın
+çıktısı iş dizinine yazılır. Çalışan işler heartbeat ile updated_at'lerini
+yeniler (lease); lease süresi dolan işler (process çökmüş / yeniden başlamış)
+kuyruğa geri alınır ve tamamlanmış aşamalar atlanarak kaldığı yerden devam
+eder. Aynı veritabanını kullanan birden fazla process birbirinin canlı işini
+almaz.
+"""
+import os
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import logging
+import threading
+from dataclasses import asdict
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, List
+
+import numpy as np
+
+from config import config
+from jsonl_io import encode_embeddings
+
+logger = logging.getLogger(__name__)
+
+STAGES = ["extract", "chunk", "embed", "index"]
+
+# Aşamaların toplam ilerlemedeki ağırlıkları (embedding en uzun süren aşama)
+STAGE_WEIGHTS = {"extract": 0.2, "chunk": 0.1, "embed": 0.5, "index": 0.2}
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+# enhanced_document_data*.json dosyaları birden fazla iş tarafından güncellenir
+catalog_lock = threading.Lock()
+
+
+def update_enhanced_catalogs(
+    record: Dict[str, Any], embed_record: Dict[str, Any], keyword: Optional[str] = None
+):
+    """
+    enhanced_document_data*.json dosyalarına yaz; aynı adla yeniden işlenen
+    dosyanın eski kaydı yenisiyle değiştirilir (yeni kayıtta anahtar kelime
+    yoksa eskisininki korunur)
+    """
+    targets = [
+        ("enhanced_document_data.json", record),
+        ("enhanced_document_data_with_embeddings.json", embed_record),
+    ]
+    with catalog_lock:
+        for path, item in targets:
+            try:
+                if os.path.exists(path):
+                    with open(path, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                else:
+                    data = []
+                previous = [existing for existing in data if existing.get("filename") == item.get("filename")]
+                data = [existing for existing in data if existing.get("filename") != item.get("filename")]
+                item = dict(item)
+                if isinstance(item.get("embeddings"), np.ndarray):
+                    item["embeddings"] = encode_embeddings(item["embeddings"])
+                if not item.get("keyword"):
+                    keyword_value = keyword or next(
+                        (existing["keyword"] for existing in previous if existing.get("keyword")), None
+                    )
+                    if keyword_value:
+                        item["keyword"] = keyword_value
+                data.append(item)
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2)
+                os.replace(tmp_path, path)
+            except Exception as e:
+                logger.error(f"{path} güncellenemedi: {e}")
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+# Bu process açılışının kimliği; PID yeniden başlatmada (container'da hep 1)
+# veya başka bir process'e tekrar verilebildiği için heartbeat'i işin sahibi bununla yeniler
+INSTANCE_ID = uuid.uuid4().hex
+
+
+class IngestionJobStore:
+    """ingestion_jobs tablosu üzerinde iş kayıtları"""
+
+    def __init__(self, db_path: str = config.INGESTION_DB_PATH):
+        self.db_path = db_path
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_db(self):
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ingestion_jobs (
+                    id TEXT PRIMARY KEY,
+                    filename TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    keyword TEXT,
+                    status TEXT NOT NULL,
+                    stage TEXT,
+                    stages TEXT NOT NULL,
+                    progress REAL DEFAULT 0,
+                    attempts INTEGER DEFAULT 0,
+                    worker_pid INTEGER,
+                    worker_instance TEXT,
+                    error TEXT,
+                    result TEXT,
+                    created_at TIMESTAMP,
+                    started_at TIMESTAMP,
+                    finished_at TIMESTAMP,
+                    updated_at TIMESTAMP
+                )
+                """
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(ingestion_jobs)")}
+            if "worker_instance" not in columns:
+                conn.execute("ALTER TABLE ingestion_jobs ADD COLUMN worker_instance TEXT")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_ingestion_jobs_status ON ingestion_jobs(status, created_at)"
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["stages"] = json.loads(job["stages"]) if job["stages"] else {}
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def create(self, filename: str, file_path: str, keyword: str = "") -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        stages = {stage: {"status": "pending", "progress": 0.0} for stage in STAGES}
+        now = _now()
+        conn = self._connect()
+        try:
+            conn.execute(
+                """
+                INSERT INTO ingestion_jobs
+                    (id, filename, file_path, keyword, status, stages, progress, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, 0, ?, ?)
+                """,
+                (job_id, filename, file_path, keyword, STATUS_QUEUED, json.dumps(stages), now, now),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM ingestion_jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+        return self._row_to_job(row) if row else None
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            if status:
+                rows = conn.execute(
+                    "SELECT * FROM ingestion_jobs WHERE status = ? ORDER BY created_at DESC LIMIT ?",
+                    (status, limit),
+                ).fetchall()
+            else:
+                rows = conn.execute(
+                    "SELECT * FROM ingestion_jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+                ).fetchall()
+        finally:
+            conn.close()
+        return [self._row_to_job(row) for row in rows]
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """En eski kuyruktaki işi atomik olarak bu process'e al"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id FROM ingestion_jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                (STATUS_QUEUED,),
+            ).fetchone()
+            if row is None:
+                conn.rollback()
+                return None
+            now = _now()
+            conn.execute(
+                """
+                UPDATE ingestion_jobs
+                SET status = ?, worker_pid = ?, worker_instance = ?, attempts = attempts + 1,
+                    started_at = COALESCE(started_at, ?), updated_at = ?
+                WHERE id = ?
+                """,
+                (STATUS_RUNNING, os.getpid(), INSTANCE_ID, now, now, row["id"]),
+            )
+            conn.commit()
+            job_id = row["id"]
+        finally:
+            conn.close()
+        return self.get(job_id)
+
+    def update_stage(self, job_id: str, stage: str, status: str, progress: float):
+        """Aşama durumunu ve toplam ilerlemeyi güncelle"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT stages FROM ingestion_jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                conn.rollback()
+                return
+            stages = json.loads(row["stages"])
+            stages[stage] = {"status": status, "progress": round(progress, 4)}
+            total = sum(
+                STAGE_WEIGHTS[name] * stages.get(name, {}).get("progress", 0.0) for name in STAGES
+            )
+            conn.execute(
+                "UPDATE ingestion_jobs SET stage = ?, stages = ?, progress = ?, updated_at = ? WHERE id = ?",
+                (stage, json.dumps(stages), round(total, 4), _now(), job_id),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def finish(
+        self,
+        job_id: str,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+    ):
+        now = _now()
+        conn = self._connect()
+        try:
+            conn.execute(
+                """
+                UPDATE ingestion_jobs
+                SET status = ?, result = ?, error = ?, finished_at = ?, updated_at = ?,
+                    progress = CASE WHEN ? = 'completed' THEN 1 ELSE progress END
+                WHERE id = ?
+                """,
+                (
+                    status,
+                    json.dumps(result, ensure_ascii=False) if result is not None else None,
+                    error,
+                    now,
+                    now,
+                    status,
+                    job_id,
+                ),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    def heartbeat(self, job_ids: List[str]) -> List[str]:
+        """Bu process'in çalışan işlerinin lease'ini yenile, lease'i kaybedilen işleri döndür"""
+        if not job_ids:
+            return []
+        now = _now()
+        lost = []
+        conn = self._connect()
+        try:
+            for job_id in job_ids:
+                cursor = conn.execute(
+                    """
+                    UPDATE ingestion_jobs SET updated_at = ?
+                    WHERE id = ? AND status = ? AND worker_instance = ?
+                    """,
+                    (now, job_id, STATUS_RUNNING, INSTANCE_ID),
+                )
+                if cursor.rowcount == 0:
+                    lost.append(job_id)
+            conn.commit()
+        finally:
+            conn.close()
+        return lost
+
+    def requeue_orphaned(self, max_attempts: int, lease_seconds: float = config.INGESTION_LEASE_SECONDS) -> int:
+        """
+        Lease süresi boyunca heartbeat almamış "running" işleri kuyruğa geri al
+        (deneme sınırını aşanlar başarısız). Canlı bir process'in işleri
+        heartbeat ile yenilendiği için - hangi process olursa olsun - alınmaz.
+        """
+        cutoff = (datetime.now() - timedelta(seconds=lease_seconds)).isoformat(timespec="seconds")
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            orphaned = conn.execute(
+                """
+                SELECT id, attempts FROM ingestion_jobs
+                WHERE status = ? AND (updated_at IS NULL OR updated_at < ?)
+                """,
+                (STATUS_RUNNING, cutoff),
+            ).fetchall()
+            for row in orphaned:
+                if row["attempts"] >= max_attempts:
+                    conn.execute(
+                        """
+                        UPDATE ingestion_jobs
+                        SET status = ?, worker_pid = NULL, worker_instance = NULL, error = ?,
+                            finished_at = ?, updated_at = ?
+                        WHERE id = ?
+                        """,
+                        (STATUS_FAILED, "Deneme sınırı aşıldı", _now(), _now(), row["id"]),
+                    )
+                else:
+                    conn.execute(
+                        """
+                        UPDATE ingestion_jobs SET status = ?, worker_pid = NULL, worker_instance = NULL, updated_at = ?
+                        WHERE id = ?
+                        """,
+                        (STATUS_QUEUED, _now(), row["id"]),
+                    )
+            conn.commit()
+        finally:
+            conn.close()
+        return len(orphaned)
+
+    def count_by_status(self) -> Dict[str, int]:
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) AS n FROM ingestion_jobs GROUP BY status"
+            ).fetchall()
+        finally:
+            conn.close()
+        return {row["status"]: row["n"] for row in rows}
+
+
+class IngestionPipeline:
+    """Tek dosya için extract -> chunk -> embed -> index aşamaları"""
+
+    def __init__(
+        self,
+        store: IngestionJobStore,
+        work_dir: str = config.INGESTION_WORK_DIR,
+        docs_dir: str = "docs",
+        chroma_path: str = "./chroma",
+        chroma_manager=None,
+    ):
+        self.store = store
+        self.work_dir = work_dir
+        self.docs_dir = docs_dir
+        self.chroma_path = chroma_path
+        self._chroma_manager = chroma_manager
+        self._chroma_lock = threading.Lock()
+
+    def _get_chroma_manager(self):
+        with self._chroma_lock:
+            if self._chroma_manager is None:
+                from chroma import get_chroma_manager
+
+                self._chroma_manager = get_chroma_manager(chroma_path=self.chroma_path)
+            return self._chroma_manager
+
+    def _job_dir(self, job_id: str) -> str:
+        path = os.path.join(self.work_dir, job_id)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @staticmethod
+    def _write_json(path: str, data: Any):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _read_json(path: str) -> Any:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _stage_done(self, job: Dict[str, Any], stage: str) -> bool:
+        return job["stages"].get(stage, {}).get("status") == "completed"
+
+    def run(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """İşi çalıştır; tamamlanmış aşamaları (yeniden başlatmada) atla"""
+        from base import AdvancedDocumentProcessor, DocumentMetadata
+
+        job_id = job["id"]
+        job_dir = self._job_dir(job_id)
+        extract_path = os.path.join(job_dir, "extract.json")
+        record_path = os.path.join(job_dir, "record.json")
+        embeddings_path = os.path.join(job_dir, "embeddings.npy")
+        processor = AdvancedDocumentProcessor()
+
+        # 1. Metin çıkarma + temizleme
+        if not (self._stage_done(job, "extract") and os.path.exists(extract_path)):
+            self.store.update_stage(job_id, "extract", STATUS_RUNNING, 0.0)
+            if not os.path.exists(job["file_path"]):
+                raise FileNotFoundError(f"Yüklenen dosya bulunamadı: {job['file_path']}")
+            cleaned_text, metadata = processor.extract_document(job["file_path"])
+            if not cleaned_text.strip():
+                raise ValueError("Dosyadan metin çıkarılamadı")
+            self._write_json(extract_path, {"text": cleaned_text, "metadata": asdict(metadata)})
+            self.store.update_stage(job_id, "extract", STATUS_COMPLETED, 1.0)
+
+        # 2. Chunklama
+        if not (self._stage_done(job, "chunk") and os.path.exists(record_path)):
+            self.store.update_stage(job_id, "chunk", STATUS_RUNNING, 0.0)
+            extracted = self._read_json(extract_path)
+            metadata = DocumentMetadata(**extracted["metadata"])
+            processed_chunks, parent_chunks = processor.chunk_document(extracted["text"], metadata)
+            if not processed_chunks:
+                raise ValueError("Chunk oluşturulamadı")
+            record = processor.build_document_record(
+                extracted["text"], metadata, processed_chunks, job["file_path"],
+                job["keyword"] or None, parent_chunks,
+            )
+            self._write_json(record_path, record)
+            self.store.update_stage(job_id, "chunk", STATUS_COMPLETED, 1.0)
+
+        record = self._read_json(record_path)
+        chunks = record["chunks"]
+
+        # 3. Embedding (dilimler halinde, ilerleme raporlanarak)
+        if not (self._stage_done(job, "embed") and os.path.exists(embeddings_path)):
+            from embedder import get_embedder
+
+            self.store.update_stage(job_id, "embed", STATUS_RUNNING, 0.0)
+            embedder = get_embedder(config.EMBEDDING_MODEL)
+            slice_size = config.INGESTION_EMBED_SLICE_SIZE
+            parts = []
+            for start in range(0, len(chunks), slice_size):
+                parts.append(
+                    embedder.embed_batch_array(chunks[start:start + slice_size], show_progress=False)
+                )
+                done = min(start + slice_size, len(chunks))
+                self.store.update_stage(job_id, "embed", STATUS_RUNNING, done / len(chunks))
+            matrix = np.concatenate(parts) if parts else np.zeros((0, 0), dtype=np.float32)
+            tmp_path = f"{embeddings_path}.tmp.npy"
+            np.save(tmp_path, matrix)
+            os.replace(tmp_path, embeddings_path)
+            self.store.update_stage(job_id, "embed", STATUS_COMPLETED, 1.0)
+
+        # 4. ChromaDB + BM25 index, katalog dosyaları ve docs/ taşıma
+        self.store.update_stage(job_id, "index", STATUS_RUNNING, 0.0)
+        # (n, dim) float32 matris Chroma'ya listeye çevrilmeden verilir
+        embed_record = dict(record)
+        embed_record["embeddings"] = np.load(embeddings_path)
+
+        chroma_manager = self._get_chroma_manager()
+        filename = record["filename"]
+        checksum = record.get("document_metadata", {}).get("checksum")
+
+        # Eski sürümün yalnızca değişen chunk'ları yazılır / silinir (içerik adresli ID'ler)
+        chroma_stats = chroma_manager.add_documents_batch(
+            [embed_record], batch_size=1000, skip_duplicates=True
+        )
+        self.store.update_stage(job_id, "index", STATUS_RUNNING, 0.6)
+
+        self._update_catalogs(record, embed_record, job["keyword"])
+        docs_path = self._move_to_docs(job["file_path"])
+
+        chunk_ids = chroma_stats.get("ids_by_source", {}).get(filename)
+        if chunk_ids:
+            chroma_manager.manifest.record(filename, docs_path, checksum, chunk_ids)
+        self.store.update_stage(job_id, "index", STATUS_COMPLETED, 1.0)
+
+        shutil.rmtree(job_dir, ignore_errors=True)
+        return {
+            "filename": filename,
+            "chunk_count": len(chunks),
+            "total_added": chroma_stats.get("total_added", 0),
+            "skipped": chroma_stats.get("skipped", 0),
+            "updated": chroma_stats.get("updated", 0),
+            "removed": chroma_stats.get("removed", 0),
+        }
+
+    def _update_catalogs(self, record: Dict[str, Any], embed_record: Dict[str, Any], keyword: str):
+        update_enhanced_catalogs(record, embed_record, keyword)
+
+    def _move_to_docs(self, file_path: str) -> str:
+        """Dosyayı docs/ klasörüne taşı, son konumunu döndür"""
+        target_path = os.path.join(self.docs_dir, os.path.basename(file_path))
+        if not os.path.exists(file_path):
+            return target_path
+        os.makedirs(self.docs_dir, exist_ok=True)
+        try:
+            shutil.move(file_path, target_path)
+        except Exception as e:
+            logger.warning(f"Dosya docs klasörüne taşınamadı: {e}")
+            return file_path
+        return target_path
+
+
+class IngestionQueue:
+    """Sınırlı sayıda worker thread ile kuyruktaki işleri çalıştırır"""
+
+    def __init__(
+        self,
+        store: Optional[IngestionJobStore] = None,
+        max_workers: int = config.INGESTION_MAX_CONCURRENT_JOBS,
+        max_attempts: int = config.INGESTION_MAX_ATTEMPTS,
+        chroma_manager=None,
+    ):
+        self.store = store or IngestionJobStore()
+        self.pipeline = IngestionPipeline(self.store, chroma_manager=chroma_manager)
+        self.max_workers = max(1, max_workers)
+        self.max_attempts = max_attempts
+        self._wakeup = threading.Condition()
+        self._workers: List[threading.Thread] = []
+        self._active_jobs: Dict[str, str] = {}
+        self._started = False
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        """Yarım kalan işleri kuyruğa geri al ve worker'ları başlat"""
+        with self._start_lock:
+            if self._started:
+                return
+            self._started = True
+
+        self._requeue_orphaned()
+
+        for i in range(self.max_workers):
+            worker = threading.Thread(target=self._run, name=f"ingestion-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        threading.Thread(target=self._heartbeat, name="ingestion-heartbeat", daemon=True).start()
+        logger.info(f"📥 Ingestion kuyruğu başlatıldı ({self.max_workers} worker)")
+
+    def _requeue_orphaned(self):
+        recovered = self.store.requeue_orphaned(self.max_attempts)
+        if recovered:
+            logger.info(f"♻️ {recovered} yarım kalmış ingestion işi kuyruğa geri alındı")
+            with self._wakeup:
+                self._wakeup.notify_all()
+
+    def _heartbeat(self):
+        """Çalışan işlerin lease'ini yenile; lease'i dolmuş (başka process'te yarım kalmış) işleri geri al"""
+        while True:
+            time.sleep(config.INGESTION_HEARTBEAT_INTERVAL)
+            try:
+                lost = self.store.heartbeat(list(self._active_jobs))
+                for job_id in lost:
+                    logger.warning(f"⚠️ Ingestion işinin lease'i kaybedildi: {job_id}")
+                self._requeue_orphaned()
+            except Exception as e:
+                logger.error(f"❌ Ingestion heartbeat hatası: {e}")
+
+    def submit(self, filename: str, file_path: str, keyword: str = "") -> Dict[str, Any]:
+        """Yeni iş oluştur ve worker'ları uyandır"""
+        self.start()
+        job = self.store.create(filename, file_path, keyword)
+        with self._wakeup:
+            self._wakeup.notify()
+        logger.info(f"📥 Ingestion işi kuyruğa eklendi: {job['id']} ({filename})")
+        return job
+
+    def _run(self):
+        while True:
+            job = self.store.claim_next()
+            if job is None:
+                with self._wakeup:
+                    # Başka process'in eklediği işleri de görmek için periyodik kontrol
+                    self._wakeup.wait(timeout=config.INGESTION_POLL_INTERVAL)
+                continue
+            self._execute(job)
+
+    def _execute(self, job: Dict[str, Any]):
+        job_id = job["id"]
+        self._active_jobs[job_id] = job["filename"]
+        started = time.time()
+        try:
+            result = self.pipeline.run(job)
+            result["duration_seconds"] = round(time.time() - started, 2)
+            self.store.finish(job_id, STATUS_COMPLETED, result=result)
+            logger.info(f"✅ Ingestion işi tamamlandı: {job_id} ({job['filename']})")
+        except Exception as e:
+            logger.error(f"❌ Ingestion işi hatası {job_id} ({job['filename']}): {e}")
+            current = self.store.get(job_id)
+            if current and current.get("stage"):
+                stage = current["stage"]
+                progress = current["stages"].get(stage, {}).get("progress", 0.0)
+                self.store.update_stage(job_id, stage, STATUS_FAILED, progress)
+            self.store.finish(job_id, STATUS_FAILED, error=str(e))
+        finally:
+            self._active_jobs.pop(job_id, None)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id)
+
+    def list_jobs(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        return self.store.list(status=status, limit=limit)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "running_in_process": len(self._active_jobs),
+            "jobs_by_status": self.store.count_by_status(),
+        }
+
+
+_queue: Optional[IngestionQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_ingestion_queue(chroma_manager=None) -> IngestionQueue:
+    """Process genelinde tek ingestion kuyruğu döndür"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = IngestionQueue(chroma_manager=chroma_manager)
+        return _queue
@@ -0,0 +1,158 @@
+"""
+Aşamalar arası akış (JSONL) formatı.
+
+base -> embedder -> chroma aşamaları tüm korpusu tek bir JSON listesi olarak
+yazmak yerine her satıra bir doküman kaydı yazar. Embedding'ler JSON float
+listesi yerine base64 kodlanmış float32 matris olarak saklanır. Yazıcı her
+kayıttan sonra flush eder ve en sona bir bitiş satırı koyar; follow=True ile
+okuyan aşama dosya hâlâ yazılırken kayıtları tüketir, bitiş satırını görünce
+durur. Eski .json liste dosyaları da aynı okuyucuyla okunabilir.
+"""
+import os
+import json
+import time
+import base64
+import logging
+from typing import Dict, Any, Iterator, Optional
+
+import numpy as np
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+EOF_KEY = "__eof__"
+
+
+def encode_embeddings(embeddings) -> Dict[str, Any]:
+    """(n, dim) embedding matrisini base64 float32 olarak kodla"""
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    if matrix.ndim != 2:
+        matrix = matrix.reshape(len(matrix), -1) if matrix.size else np.zeros((0, 0), dtype=np.float32)
+    return {
+        "dtype": "float32",
+        "shape": list(matrix.shape),
+        "data": base64.b64encode(np.ascontiguousarray(matrix).tobytes()).decode("ascii"),
+    }
+
+
+def decode_embeddings(value) -> np.ndarray:
+    """encode_embeddings çıktısını (veya eski float listesini) matrise çevir"""
+    if isinstance(value, dict) and "data" in value:
+        matrix = np.frombuffer(base64.b64decode(value["data"]), dtype=value.get("dtype", "float32"))
+        return matrix.reshape(value["shape"])
+    return np.asarray(value or [], dtype=np.float32)
+
+
+class JsonlWriter:
+    """Kayıtları satır satır yazar; kapanışta bitiş satırı ekler"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.count = 0
+        self._file = None
+
+    def __enter__(self) -> "JsonlWriter":
+        # Takip eden okuyucu eski dosyanın bitiş satırını görmesin
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "w", encoding="utf-8")
+        return self
+
+    def write(self, record: Dict[str, Any]):
+        if "embeddings" in record and not isinstance(record["embeddings"], dict):
+            record = dict(record)
+            record["embeddings"] = encode_embeddings(record["embeddings"])
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+        self._file.write("\n")
+        self._file.flush()
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        footer = {EOF_KEY: True, "count": self.count}
+        if exc_type is not None:
+            footer["failed"] = True
+            footer["error"] = str(exc)
+        self._file.write(json.dumps(footer) + "\n")
+        self._file.close()
+        self._file = None
+        return False
+
+
+def iter_records(
+    path: str,
+    follow: bool = False,
+    decode: bool = True,
+    poll_interval: Optional[float] = None,
+    idle_timeout: Optional[float] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Kayıtları sırayla üret.
+
+    follow=True ise dosya henüz yoksa oluşmasını, satır yarımsa tamamlanmasını
+    bekler ve yalnızca bitiş satırında durur. idle_timeout saniye boyunca yeni
+    satır gelmezse TimeoutError fırlatır (yazan aşama çökmüş olabilir). Bitiş
+    satırı yazan aşamanın hata ile bittiğini söylüyorsa RuntimeError fırlatır.
+    """
+    poll_interval = poll_interval or config.JSONL_POLL_INTERVAL
+    idle_timeout = config.JSONL_FOLLOW_TIMEOUT if idle_timeout is None else idle_timeout
+
+    def prepare(record: Dict[str, Any]) -> Dict[str, Any]:
+        if decode and "embeddings" in record:
+            record["embeddings"] = decode_embeddings(record["embeddings"])
+        return record
+
+    last_activity = time.monotonic()
+    while not os.path.exists(path):
+        if not follow:
+            raise FileNotFoundError(path)
+        if time.monotonic() - last_activity > idle_timeout:
+            raise TimeoutError(f"{path} {idle_timeout:.0f} sn içinde oluşmadı")
+        time.sleep(poll_interval)
+
+    # Eski format: tek JSON listesi
+    if path.endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            for record in json.load(f):
+                yield prepare(record)
+        return
+
+    with open(path, "r", encoding="utf-8") as f:
+        pending = ""
+        while True:
+            line = f.readline()
+            if line:
+                pending += line
+            if not pending.endswith("\n"):
+                if not follow:
+                    if pending.strip():
+                        yield prepare(json.loads(pending))
+                    logger.warning(f"⚠️ {path} bitiş satırı olmadan sona erdi")
+                    return
+                if time.monotonic() - last_activity > idle_timeout:
+                    raise TimeoutError(f"{path} {idle_timeout:.0f} sn boyunca güncellenmedi")
+                time.sleep(poll_interval)
+                continue
+
+            last_activity = time.monotonic()
+            text, pending = pending.strip(), ""
+            if not text:
+                continue
+            record = json.loads(text)
+            if record.get(EOF_KEY):
+                if record.get("failed"):
+                    # Eksik korpusla devam edip başarıyla bitmek yerine sonraki aşama da hata verir
+                    raise RuntimeError(f"{path} yazan aşama hata ile bitti: {record.get('error')}")
+                return
+            yield prepare(record)
+
+
+def write_records(path: str, records) -> int:
+    """Tüm kayıtları yaz, yazılan kayıt sayısını döndür"""
+    with JsonlWriter(path) as writer:
+        for record in records:
+            writer.write(record)
+    return writer.count
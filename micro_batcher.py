@@ -0,0 +1,177 @@
+"""
+Sorgu embedding'leri için micro-batching servisi.
+
+Eşzamanlı /api/chat istekleri her biri tek metinlik encode çağrısı yapmak
+yerine kısa bir kuyrukta toplanır; max_wait_ms dolduğunda ya da max_batch
+metin biriktiğinde tek bir encode çağrısı ile işlenir ve her isteğin
+Future'ı kendi vektörüyle tamamlanır.
+"""
+import time
+import queue
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Dict, Any, Optional, List, Tuple
+
+import numpy as np
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+class QueryEmbeddingBatcher:
+    """LocalEmbedder önünde çalışan micro-batcher"""
+
+    def __init__(
+        self,
+        embedder,
+        max_wait_ms: float = config.QUERY_BATCH_MAX_WAIT_MS,
+        max_batch: int = config.QUERY_BATCH_MAX_SIZE,
+    ):
+        self.embedder = embedder
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Tuple[str, Future, float]]" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "total_requests": 0,
+            "cache_hits": 0,
+            "total_batches": 0,
+            "total_batched_texts": 0,
+            "max_batch_size": 0,
+            "max_queue_depth": 0,
+            "total_wait_ms": 0.0,
+            "total_encode_ms": 0.0,
+            "errors": 0,
+        }
+        # Batch boyutu dağılımı: {boyut: adet}
+        self._batch_size_histogram: Dict[int, int] = {}
+
+        self._worker = threading.Thread(
+            target=self._run, name="query-embedding-batcher", daemon=True
+        )
+        self._worker.start()
+        logger.info(
+            f"⚡ Query micro-batcher başlatıldı (max_wait={max_wait_ms}ms, max_batch={max_batch})"
+        )
+
+    def submit(self, text: str) -> Future:
+        """Metni kuyruğa ekle, embedding için Future döndür"""
+        future: Future = Future()
+        validated_text = self.embedder._validate_text(text)
+
+        with self._stats_lock:
+            self._stats["total_requests"] += 1
+
+        if not validated_text:
+            future.set_result(np.zeros(self.embedder.model_info["dimensions"], dtype=np.float32))
+            return future
+
+        # Cache'teki sorgular kuyruğa hiç girmez
+        if self.embedder.cache:
+            cached = self.embedder.cache.get(validated_text, self.embedder.model)
+            if cached is not None:
+                with self._stats_lock:
+                    self._stats["cache_hits"] += 1
+                future.set_result(cached)
+                return future
+
+        self._queue.put((validated_text, future, time.monotonic()))
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            if depth > self._stats["max_queue_depth"]:
+                self._stats["max_queue_depth"] = depth
+        return future
+
+    def embed(self, text: str, timeout: Optional[float] = 30.0) -> np.ndarray:
+        """Tek sorgu için embedding (bloklayan)"""
+        return self.submit(text).result(timeout=timeout)
+
+    def _collect_batch(self) -> List[Tuple[str, Future, float]]:
+        """İlk metni bekle, ardından max_wait süresince ya da max_batch'e kadar topla"""
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        """Worker döngüsü"""
+        while True:
+            batch = self._collect_batch()
+            texts = [text for text, _, _ in batch]
+            started = time.monotonic()
+            try:
+                # Başarısız encode sıfır vektör yerine hata olarak isteklere döner
+                embeddings = self.embedder._call_embedding_api(texts, raise_on_failure=True)
+            except Exception as e:
+                logger.error(f"❌ Micro-batch embedding hatası: {e}")
+                with self._stats_lock:
+                    self._stats["errors"] += 1
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            encode_ms = (time.monotonic() - started) * 1000
+
+            for (text, future, enqueued_at), embedding in zip(batch, embeddings):
+                # Sıfır vektör kalıcı cache'e yazılmaz (sorgu yeniden başlatmalardan sonra da bozuk kalırdı)
+                if self.embedder.cache and np.any(embedding):
+                    self.embedder.cache.set(text, self.embedder.model, embedding)
+                if not future.done():
+                    future.set_result(embedding)
+
+            with self._stats_lock:
+                size = len(batch)
+                self._stats["total_batches"] += 1
+                self._stats["total_batched_texts"] += size
+                self._stats["max_batch_size"] = max(self._stats["max_batch_size"], size)
+                self._stats["total_wait_ms"] += sum(
+                    (started - enqueued_at) * 1000 for _, _, enqueued_at in batch
+                )
+                self._stats["total_encode_ms"] += encode_ms
+                self._batch_size_histogram[size] = self._batch_size_histogram.get(size, 0) + 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Kuyruk derinliği ve batch boyutu metrikleri"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+            histogram = dict(sorted(self._batch_size_histogram.items()))
+        batches = stats["total_batches"]
+        texts = stats["total_batched_texts"]
+        stats.update(
+            {
+                "queue_depth": self._queue.qsize(),
+                "avg_batch_size": texts / batches if batches else 0.0,
+                "avg_queue_wait_ms": stats["total_wait_ms"] / texts if texts else 0.0,
+                "avg_encode_ms": stats["total_encode_ms"] / batches if batches else 0.0,
+                "batch_size_histogram": histogram,
+                "max_wait_ms": self.max_wait * 1000,
+                "max_batch": self.max_batch,
+            }
+        )
+        return stats
+
+
+_batchers: Dict[int, QueryEmbeddingBatcher] = {}
+_batchers_lock = threading.Lock()
+
+
+def get_query_batcher(embedder=None) -> QueryEmbeddingBatcher:
+    """Embedder başına tek micro-batcher döndür"""
+    if embedder is None:
+        from embedder import get_embedder
+
+        embedder = get_embedder(config.EMBEDDING_MODEL)
+    with _batchers_lock:
+        key = id(embedder)
+        if key not in _batchers:
+            _batchers[key] = QueryEmbeddingBatcher(embedder)
+        return _batchers[key]
@@ -0,0 +1,126 @@
+"""
+Parent chunk deposu.
+
+Tokenizer-aware chunking'de embedding modeline yalnızca token sınırına sığan
+küçük child pencereler gönderilir; LLM'e ise bunların ait olduğu büyük
+semantic pasajlar (parent) verilir. Parent metinleri vektör olarak
+saklanmadığı için Chroma dizininde ayrı bir SQLite dosyasında tutulur ve
+child chunk metadata'sındaki parent_id ("<dosya>#p<sıra>") ile okunur.
+"""
+import os
+import sqlite3
+import logging
+import threading
+from typing import Dict, Any, List, Iterable
+
+from store_registry import PathRegistry
+
+logger = logging.getLogger(__name__)
+
+PARENT_DB_FILENAME = "parent_chunks.db"
+
+
+def make_parent_id(source_file: str, parent_index: int) -> str:
+    return f"{source_file}#p{parent_index}"
+
+
+class ParentChunkStore:
+    """parent_id -> (source_file, content, pozisyon, sayfa aralığı)"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS parent_chunks (
+                parent_id TEXT PRIMARY KEY,
+                source_file TEXT NOT NULL,
+                parent_index INTEGER NOT NULL,
+                content TEXT NOT NULL,
+                start_pos INTEGER,
+                end_pos INTEGER,
+                page_start INTEGER,
+                page_end INTEGER
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_parent_chunks_source ON parent_chunks(source_file)"
+        )
+        self._conn.commit()
+
+    def put_source(self, source_file: str, parents: List[Dict[str, Any]]) -> int:
+        """Dosyanın parent pasajlarını yaz (önceki kayıtların yerine)"""
+        rows = [
+            (
+                make_parent_id(source_file, index),
+                source_file,
+                index,
+                parent.get("content", ""),
+                parent.get("start_pos"),
+                parent.get("end_pos"),
+                parent.get("page_start"),
+                parent.get("page_end"),
+            )
+            for index, parent in enumerate(parents)
+        ]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM parent_chunks WHERE source_file = ?", (source_file,))
+            self._conn.executemany(
+                "INSERT INTO parent_chunks VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+        return len(rows)
+
+    def get_many(self, parent_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """parent_id -> kayıt; bulunamayan ID'ler sonuçta yer almaz"""
+        parent_ids = list(dict.fromkeys(pid for pid in parent_ids if pid))
+        if not parent_ids:
+            return {}
+        placeholders = ",".join("?" for _ in parent_ids)
+        with self._lock:
+            rows = self._conn.execute(
+                f"""
+                SELECT parent_id, source_file, parent_index, content,
+                       start_pos, end_pos, page_start, page_end
+                FROM parent_chunks WHERE parent_id IN ({placeholders})
+                """,
+                parent_ids,
+            ).fetchall()
+        columns = (
+            "parent_id", "source_file", "parent_index", "content",
+            "start_pos", "end_pos", "page_start", "page_end",
+        )
+        return {row[0]: dict(zip(columns, row)) for row in rows}
+
+    def delete_source(self, source_file: str) -> int:
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM parent_chunks WHERE source_file = ?", (source_file,)
+            )
+        return cursor.rowcount
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM parent_chunks")
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            parents, sources = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT source_file) FROM parent_chunks"
+            ).fetchone()
+        return {"parents": parents, "sources": sources}
+
+
+_stores = PathRegistry()
+
+
+def get_parent_store(chroma_path: str = "./chroma") -> ParentChunkStore:
+    """Chroma dizini başına process genelinde tek parent deposu döndür"""
+    return _stores.get(
+        chroma_path, lambda: ParentChunkStore(os.path.join(chroma_path, PARENT_DB_FILENAME))
+    )
@@ -5,6 +5,7 @@ from typing import Dict, Any, Optional, List
 from config import config
 import logging
 import ollama
+from typing import Iterator
 
 logger = logging.getLogger(__name__)
 
@@ -128,12 +129,116 @@ def ask_local_llm(
 
     except Exception as e:
         logger.error(f"⚠️ Ollama LLM hatası: {e}")
-        if "not found" in str(e).lower() or "model" in str(e).lower():
-            return f"⚠️ Model '{model}' bulunamadı. Lütfen 'ollama pull {model}' komutunu çalıştırın."
-        elif "connection" in str(e).lower():
-            return "⚠️ Ollama servisine bağlanılamadı. Lütfen 'ollama serve' komutunu çalıştırın."
-        else:
-            return f"⚠️ Yerel LLM hatası: {str(e)[:100]}"
+        return _llm_error_message(e, model)
+
+
+def _llm_error_message(e: Exception, model: str) -> str:
+    """Ollama hatasını kullanıcıya gösterilecek mesaja çevir"""
+    if "not found" in str(e).lower() or "model" in str(e).lower():
+        return f"⚠️ Model '{model}' bulunamadı. Lütfen 'ollama pull {model}' komutunu çalıştırın."
+    elif "connection" in str(e).lower():
+        return "⚠️ Ollama servisine bağlanılamadı. Lütfen 'ollama serve' komutunu çalıştırın."
+    else:
+        return f"⚠️ Yerel LLM hatası: {str(e)[:100]}"
+
+
+class ThinkTagFilter:
+    """
+    Akış halindeki model çıktısından <think>...</think> bloklarını anında ayıklar.
+    Etiketler chunk sınırında bölünebildiği için olası yarım etiket bir sonraki
+    chunk'a kadar bekletilir.
+    """
+
+    OPEN_TAG = "<think>"
+    CLOSE_TAG = "</think>"
+
+    def __init__(self):
+        self.in_think = False
+        self._buffer = ""
+
+    def feed(self, chunk: str) -> str:
+        """Yeni chunk'ı işle, kullanıcıya gösterilebilecek metni döndür"""
+        self._buffer += chunk
+        visible = []
+
+        while self._buffer:
+            lower = self._buffer.lower()
+            tag = self.CLOSE_TAG if self.in_think else self.OPEN_TAG
+            pos = lower.find(tag)
+
+            if pos != -1:
+                if not self.in_think:
+                    visible.append(self._buffer[:pos])
+                self._buffer = self._buffer[pos + len(tag):]
+                self.in_think = not self.in_think
+                continue
+
+            # Buffer sonu etiketin başlangıcı olabilir, o kısmı beklet
+            keep = 0
+            for i in range(1, len(tag)):
+                if lower.endswith(tag[:i]):
+                    keep = i
+            if not self.in_think:
+                visible.append(self._buffer[: len(self._buffer) - keep])
+            self._buffer = self._buffer[len(self._buffer) - keep:] if keep else ""
+            break
+
+        return "".join(visible)
+
+    def flush(self) -> str:
+        """Akış bittiğinde bekletilen metni döndür"""
+        remaining = "" if self.in_think else self._buffer
+        self._buffer = ""
+        return remaining
+
+
+def stream_local_llm(
+    prompt: str,
+    model: Optional[str] = None,
+    query_category: str = "general",
+    temperature: Optional[float] = None,
+    max_tokens: Optional[int] = None,
+) -> Iterator[str]:
+    """Ollama yanıtını token token üretir (<think> bölümü gönderilmez)"""
+
+    if model is None:
+        model = config.LLM_MODEL
+    if temperature is None:
+        temperature = config.LLM_TEMPERATURE
+    if max_tokens is None:
+        max_tokens = config.LLM_MAX_TOKENS
+
+    enhanced_prompt = enhanced_prompt_engineering(prompt, query_category)
+    think_filter = ThinkTagFilter()
+
+    try:
+        logger.info(f"🔄 Ollama LLM stream çağrısı yapılıyor - Model: {model}")
+
+        stream = ollama.chat(
+            model=model,
+            messages=[{"role": "user", "content": enhanced_prompt}],
+            options={
+                "temperature": temperature,
+                "num_predict": max_tokens,
+            },
+            stream=True,
+        )
+
+        for part in stream:
+            content = part["message"]["content"]
+            if not content:
+                continue
+            visible = think_filter.feed(content)
+            if visible:
+                yield visible
+
+        tail = think_filter.flush()
+        if tail:
+            yield tail
+
+    except Exception as e:
+        logger.error(f"⚠️ Ollama LLM stream hatası: {e}")
+        yield _llm_error_message(e, model)
 
 
 def batch_llm_requests(
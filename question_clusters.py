@@ -0,0 +1,233 @@
+"""
+Artımlı yakın-kopya soru kümeleme.
+
+Her yeni soru eklenirken MinHash imzası (karakter 3-gram'ları) çıkarılır ve
+LSH bantlarıyla yalnızca aday kümeler bulunur; aday küme tohumlarıyla
+difflib oranı eşiği geçen ilk en iyi kümeye atanır, yoksa yeni küme açılır.
+Küme sayıları question_clusters tablosunda tutulduğundan en çok sorulan
+sorular tüm soru çiftlerini karşılaştırmak yerine indeksli bir ORDER BY ile
+okunur.
+
+İki kapsam vardır: "global" (tüm sorular, %75 benzerlik) ve "topic" (aynı
+topic içinde, %70 benzerlik) - eski get_top_questions_by_similarity ve
+get_top_questions_with_topics eşikleriyle aynı.
+"""
+import zlib
+import hashlib
+import difflib
+from typing import Dict, List, Iterable, Optional, Tuple
+
+import numpy as np
+
+from store_registry import SQLITE_ID_CHUNK
+
+# kapsam -> difflib benzerlik eşiği
+SCOPES: Dict[str, float] = {"global": 0.75, "topic": 0.70}
+
+NUM_PERM = 64
+BANDS = 32
+ROWS_PER_BAND = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+
+_PRIME = np.uint64((1 << 61) - 1)
+_rng = np.random.RandomState(20240601)
+_PERM_A = _rng.randint(1, 2 ** 31 - 1, size=NUM_PERM).astype(np.uint64)
+_PERM_B = _rng.randint(0, 2 ** 31 - 1, size=NUM_PERM).astype(np.uint64)
+
+# En çok bant eşleşen bu kadar aday küme difflib ile doğrulanır
+MAX_CANDIDATES = 20
+
+
+def normalize_question(question: str) -> str:
+    return (question or "").lower().strip()
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """Karakter shingle'larının MinHash imzası (NUM_PERM uzunluğunda)"""
+    if len(text) <= SHINGLE_SIZE:
+        shingles = {text}
+    else:
+        shingles = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    hashes = np.fromiter(
+        (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+    # crc32 < 2^32 ve a < 2^31 olduğu için çarpım uint64'e sığar
+    return ((np.outer(hashes, _PERM_A) + _PERM_B) % _PRIME).min(axis=0)
+
+
+def band_buckets(signature: np.ndarray) -> List[int]:
+    """Her LSH bandı için process'ler arası kararlı 64-bit bucket anahtarı"""
+    buckets = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        digest = hashlib.blake2b(rows.tobytes(), digest_size=8).digest()
+        buckets.append(int.from_bytes(digest, "big", signed=True))
+    return buckets
+
+
+def _find_cluster(c, scope: str, topic: str, text: str, buckets: List[int]) -> Optional[int]:
+    """LSH adayları arasından eşiği geçen en benzer kümeyi bul"""
+    # Bant başına bucket araması PRIMARY KEY(scope, band, bucket, ...) indeksini kullanır
+    probe = ", ".join("(?, ?)" for _ in buckets)
+    params: List = []
+    for band, bucket in enumerate(buckets):
+        params.extend((band, bucket))
+    c.execute(
+        f"""
+        WITH probe(band, bucket) AS (VALUES {probe})
+        SELECT cl.id, cl.seed
+        FROM probe p
+        JOIN question_cluster_buckets b
+          ON b.scope = ? AND b.band = p.band AND b.bucket = p.bucket
+        JOIN question_clusters cl ON cl.id = b.cluster_id
+        WHERE cl.topic = ?
+        GROUP BY cl.id
+        ORDER BY COUNT(*) DESC, cl.count DESC
+        LIMIT ?
+        """,
+        params + [scope, topic, MAX_CANDIDATES],
+    )
+    best_id, best_score = None, SCOPES[scope]
+    for cluster_id, seed in c.fetchall():
+        if seed == text:
+            return cluster_id
+        matcher = difflib.SequenceMatcher(None, text, seed)
+        # Ucuz üst sınırlar eşiğin altındaysa tam oranı hesaplama
+        if matcher.real_quick_ratio() < best_score or matcher.quick_ratio() < best_score:
+            continue
+        score = matcher.ratio()
+        if score >= best_score:
+            best_id, best_score = cluster_id, score
+    return best_id
+
+
+def assign_question(c, question_id: int, question: str, topic: Optional[str]):
+    """Soruyu her kapsamda bir kümeye ata (add_question transaction'ı içinde çağrılır)"""
+    text = normalize_question(question)
+    buckets = band_buckets(minhash_signature(text))
+    for scope in SCOPES:
+        scope_topic = (topic or "genel") if scope == "topic" else ""
+        cluster_id = _find_cluster(c, scope, scope_topic, text, buckets)
+        if cluster_id is None:
+            c.execute(
+                "INSERT INTO question_clusters (scope, topic, seed, count) VALUES (?, ?, ?, 1)",
+                (scope, scope_topic, text),
+            )
+            cluster_id = c.lastrowid
+            c.executemany(
+                "INSERT OR IGNORE INTO question_cluster_buckets (scope, band, bucket, cluster_id) VALUES (?, ?, ?, ?)",
+                [(scope, band, bucket, cluster_id) for band, bucket in enumerate(buckets)],
+            )
+        else:
+            c.execute(
+                "UPDATE question_clusters SET count = count + 1, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                (cluster_id,),
+            )
+        c.execute(
+            "INSERT OR REPLACE INTO question_cluster_members (question_id, scope, cluster_id) VALUES (?, ?, ?)",
+            (question_id, scope, cluster_id),
+        )
+
+
+def detach_questions(c, question_ids: Iterable[int]):
+    """Silinecek soruları kümelerinden düş (sorular silinmeden önce çağrılır)"""
+    question_ids = list(question_ids)
+    for start in range(0, len(question_ids), SQLITE_ID_CHUNK):
+        chunk = question_ids[start:start + SQLITE_ID_CHUNK]
+        placeholders = ",".join("?" for _ in chunk)
+        c.execute(
+            f"""
+            SELECT cluster_id, COUNT(*) FROM question_cluster_members
+            WHERE question_id IN ({placeholders}) GROUP BY cluster_id
+            """,
+            chunk,
+        )
+        c.executemany(
+            "UPDATE question_clusters SET count = count - ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+            [(removed, cluster_id) for cluster_id, removed in c.fetchall()],
+        )
+        c.execute(f"DELETE FROM question_cluster_members WHERE question_id IN ({placeholders})", chunk)
+    _drop_empty_clusters(c)
+
+
+def _drop_empty_clusters(c):
+    c.execute(
+        """
+        DELETE FROM question_cluster_buckets WHERE cluster_id IN (
+            SELECT id FROM question_clusters WHERE count <= 0
+        )
+        """
+    )
+    c.execute("DELETE FROM question_clusters WHERE count <= 0")
+
+
+def clear_clusters(c):
+    c.execute("DELETE FROM question_cluster_members")
+    c.execute("DELETE FROM question_cluster_buckets")
+    c.execute("DELETE FROM question_clusters")
+
+
+def rebuild_clusters(conn, batch_size: int = 5000) -> int:
+    """Tüm soruları sırayla yeniden kümele (migration / bakım için)"""
+    with conn:
+        clear_clusters(conn.cursor())
+    last_id, total = 0, 0
+    while True:
+        rows = conn.execute(
+            "SELECT id, question, topic FROM questions WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, batch_size),
+        ).fetchall()
+        if not rows:
+            break
+        with conn:
+            c = conn.cursor()
+            for question_id, question, topic in rows:
+                assign_question(c, question_id, question, topic)
+        last_id = rows[-1][0]
+        total += len(rows)
+    return total
+
+
+def top_clusters(conn, scope: str, limit: int) -> List[Dict]:
+    """
+    En büyük kümeler; temsilci en çok sorulan (soru, cevap) varyantıdır.
+    Yalnızca limit kadar küme için üyelere bakılır.
+    """
+    clusters = conn.execute(
+        """
+        SELECT id, topic, count FROM question_clusters
+        WHERE scope = ? AND count > 0
+        ORDER BY count DESC, id ASC
+        LIMIT ?
+        """,
+        (scope, limit),
+    ).fetchall()
+
+    results = []
+    for cluster_id, topic, count in clusters:
+        variants: List[Tuple[str, str, int]] = conn.execute(
+            """
+            SELECT q.question, q.answer, COUNT(*) AS cnt
+            FROM question_cluster_members m
+            JOIN questions q ON q.id = m.question_id
+            WHERE m.cluster_id = ?
+            GROUP BY q.question, q.answer
+            ORDER BY cnt DESC, MIN(q.id) ASC
+            """,
+            (cluster_id,),
+        ).fetchall()
+        if not variants:
+            continue
+        question, answer, _ = variants[0]
+        results.append(
+            {
+                "question": question,
+                "answer": answer,
+                "count": count,
+                "topic": topic or "genel",
+                "variants": len(variants),
+            }
+        )
+    return results
@@ -1,75 +1,350 @@
-def delete_questions_by_source_file(filename):
-    """Belirli bir dosyaya ait tüm soruları ve ilişkili verileri siler"""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    # Önce question_sources tablosundan sil
-    c.execute("DELETE FROM question_sources WHERE source_file = ?", (filename,))
-    # Sonra questions tablosundan sil
-    c.execute("DELETE FROM questions WHERE source_file = ?", (filename,))
-    # Son olarak orphan olmuş question_similarity kayıtlarını temizle
-    c.execute("DELETE FROM question_similarity WHERE question_id_1 NOT IN (SELECT id FROM questions) OR question_id_2 NOT IN (SELECT id FROM questions)")
-    conn.commit()
-    conn.close()
-    print(f"✅ {filename} dosyasına ait tüm sorular ve ilişkili veriler silindi.")
 import sqlite3
 import os
-from datetime import datetime
+import queue
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 import json
 
+import question_clusters
+
 DB_PATH = "questions.db"
 
+# Thread (istek) süresince tek bağlantı; istek bitince bağlantı kapatılmaz,
+# boşta bekleyen bağlantı havuzuna döner (Flask her isteği yeni thread'de çalıştırır)
+_local = threading.local()
+_POOL_SIZE = 8
+_pools = {}
+_pools_lock = threading.Lock()
+# Şema migration'ı process başına bir kez çalışır
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
+# (user_version, SQL ifadeleri) - sırayla ve yalnızca bir kez uygulanır
+MIGRATIONS = [
+    (1, [
+        """
+        CREATE TABLE IF NOT EXISTS questions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            question TEXT NOT NULL,
+            answer TEXT,
+            source_file TEXT,
+            source_keyword TEXT,
+            topic TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS question_sources (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            question_id INTEGER,
+            source_file TEXT,
+            FOREIGN KEY(question_id) REFERENCES questions(id),
+            UNIQUE(question_id, source_file)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS question_similarity (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            question_id_1 INTEGER,
+            question_id_2 INTEGER,
+            similarity REAL,
+            FOREIGN KEY(question_id_1) REFERENCES questions(id),
+            FOREIGN KEY(question_id_2) REFERENCES questions(id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS user_sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            session_date DATE DEFAULT (date('now')),
+            first_visit TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            total_questions INTEGER DEFAULT 0,
+            UNIQUE(user_id, session_date)
+        )
+        """,
+    ]),
+    (2, [
+        # Günlük sorgular created_at aralığıyla, sayfalı listeler normalize soruyla gruplanır
+        "CREATE INDEX IF NOT EXISTS idx_questions_created_at ON questions(created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_questions_source_file ON questions(source_file)",
+        "CREATE INDEX IF NOT EXISTS idx_questions_normalized ON questions(LOWER(TRIM(question)), created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_question_sources_source_file ON question_sources(source_file)",
+        "CREATE INDEX IF NOT EXISTS idx_question_similarity_q1 ON question_similarity(question_id_1)",
+        "CREATE INDEX IF NOT EXISTS idx_question_similarity_q2 ON question_similarity(question_id_2)",
+        "CREATE INDEX IF NOT EXISTS idx_user_sessions_date ON user_sessions(session_date)",
+    ]),
+    (3, [
+        # Artımlı yakın-kopya kümeleri (bkz. question_clusters.py)
+        """
+        CREATE TABLE IF NOT EXISTS question_clusters (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            scope TEXT NOT NULL,
+            topic TEXT NOT NULL DEFAULT '',
+            seed TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS question_cluster_members (
+            question_id INTEGER NOT NULL,
+            scope TEXT NOT NULL,
+            cluster_id INTEGER NOT NULL,
+            PRIMARY KEY(question_id, scope),
+            FOREIGN KEY(question_id) REFERENCES questions(id),
+            FOREIGN KEY(cluster_id) REFERENCES question_clusters(id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS question_cluster_buckets (
+            scope TEXT NOT NULL,
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            cluster_id INTEGER NOT NULL,
+            PRIMARY KEY(scope, band, bucket, cluster_id),
+            FOREIGN KEY(cluster_id) REFERENCES question_clusters(id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_question_clusters_count ON question_clusters(scope, count DESC, id)",
+        "CREATE INDEX IF NOT EXISTS idx_question_cluster_members_cluster ON question_cluster_members(cluster_id)",
+        "CREATE INDEX IF NOT EXISTS idx_question_cluster_buckets_cluster ON question_cluster_buckets(cluster_id)",
+    ]),
+    (4, [
+        # Dashboard için önceden hesaplanmış istatistikler (add_question / track_user_session ile güncellenir)
+        """
+        CREATE TABLE IF NOT EXISTS daily_stats (
+            day TEXT PRIMARY KEY,
+            question_count INTEGER NOT NULL DEFAULT 0,
+            user_count INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS source_stats (
+            source_file TEXT PRIMARY KEY,
+            question_count INTEGER NOT NULL DEFAULT 0,
+            keyword TEXT DEFAULT '',
+            available INTEGER NOT NULL DEFAULT 1
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS stats_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_source_stats_top ON source_stats(available, question_count DESC)",
+    ]),
+]
+
+
+def _migrate(conn):
+    """PRAGMA user_version'a göre eksik migration'ları uygula"""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for target, statements in MIGRATIONS:
+        if version >= target:
+            continue
+        with conn:
+            for statement in statements:
+                conn.execute(statement)
+            if target == 1:
+                # Eski veritabanlarında topic sütunu olmayabilir
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(questions)")}
+                if "topic" not in columns:
+                    conn.execute("ALTER TABLE questions ADD COLUMN topic TEXT")
+            conn.execute(f"PRAGMA user_version = {target}")
+        version = target
+        if target == 3:
+            # Mevcut soruları kümelere yerleştir
+            clustered = question_clusters.rebuild_clusters(conn)
+            if clustered:
+                print(f"✅ {clustered} soru benzerlik kümelerine yerleştirildi")
+        elif target == 4:
+            with conn:
+                _rebuild_stats(conn.cursor())
+
+
+def _get_pool(path):
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = _pools[path] = queue.Queue(maxsize=_POOL_SIZE)
+        return pool
+
+
+def get_connection():
+    """Bu thread'in DB_PATH bağlantısını döndür (önce havuzdan; yoksa WAL ile yeni bağlantı)"""
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(DB_PATH)
+    if conn is None:
+        try:
+            conn = _get_pool(DB_PATH).get_nowait()
+        except queue.Empty:
+            conn = sqlite3.connect(DB_PATH, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        connections[DB_PATH] = conn
+        init_db()
+    return conn
+
+
+@contextmanager
+def transaction():
+    """Yazma işlemleri: başarıda commit, hatada rollback (bağlantı açık kalır)"""
+    conn = get_connection()
+    try:
+        yield conn.cursor()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS questions (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        question TEXT NOT NULL,
-        answer TEXT,
-        source_file TEXT,
-        source_keyword TEXT,
-        topic TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    """Şemayı hazırla; process başına yalnızca ilk çağrıda veritabanına dokunur"""
+    if DB_PATH in _schema_ready:
+        return
+    with _schema_lock:
+        if DB_PATH in _schema_ready:
+            return
+        conn = sqlite3.connect(DB_PATH, timeout=30)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            _migrate(conn)
+        finally:
+            conn.close()
+        _schema_ready.add(DB_PATH)
+
+
+def close_connection():
+    """Bu thread'in bağlantılarını havuza geri ver (havuz doluysa kapat)"""
+    for path, conn in getattr(_local, "connections", {}).items():
+        try:
+            conn.rollback()
+            _get_pool(path).put_nowait(conn)
+        except (queue.Full, sqlite3.Error):
+            conn.close()
+    _local.connections = {}
+
+
+def stats_today():
+    """
+    İstatistik günü (UTC): created_at (CURRENT_TIMESTAMP), session_date
+    (date('now')), daily_stats anahtarları ve stats ETag'i aynı saati kullanır
+    """
+    return datetime.utcnow().date()
+
+
+def _day_range(day):
+    """DATE(created_at) = day yerine index kullanan [gün, ertesi gün) aralığı"""
+    start = datetime.strptime(day, "%Y-%m-%d") if isinstance(day, str) else datetime.combine(day, datetime.min.time())
+    return start.strftime("%Y-%m-%d"), (start + timedelta(days=1)).strftime("%Y-%m-%d")
+
+
+def _bump_counters(c, **deltas):
+    """stats_counters değerlerini artır; her değişiklik ETag için version'ı da artırır"""
+    deltas["version"] = deltas.get("version", 0) + 1
+    c.executemany(
+        """
+        INSERT INTO stats_counters (name, value) VALUES (?, ?)
+        ON CONFLICT(name) DO UPDATE SET value = value + excluded.value
+        """,
+        list(deltas.items()),
     )
-    """)
-    
-    # Mevcut tabloya topic sütunu ekle (eğer yoksa)
-    try:
-        c.execute("ALTER TABLE questions ADD COLUMN topic TEXT")
-    except sqlite3.OperationalError:
-        pass  # Sütun zaten varsa hata verme
+
+
+def _get_counter(name):
+    row = get_connection().execute("SELECT value FROM stats_counters WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else 0
+
+
+def _refresh_session_stats(c):
+    """Kullanıcı istatistiklerini user_sessions'tan yeniden hesapla (toplu silmelerden sonra)"""
+    c.execute("UPDATE daily_stats SET user_count = 0")
     c.execute("""
-    CREATE TABLE IF NOT EXISTS question_sources (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        question_id INTEGER,
-        source_file TEXT,
-        FOREIGN KEY(question_id) REFERENCES questions(id),
-        UNIQUE(question_id, source_file)
-    )
+        INSERT INTO daily_stats (day, user_count)
+        SELECT session_date, COUNT(DISTINCT user_id) FROM user_sessions WHERE 1 GROUP BY session_date
+        ON CONFLICT(day) DO UPDATE SET user_count = excluded.user_count
     """)
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS question_similarity (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        question_id_1 INTEGER,
-        question_id_2 INTEGER,
-        similarity REAL,
-        FOREIGN KEY(question_id_1) REFERENCES questions(id),
-        FOREIGN KEY(question_id_2) REFERENCES questions(id)
+    total_users, total_entries = c.execute(
+        "SELECT COUNT(DISTINCT user_id), COUNT(*) FROM user_sessions"
+    ).fetchone()
+    c.executemany(
+        "INSERT OR REPLACE INTO stats_counters (name, value) VALUES (?, ?)",
+        [("total_users", total_users), ("total_entries", total_entries)],
     )
+    c.execute("DELETE FROM daily_stats WHERE question_count = 0 AND user_count = 0")
+    _bump_counters(c)
+
+
+def _rebuild_stats(c):
+    """Tüm istatistik tablolarını ham tablolardan yeniden hesapla (migration ve toplu temizlik)"""
+    c.execute("UPDATE daily_stats SET question_count = 0")
+    c.execute("""
+        INSERT INTO daily_stats (day, question_count)
+        SELECT date(created_at), COUNT(*) FROM questions WHERE 1 GROUP BY date(created_at)
+        ON CONFLICT(day) DO UPDATE SET question_count = excluded.question_count
     """)
+    # Kaynakların keyword / available bilgisi korunur, yalnızca sayılar yenilenir
+    c.execute("UPDATE source_stats SET question_count = 0")
     c.execute("""
-    CREATE TABLE IF NOT EXISTS user_sessions (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id TEXT NOT NULL,
-        session_date DATE DEFAULT (date('now')),
-        first_visit TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        total_questions INTEGER DEFAULT 0,
-        UNIQUE(user_id, session_date)
-    )
+        INSERT INTO source_stats (source_file, question_count)
+        SELECT source_file, COUNT(*) FROM questions
+        WHERE source_file IS NOT NULL AND source_file != ''
+        GROUP BY source_file
+        ON CONFLICT(source_file) DO UPDATE SET question_count = excluded.question_count
     """)
-    conn.commit()
-    conn.close()
+    c.execute("DELETE FROM source_stats WHERE question_count <= 0")
+    total_questions = c.execute("SELECT COUNT(*) FROM questions").fetchone()[0]
+    c.execute("INSERT OR REPLACE INTO stats_counters (name, value) VALUES ('total_questions', ?)", (total_questions,))
+    _refresh_session_stats(c)
+
+
+def _delete_questions(c, where_sql, params=()):
+    """Koşula uyan soruları sil; kümeleri ve istatistikleri aynı transaction'da düşür"""
+    c.execute(f"SELECT id FROM questions WHERE {where_sql}", params)
+    question_ids = [row[0] for row in c.fetchall()]
+    if not question_ids:
+        return 0
+    question_clusters.detach_questions(c, question_ids)
+
+    c.execute(f"SELECT date(created_at), COUNT(*) FROM questions WHERE {where_sql} GROUP BY 1", params)
+    c.executemany(
+        "UPDATE daily_stats SET question_count = question_count - ? WHERE day = ?",
+        [(count, day) for day, count in c.fetchall()],
+    )
+    c.execute(
+        f"""
+        SELECT source_file, COUNT(*) FROM questions
+        WHERE ({where_sql}) AND source_file IS NOT NULL AND source_file != ''
+        GROUP BY source_file
+        """,
+        params,
+    )
+    c.executemany(
+        "UPDATE source_stats SET question_count = question_count - ? WHERE source_file = ?",
+        [(count, source_file) for source_file, count in c.fetchall()],
+    )
+    c.execute("DELETE FROM source_stats WHERE question_count <= 0")
+
+    c.execute(f"DELETE FROM questions WHERE {where_sql}", params)
+    _bump_counters(c, total_questions=-len(question_ids))
+    return len(question_ids)
+
+
+def delete_questions_by_source_file(filename):
+    """Belirli bir dosyaya ait tüm soruları ve ilişkili verileri siler"""
+    with transaction() as c:
+        # Önce question_sources tablosundan sil
+        c.execute("DELETE FROM question_sources WHERE source_file = ?", (filename,))
+        # Sonra questions tablosundan sil (kümeler ve istatistikler birlikte güncellenir)
+        _delete_questions(c, "source_file = ?", (filename,))
+        # Son olarak orphan olmuş question_similarity kayıtlarını temizle
+        c.execute("DELETE FROM question_similarity WHERE question_id_1 NOT IN (SELECT id FROM questions) OR question_id_2 NOT IN (SELECT id FROM questions)")
+    print(f"✅ {filename} dosyasına ait tüm sorular ve ilişkili veriler silindi.")
 
 def detect_topic(question):
     """Sorudan topic/konu tespit et"""
@@ -106,13 +381,23 @@ def add_question(question, answer=None, source_file=None, source_keyword=None, t
         import os
         source_file = os.path.basename(source_file).lower()
 
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("INSERT INTO questions (question, answer, source_file, source_keyword, topic) VALUES (?, ?, ?, ?, ?)", 
-              (question, answer, source_file, source_keyword, topic))
-    qid = c.lastrowid
-    conn.commit()
-    conn.close()
+    with transaction() as c:
+        c.execute("INSERT INTO questions (question, answer, source_file, source_keyword, topic) VALUES (?, ?, ?, ?, ?)", 
+                  (question, answer, source_file, source_keyword, topic))
+        qid = c.lastrowid
+        question_clusters.assign_question(c, qid, question, topic)
+        # Dashboard istatistikleri aynı transaction'da
+        c.execute("""
+            INSERT INTO daily_stats (day, question_count)
+            SELECT date(created_at), 1 FROM questions WHERE id = ?
+            ON CONFLICT(day) DO UPDATE SET question_count = question_count + 1
+        """, (qid,))
+        if source_file:
+            c.execute("""
+                INSERT INTO source_stats (source_file, question_count) VALUES (?, 1)
+                ON CONFLICT(source_file) DO UPDATE SET question_count = question_count + 1
+            """, (source_file,))
+        _bump_counters(c, total_questions=1)
     return qid
 
 def add_question_source(question_id, source_file):
@@ -120,68 +405,53 @@ def add_question_source(question_id, source_file):
         return  # Boş veya geçersiz kaynak eklenmesin
     import os
     source_file = os.path.basename(source_file).lower()
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
     try:
-        c.execute("INSERT OR IGNORE INTO question_sources (question_id, source_file) VALUES (?, ?)", (question_id, source_file))
-        conn.commit()
+        with transaction() as c:
+            c.execute("INSERT OR IGNORE INTO question_sources (question_id, source_file) VALUES (?, ?)", (question_id, source_file))
     except Exception as e:
         print(f"⚠️ add_question_source hatası: {e}")
-    finally:
-        conn.close()
 
 def add_similarity(qid1, qid2, similarity):
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("INSERT INTO question_similarity (question_id_1, question_id_2, similarity) VALUES (?, ?, ?)", (qid1, qid2, similarity))
-    conn.commit()
-    conn.close()
+    with transaction() as c:
+        c.execute("INSERT INTO question_similarity (question_id_1, question_id_2, similarity) VALUES (?, ?, ?)", (qid1, qid2, similarity))
 
 def get_total_questions():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT COUNT(*) FROM questions")
-    total = c.fetchone()[0]
-    conn.close()
-    return total
+    return _get_counter("total_questions")
 
 def clear_all_questions():
     """Tüm soruları ve ilişkili verileri siler"""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("DELETE FROM question_similarity")
-    c.execute("DELETE FROM question_sources")
-    c.execute("DELETE FROM questions")
-    conn.commit()
-    conn.close()
+    with transaction() as c:
+        c.execute("DELETE FROM question_similarity")
+        c.execute("DELETE FROM question_sources")
+        question_clusters.clear_clusters(c)
+        c.execute("DELETE FROM questions")
+        _rebuild_stats(c)
     print("✅ Tüm sorular temizlendi")
 
 def clear_questions_by_period(period_type="all"):
     """Soruları dönem bazında temizle"""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    
-    if period_type == "today":
-        c.execute("DELETE FROM questions WHERE DATE(created_at) = DATE('now')")
-        c.execute("DELETE FROM user_sessions WHERE session_date = DATE('now')")
-    elif period_type == "all":
-        c.execute("DELETE FROM questions")
-        c.execute("DELETE FROM user_sessions")
-        c.execute("DELETE FROM question_sources")
-        c.execute("DELETE FROM question_similarity")
-    
-    conn.commit()
-    affected_rows = c.rowcount
-    conn.close()
+    with transaction() as c:
+        if period_type == "today":
+            day_start, day_end = _day_range(stats_today())
+            _delete_questions(c, "created_at >= ? AND created_at < ?", (day_start, day_end))
+            c.execute("DELETE FROM user_sessions WHERE session_date = DATE('now')")
+            affected_rows = c.rowcount
+            _refresh_session_stats(c)
+        elif period_type == "all":
+            question_clusters.clear_clusters(c)
+            c.execute("DELETE FROM questions")
+            c.execute("DELETE FROM user_sessions")
+            c.execute("DELETE FROM question_sources")
+            c.execute("DELETE FROM question_similarity")
+            affected_rows = c.rowcount
+            _rebuild_stats(c)
+        else:
+            affected_rows = 0
+
     return affected_rows
 
 def get_total_unique_questions():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT COUNT(DISTINCT question) FROM questions")
-    total = c.fetchone()[0]
-    conn.close()
-    return total
+    return get_connection().execute("SELECT COUNT(DISTINCT question) FROM questions").fetchone()[0]
 
 def get_available_filenames():
     """Mevcut dosya isimlerini enhanced_document_data.json'dan al"""
@@ -193,228 +463,90 @@ def get_available_filenames():
             filenames.update(item["filename"].lower() for item in data if "filename" in item)
     except Exception as e:
         print(f"Enhanced document data okunamadı: {e}")
-    # data.json
+    # data.jsonl (base_docs akış çıktısı)
     try:
-        with open("data.json", "r", encoding="utf-8") as f:
-            data = json.load(f)
-            filenames.update(item["filename"].lower() for item in data if "filename" in item)
+        filenames.update(item["filename"].lower() for item in _iter_pipeline_records() if "filename" in item)
     except Exception as e:
-        print(f"data.json okunamadı: {e}")
+        print(f"data.jsonl okunamadı: {e}")
     return list(filenames)
 
+def _iter_pipeline_records():
+    """base_docs'un data.jsonl kayıtları (embedding çözülmeden)"""
+    from jsonl_io import iter_records
+    return iter_records("data.jsonl", decode=False)
+
 def get_top_sources(limit=5):
-    """Sadece mevcut dosyalardan en çok kullanılan kaynakları al - aynı dosya için tek kayıt"""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    
-    # Mevcut dosya isimlerini al
-    available_files = get_available_filenames()
-    print(f"[DEBUG] available_files: {available_files}")
+    """Sadece mevcut dosyalardan en çok kullanılan kaynaklar - (kaynak, anahtar kelime, sayı)
 
-    # Hem tam dosya adı hem de sadece dosya adı (basename) ile eşleşme için iki set oluştur
-    available_files_set = set(f.lower() for f in available_files)
-    available_basenames = set(os.path.basename(f).lower() for f in available_files)
+    Sayılar add_question ile, mevcut olma / anahtar kelime bilgisi reconcile_sources ile güncellenir.
+    """
+    results = get_connection().execute("""
+        SELECT source_file, keyword, question_count FROM source_stats
+        WHERE available = 1 AND question_count > 0
+        ORDER BY question_count DESC
+        LIMIT ?
+    """, (limit,)).fetchall()
 
-    if not available_files:
-        conn.close()
-        print("[DEBUG] Hiç mevcut dosya yok!")
-        return [("(Hiç kaynak kullanılmadı)", "", 0)]
-    
-    # enhanced_document_data.json ve data.json'dan anahtar kelimeleri al
-    file_keywords = {}
-    for json_file in ["enhanced_document_data.json", "data.json"]:
-        try:
-            with open(json_file, "r", encoding="utf-8") as f:
-                document_data = json.load(f)
-                for item in document_data:
-                    fname = item.get("filename")
-                    if fname:
-                        fname_lower = fname.lower()
-                        if "keyword" in item:
-                            file_keywords[fname_lower] = item.get("keyword", "")
-        except Exception as e:
-            print(f"{json_file} okunamadı: {e}")
-    
-    # Placeholder'ları oluştur
-    # Tüm source_file'ları ve sayısını çek
-    c.execute("""
-        SELECT source_file, COUNT(*) as cnt
-        FROM questions
-        WHERE source_file IS NOT NULL AND source_file != ''
-        GROUP BY source_file
-        ORDER BY cnt DESC
-    """)
-    all_results = c.fetchall()
-    print(f"[DEBUG] ALL SQL results: {all_results}")
-
-    # Sadece json'daki dosyalarla eşleşenleri al (tam veya basename ile)
-    filtered_results = []
-    for source_file, cnt in all_results:
-        sf_lower = source_file.lower()
-        sf_base = os.path.basename(source_file).lower()
-        if sf_lower in available_files_set or sf_base in available_basenames:
-            filtered_results.append((source_file, cnt))
-
-    # Limitle
-    results = filtered_results[:limit]
-    print(f"[DEBUG] Filtered results: {results}")
-    conn.close()
-    
     if not results:
-        return [("(Hiç kaynak kullanılmadı)", "", 0, "")]
-    
-    # Sonuçları enhanced_document_data.json'dan gelen anahtar kelimelerle birleştir
-    final_results = []
-    for source_file, count in results:
-        keyword = file_keywords.get(source_file.lower(), "")
-        final_results.append((source_file, keyword, count))
-    return final_results
+        return [("(Hiç kaynak kullanılmadı)", "", 0)]
+    return [(source_file, keyword or "", count) for source_file, keyword, count in results]
 
 def get_top_questions_by_similarity(limit=5):
-    """Benzer soruları gruplar ve en çok sorulan grupları döndürür"""
-    import difflib
-    from collections import defaultdict
-    
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    
-    # Tüm soruları ve cevaplarını al
-    c.execute("SELECT question, answer, COUNT(*) as cnt FROM questions GROUP BY question, answer")
-    all_questions = c.fetchall()
-    conn.close()
-    
-    if not all_questions:
-        return []
-    
-    # Benzer soruları grupla
-    question_groups = defaultdict(list)
-    processed = set()
-    
-    for i, (question, answer, count) in enumerate(all_questions):
-        if i in processed:
-            continue
-            
-        # Bu soru için grup oluştur
-        group_key = question.lower().strip()
-        group_questions = [(question, answer, count)]
-        processed.add(i)
-        
-        # Diğer sorularla benzerlik kontrolü
-        for j, (other_question, other_answer, other_count) in enumerate(all_questions):
-            if j in processed or i == j:
-                continue
-                
-            # Benzerlik oranını hesapla
-            similarity = difflib.SequenceMatcher(
-                None, 
-                question.lower().strip(), 
-                other_question.lower().strip()
-            ).ratio()
-            
-            # %75 ve üzeri benzerlik varsa aynı grup
-            if similarity >= 0.75:
-                group_questions.append((other_question, other_answer, other_count))
-                processed.add(j)
-        
-        # Grup toplamını hesapla
-        total_count = sum(q[2] for q in group_questions)
-        
-        # En çok sorulan soruyu temsil edici olarak seç
-        representative = max(group_questions, key=lambda x: x[2])
-        
-        question_groups[group_key] = {
-            'question': representative[0],
-            'answer': representative[1], 
-            'count': total_count,
-            'variants': len(group_questions)
-        }
-    
-    # Sayıya göre sırala ve limit kadar al
-    sorted_groups = sorted(
-        question_groups.values(), 
-        key=lambda x: x['count'], 
-        reverse=True
-    )
-    
-    return [(g['question'], g['answer'], g['count']) for g in sorted_groups[:limit]]
+    """Benzer soru kümelerinden en çok sorulanları döndürür (%75 benzerlik, kümeler eklemede güncellenir)"""
+    clusters = question_clusters.top_clusters(get_connection(), "global", limit)
+    return [(g['question'], g['answer'], g['count']) for g in clusters]
 
 def track_user_session(user_id, question_asked=False):
-    """Kullanıcı oturumunu takip et"""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    
-    today = datetime.now().date()
+    """Kullanıcı oturumunu takip et (gün UTC, bkz. stats_today)"""
+    today = stats_today().isoformat()
     
     try:
-        # Bugün için session var mı kontrol et
-        c.execute("""
-            SELECT id, total_questions FROM user_sessions 
-            WHERE user_id = ? AND session_date = ?
-        """, (user_id, today))
-        
-        result = c.fetchone()
-        
-        if result:
-            # Mevcut session'ı güncelle
-            session_id, current_questions = result
-            new_question_count = current_questions + (1 if question_asked else 0)
-            
-            c.execute("""
-                UPDATE user_sessions 
-                SET last_activity = CURRENT_TIMESTAMP, total_questions = ?
-                WHERE id = ?
-            """, (new_question_count, session_id))
-        else:
-            # Yeni session oluştur
-            c.execute("""
-                INSERT INTO user_sessions (user_id, session_date, total_questions)
-                VALUES (?, ?, ?)
-            """, (user_id, today, 1 if question_asked else 0))
-        
-        conn.commit()
+        with transaction() as c:
+            seen_before = c.execute(
+                "SELECT 1 FROM user_sessions WHERE user_id = ? LIMIT 1", (user_id,)
+            ).fetchone() is not None
+            c.execute(
+                "INSERT OR IGNORE INTO user_sessions (user_id, session_date, total_questions) VALUES (?, ?, ?)",
+                (user_id, today, 1 if question_asked else 0),
+            )
+            if c.rowcount == 1:
+                # Bugünün ilk oturumu: günlük / toplam kullanıcı istatistikleri
+                c.execute("""
+                    INSERT INTO daily_stats (day, user_count) VALUES (?, 1)
+                    ON CONFLICT(day) DO UPDATE SET user_count = user_count + 1
+                """, (today,))
+                _bump_counters(c, total_entries=1, total_users=0 if seen_before else 1)
+            else:
+                c.execute("""
+                    UPDATE user_sessions SET
+                        last_activity = CURRENT_TIMESTAMP,
+                        total_questions = total_questions + ?
+                    WHERE user_id = ? AND session_date = ?
+                """, (1 if question_asked else 0, user_id, today))
     except Exception as e:
         print(f"Session tracking hatası: {e}")
-    finally:
-        conn.close()
 
 def get_daily_user_stats():
-    """Günlük kullanıcı istatistiklerini getir"""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    """Günlük kullanıcı istatistiklerini getir (daily_stats / stats_counters üzerinden)"""
+    conn = get_connection()
+    today = stats_today()
     
     try:
-        # Bugünkü aktif kullanıcı sayısı
-        c.execute("""
-            SELECT COUNT(DISTINCT user_id) as daily_users
-            FROM user_sessions 
-            WHERE session_date = date('now')
-        """)
-        daily_users = c.fetchone()[0] or 0
-        
-        # Toplam benzersiz kullanıcı sayısı
-        c.execute("""
-            SELECT COUNT(DISTINCT user_id) as total_users
-            FROM user_sessions
-        """)
-        total_users = c.fetchone()[0] or 0
+        row = conn.execute("SELECT user_count FROM daily_stats WHERE day = ?", (today.isoformat(),)).fetchone()
+        daily_users = row[0] if row else 0
+        total_users = _get_counter("total_users")
         
         # Son 7 günlük aktivite
-        c.execute("""
-            SELECT session_date, COUNT(DISTINCT user_id) as user_count
-            FROM user_sessions 
-            WHERE session_date >= date('now', '-7 days')
-            GROUP BY session_date 
-            ORDER BY session_date DESC
-        """)
-        weekly_activity = c.fetchall()
+        weekly_activity = conn.execute("""
+            SELECT day, user_count FROM daily_stats
+            WHERE day >= ? AND user_count > 0
+            ORDER BY day DESC
+        """, ((today - timedelta(days=7)).isoformat(),)).fetchall()
         
-        # Bugünkü toplam soru sayısı
-        c.execute("""
-            SELECT SUM(total_questions) as daily_questions
-            FROM user_sessions 
-            WHERE session_date = date('now')
-        """)
-        daily_questions = c.fetchone()[0] or 0
+        # Bugünkü toplam soru sayısı (oturumlardan, session_date index'i ile)
+        daily_questions = conn.execute("""
+            SELECT SUM(total_questions) FROM user_sessions WHERE session_date = ?
+        """, (today.isoformat(),)).fetchone()[0] or 0
         
         return {
             'daily_users': daily_users,
@@ -430,147 +562,89 @@ def get_daily_user_stats():
             'daily_questions': 0,
             'weekly_activity': []
         }
-    finally:
-        conn.close()
 
 def get_total_entry_count():
     """Toplam giriş sayısını getir"""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    
     try:
-        c.execute("SELECT COUNT(*) as total_entries FROM user_sessions")
-        result = c.fetchone()
-        return result[0] if result else 0
+        return _get_counter("total_entries")
     except Exception as e:
         print(f"Toplam giriş sayısı hatası: {e}")
         return 0
-    finally:
-        conn.close()
+
+def get_daily_question_count(day=None):
+    """Verilen gün (varsayılan bugün, UTC - created_at ile aynı) sorulan soru sayısı"""
+    day = day or stats_today().isoformat()
+    if not isinstance(day, str):
+        day = day.isoformat()
+    row = get_connection().execute("SELECT question_count FROM daily_stats WHERE day = ?", (day,)).fetchone()
+    return row[0] if row else 0
+
+def get_stats_version():
+    """İstatistikler her değiştiğinde artan sayaç"""
+    return _get_counter("version")
 
 def get_top_questions_with_topics(limit=5):
-    """Topic'lere göre gruplandırılmış en çok sorulan soruları döndürür"""
-    import difflib
-    from collections import defaultdict
-    
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    
-    # Tüm soruları topic ile birlikte al
-    c.execute("SELECT question, answer, topic, COUNT(*) as cnt FROM questions GROUP BY question, answer, topic")
-    all_questions = c.fetchall()
-    conn.close()
-    
-    if not all_questions:
-        return []
-    
-    # Topic'lere göre grupla
-    topic_groups = defaultdict(list)
-    
-    for question, answer, topic, count in all_questions:
-        topic = topic or "genel"
-        topic_groups[topic].append((question, answer, count))
-    
-    # Her topic için benzer soruları grupla
-    final_results = []
-    
-    for topic, questions in topic_groups.items():
-        if not questions:
-            continue
-            
-        # Bu topic içinde benzer soruları grupla
-        processed = set()
-        grouped_questions = []
-        
-        for i, (question, answer, count) in enumerate(questions):
-            if i in processed:
-                continue
-                
-            group_questions = [(question, answer, count)]
-            processed.add(i)
-            
-            # Aynı topic içindeki diğer sorularla benzerlik kontrolü
-            for j, (other_question, other_answer, other_count) in enumerate(questions):
-                if j in processed or i == j:
-                    continue
-                
-                similarity = difflib.SequenceMatcher(
-                    None, 
-                    question.lower().strip(), 
-                    other_question.lower().strip()
-                ).ratio()
-                
-                if similarity >= 0.7:  # %70 benzerlik
-                    group_questions.append((other_question, other_answer, other_count))
-                    processed.add(j)
-            
-            # Grup toplamını hesapla
-            total_count = sum(q[2] for q in group_questions)
-            
-            # En çok sorulan soruyu temsil edici seç
-            representative = max(group_questions, key=lambda x: x[2])
-            
-            grouped_questions.append({
-                'question': f"[{topic.replace('_', ' ').title()}] {representative[0]}",
-                'answer': representative[1],
-                'count': total_count,
-                'topic': topic,
-                'variants': len(group_questions)
-            })
-        
-        final_results.extend(grouped_questions)
-    
-    # Sayıya göre sırala ve limit kadar al
-    final_results.sort(key=lambda x: x['count'], reverse=True)
-    return final_results[:limit]
+    """Topic'lere göre gruplandırılmış en çok sorulan soruları döndürür (topic içinde %70 benzerlik)"""
+    clusters = question_clusters.top_clusters(get_connection(), "topic", limit)
+    for group in clusters:
+        group['question'] = f"[{group['topic'].replace('_', ' ').title()}] {group['question']}"
+    return clusters
 
-def clean_obsolete_sources():
-    """Artık mevcut olmayan dosyalara ait kayıtları temizle ve anahtar kelimeleri güncelle"""
+def reconcile_sources():
+    """
+    Artık mevcut olmayan dosyalara ait kayıtları temizle, source_stats'ın
+    mevcut olma / anahtar kelime bilgisini güncelle. Dashboard isteklerinde değil
+    arka plandaki stats_service reconciler'ında çalışır.
+    """
     try:
-        available_files = get_available_filenames()
-        
-        if not available_files:
-            print("Mevcut dosya bulunamadı, temizlik yapılmıyor.")
-            return
-            
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        
-        # Mevcut olmayan kaynak dosyalarına sahip kayıtları bul
-        placeholders = ','.join(['?' for _ in available_files])
-        c.execute(f"""
-        SELECT COUNT(*) FROM questions 
-        WHERE source_file IS NOT NULL 
-        AND source_file != '' 
-        AND source_file NOT IN ({placeholders})
-        """, available_files)
-        
-        obsolete_count = c.fetchone()[0]
-        
-        if obsolete_count > 0:
-            print(f"Temizlenecek eski kayıt sayısı: {obsolete_count}")
-            
-            # Eski kayıtları sil
-            c.execute(f"""
-            DELETE FROM questions 
-            WHERE source_file IS NOT NULL 
-            AND source_file != '' 
-            AND source_file NOT IN ({placeholders})
-            """, available_files)
-            
-            conn.commit()
-            print(f"{obsolete_count} eski kayıt temizlendi.")
-        else:
-            print("Temizlenecek eski kayıt bulunamadı.")
-            
-        conn.close()
-        
+        available_files = set(get_available_filenames())
+        file_keywords = {name.lower(): keyword for name, keyword in _load_file_keywords().items() if keyword}
+        try:
+            for item in _iter_pipeline_records():
+                if item.get("filename") and item.get("keyword"):
+                    file_keywords[item["filename"].lower()] = item["keyword"]
+        except Exception as e:
+            print(f"data.jsonl okunamadı: {e}")
+
+        with transaction() as c:
+            if available_files:
+                # Mevcut olmayan kaynak dosyalarına sahip kayıtları sil
+                placeholders = ','.join(['?' for _ in available_files])
+                obsolete_count = _delete_questions(
+                    c,
+                    f"source_file IS NOT NULL AND source_file != '' AND source_file NOT IN ({placeholders})",
+                    list(available_files),
+                )
+                if obsolete_count > 0:
+                    print(f"{obsolete_count} eski kayıt temizlendi.")
+            else:
+                print("Mevcut dosya bulunamadı, temizlik yapılmıyor.")
+
+            # Hem tam dosya adı hem de basename ile eşleşme
+            available_basenames = {os.path.basename(f).lower() for f in available_files}
+            changes = []
+            for source_file, keyword, available in c.execute(
+                "SELECT source_file, keyword, available FROM source_stats"
+            ).fetchall():
+                name = source_file.lower()
+                is_available = int(name in available_files or os.path.basename(name) in available_basenames)
+                new_keyword = file_keywords.get(name, keyword or "")
+                if is_available != available or new_keyword != (keyword or ""):
+                    changes.append((is_available, new_keyword, source_file))
+            if changes:
+                c.executemany("UPDATE source_stats SET available = ?, keyword = ? WHERE source_file = ?", changes)
+                _bump_counters(c)
+
         # Anahtar kelimeleri güncelle
         update_missing_keywords()
         
     except Exception as e:
         print(f"Eski kayıt temizlenirken hata: {e}")
 
+def clean_obsolete_sources():
+    """Geriye uyumluluk: reconcile_sources ile aynı"""
+    reconcile_sources()
+
 def update_missing_keywords():
     """Eksik anahtar kelimeleri enhanced_document_data.json'dan güncelle"""
     try:
@@ -579,25 +653,20 @@ def update_missing_keywords():
             document_data = json.load(f)
             file_keywords = {item["filename"]: item.get("keyword", "") for item in document_data}
         
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        
         updated_count = 0
         
-        for filename, keyword in file_keywords.items():
-            if keyword:  # Anahtar kelime varsa
-                # Bu dosya için boş anahtar kelimeli kayıtları güncelle
-                c.execute("""
-                UPDATE questions 
-                SET source_keyword = ? 
-                WHERE source_file = ? 
-                AND (source_keyword IS NULL OR source_keyword = '')
-                """, (keyword, filename))
-                
-                updated_count += c.rowcount
-        
-        conn.commit()
-        conn.close()
+        with transaction() as c:
+            for filename, keyword in file_keywords.items():
+                if keyword:  # Anahtar kelime varsa
+                    # Bu dosya için boş anahtar kelimeli kayıtları güncelle
+                    c.execute("""
+                    UPDATE questions 
+                    SET source_keyword = ? 
+                    WHERE source_file = ? 
+                    AND (source_keyword IS NULL OR source_keyword = '')
+                    """, (keyword, filename))
+                    
+                    updated_count += c.rowcount
         
         if updated_count > 0:
             print(f"{updated_count} kayıt için anahtar kelime güncellendi.")
@@ -607,83 +676,79 @@ def update_missing_keywords():
     except Exception as e:
         print(f"Anahtar kelime güncellenirken hata: {e}")
 
+def _load_file_keywords():
+    """Enhanced document data'dan dosya -> anahtar kelime"""
+    try:
+        with open("enhanced_document_data.json", "r", encoding="utf-8") as f:
+            document_data = json.load(f)
+            return {item["filename"]: item.get("keyword", "") for item in document_data}
+    except Exception as e:
+        print(f"Enhanced document data okunamadı: {e}")
+        return {}
+
+def _grouped_questions_page(where_sql, params, page, limit):
+    """
+    Normalize soruya (LOWER(TRIM(question))) göre gruplanmış sayfa.
+    Gruplama idx_questions_normalized, gün filtresi idx_questions_created_at ile yapılır.
+    """
+    conn = get_connection()
+    offset = (page - 1) * limit
+    file_keywords = _load_file_keywords()
+
+    # Aynı soruları grupla (case-insensitive)
+    rows = conn.execute(f"""
+    SELECT LOWER(TRIM(question)) as normalized_question, 
+           question as original_question,
+           answer, 
+           source_file,
+           topic,
+           COUNT(*) as count, 
+           MIN(created_at) as first_asked
+    FROM questions 
+    {where_sql}
+    GROUP BY LOWER(TRIM(question))
+    ORDER BY count DESC, first_asked DESC
+    LIMIT ? OFFSET ?
+    """, (*params, limit, offset)).fetchall()
+
+    questions = []
+    for i, (normalized_question, original_question, answer, source_file, topic, count, created_at) in enumerate(rows):
+        source_keyword = file_keywords.get(source_file, "") if source_file else ""
+        questions.append({
+            "id": offset + i + 1,
+            "question": original_question,
+            "answer": answer,
+            "count": count,
+            "created_at": created_at,
+            "source_file": source_file,
+            "source_keyword": source_keyword,
+            "topic": topic or "Genel"
+        })
+
+    # Toplam sayfa sayısını hesapla - unique sorular için
+    total_questions = conn.execute(f"""
+    SELECT COUNT(*) as total
+    FROM (
+        SELECT DISTINCT LOWER(TRIM(question))
+        FROM questions 
+        {where_sql}
+    )
+    """, params).fetchone()[0]
+    total_pages = (total_questions + limit - 1) // limit  # Ceiling division
+
+    return {
+        "questions": questions,
+        "total_pages": max(1, total_pages),
+        "total_questions": total_questions
+    }
+
 def get_daily_questions_paginated(page=1, limit=10):
     """Bugün sorulan soruları sayfalayarak al - kaynak bilgileriyle birlikte"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        
-        today = datetime.now().strftime('%Y-%m-%d')
-        offset = (page - 1) * limit
-        
-        # Enhanced document data'dan anahtar kelimeleri al
-        file_keywords = {}
-        try:
-            with open("enhanced_document_data.json", "r", encoding="utf-8") as f:
-                document_data = json.load(f)
-                file_keywords = {item["filename"]: item.get("keyword", "") for item in document_data}
-        except Exception as e:
-            print(f"Enhanced document data okunamadı: {e}")
-        
-        # Bugün sorulan sorular - aynı soruları grupla (case-insensitive)
-        c.execute("""
-        SELECT LOWER(TRIM(question)) as normalized_question, 
-               question as original_question,
-               answer, 
-               source_file,
-               topic,
-               COUNT(*) as count, 
-               MIN(created_at) as first_asked
-        FROM questions 
-        WHERE DATE(created_at) = ?
-        GROUP BY LOWER(TRIM(question))
-        ORDER BY count DESC, first_asked DESC
-        LIMIT ? OFFSET ?
-        """, (today, limit, offset))
-        
-        questions = []
-        for i, (normalized_question, original_question, answer, source_file, topic, count, created_at) in enumerate(c.fetchall()):
-            source_keyword = file_keywords.get(source_file, "") if source_file else ""
-            questions.append({
-                "id": offset + i + 1,
-                "question": original_question,
-                "answer": answer,
-                "count": count,
-                "created_at": created_at,
-                "source_file": source_file,
-                "source_keyword": source_keyword,
-                "topic": topic or "Genel"
-            })
-        
-        # Toplam sayfa sayısını hesapla - unique sorular için
-        c.execute("""
-        SELECT COUNT(*) as total
-        FROM (
-            SELECT DISTINCT LOWER(TRIM(question))
-            FROM questions 
-            WHERE DATE(created_at) = ?
+        day_start, day_end = _day_range(stats_today())
+        return _grouped_questions_page(
+            "WHERE created_at >= ? AND created_at < ?", (day_start, day_end), page, limit
         )
-        """, (today,))
-        
-        total_questions = c.fetchone()[0]
-        total_pages = (total_questions + limit - 1) // limit  # Ceiling division
-        
-        conn.close()
-        
-        return {
-            "questions": questions,
-            "total_pages": max(1, total_pages),
-            "total_questions": total_questions
-        }
-        
-    except Exception as e:
-        print(f"Günlük sorular alınırken hata: {e}")
-        return {
-            "questions": [],
-            "total_pages": 1,
-            "total_questions": 0
-        }
-        
     except Exception as e:
         print(f"Günlük sorular alınırken hata: {e}")
         return {
@@ -695,77 +760,7 @@ def get_daily_questions_paginated(page=1, limit=10):
 def get_all_questions_paginated(page=1, limit=10):
     """Tüm soruları sayfalayarak al - en çok sorulan sorular için"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        
-        offset = (page - 1) * limit
-        
-        # Enhanced document data'dan anahtar kelimeleri al
-        file_keywords = {}
-        try:
-            with open("enhanced_document_data.json", "r", encoding="utf-8") as f:
-                document_data = json.load(f)
-                file_keywords = {item["filename"]: item.get("keyword", "") for item in document_data}
-        except Exception as e:
-            print(f"Enhanced document data okunamadı: {e}")
-        
-        # Tüm sorular - aynı soruları grupla (case-insensitive)
-        c.execute("""
-        SELECT LOWER(TRIM(question)) as normalized_question, 
-               question as original_question,
-               answer, 
-               source_file,
-               topic,
-               COUNT(*) as count, 
-               MIN(created_at) as first_asked
-        FROM questions 
-        GROUP BY LOWER(TRIM(question))
-        ORDER BY count DESC, first_asked DESC
-        LIMIT ? OFFSET ?
-        """, (limit, offset))
-        
-        questions = []
-        for i, (normalized_question, original_question, answer, source_file, topic, count, created_at) in enumerate(c.fetchall()):
-            source_keyword = file_keywords.get(source_file, "") if source_file else ""
-            questions.append({
-                "id": offset + i + 1,
-                "question": original_question,
-                "answer": answer,
-                "count": count,
-                "created_at": created_at,
-                "source_file": source_file,
-                "source_keyword": source_keyword,
-                "topic": topic or "Genel"
-            })
-        
-        # Toplam sayfa sayısını hesapla - unique sorular için
-        c.execute("""
-        SELECT COUNT(*) as total
-        FROM (
-            SELECT DISTINCT LOWER(TRIM(question))
-            FROM questions 
-        )
-        """)
-        
-        total_questions = c.fetchone()[0]
-        total_pages = (total_questions + limit - 1) // limit  # Ceiling division
-        
-        conn.close()
-        
-        return {
-            "questions": questions,
-            "total_pages": max(1, total_pages),
-            "total_questions": total_questions
-        }
-        
-    except Exception as e:
-        print(f"Tüm sorular alınırken hata: {e}")
-        return {
-            "questions": [],
-            "total_pages": 1,
-            "total_questions": 0
-        }
-        
+        return _grouped_questions_page("", (), page, limit)
     except Exception as e:
         print(f"Tüm sorular alınırken hata: {e}")
         return {
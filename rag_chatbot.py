@@ -1,12 +1,15 @@
 import chromadb
-from quer import ask_local_llm, temizle_yanit
+from quer import ask_local_llm, stream_local_llm, temizle_yanit
 from config import config
 from query_processor import QueryProcessor
 from hybrid_retriever import HybridRetriever
 from evaluator import ResponseEvaluator
+from conversation_store import ConversationStore, HistoryEntry, conversation_store
+from answer_cache import answer_cache, retrieval_fingerprint
+from parent_store import get_parent_store
 import logging
 import re
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterator
 
 # Logging setup
 logging.basicConfig(level=logging.INFO)
@@ -16,101 +19,290 @@ logger = logging.getLogger(__name__)
 class AdvancedRAGChatbot:
     """Gelişmiş RAG Chatbot sistemi"""
 
-    def __init__(self, chroma_path: str = "./chroma"):
+    def __init__(
+        self,
+        chroma_path: str = "./chroma",
+        store: Optional[ConversationStore] = None,
+    ):
+        # Retriever ve modeller paylaşılır; kullanıcıya ait durum sadece store'da
         self.retriever = HybridRetriever(chroma_path)
         self.query_processor = QueryProcessor()
         self.evaluator = ResponseEvaluator()
         
-        # Conversation history için
-        self.conversation_history = []  # [(question, answer, timestamp), ...]
-        self.max_history_length = 5  # Son 5 soru-cevap çiftini hatırla
+        # Kullanıcı bazlı conversation history (LRU + TTL)
+        self.conversation_store = store or conversation_store
+
+        # Tekrarlanan sorular için semantik yanıt cache'i
+        self.answer_cache = answer_cache
+
+        # Child chunk'lar için LLM'e verilecek parent pasajlar
+        self.parent_store = get_parent_store(chroma_path)
 
         logger.info("🤖 Gelişmiş RAG Chatbot başlatıldı!")
 
-    def process_query(self, user_query: str) -> Dict[str, Any]:
+    def process_query(self, user_query: str, user_id: str = "anonymous") -> Dict[str, Any]:
         """Kullanıcı sorgusunu kapsamlı şekilde işle"""
         try:
-            # 1. Context-aware query expansion
-            expanded_query = self._expand_query_with_context(user_query)
-            
-            # 2. Query preprocessing
-            processed_query = self.query_processor.process_query(expanded_query)
-            logger.info(f"📝 İşlenmiş sorgu kategorisi: {processed_query['category']}")
+            # 1-4. Retrieval ve context hazırlığı
+            retrieval = self._retrieve_and_prepare(user_query, user_id)
+            if "early_result" in retrieval:
+                return retrieval["early_result"]
 
-            # 3. Advanced retrieval
-            retrieval_result = self.retriever.advanced_retrieve(
-                expanded_query, n_results=config.DEFAULT_N_RESULTS
+            # 4.5. Semantik yanıt cache'i (aynı soru + aynı chunk'lar)
+            cached_result = self._lookup_cached_answer(user_query, retrieval)
+            if cached_result:
+                return cached_result
+
+            # 5. Generate response
+            response_data = self._generate_response(
+                user_query, retrieval["context_info"], retrieval["processed_query"]
             )
 
-            if not retrieval_result["results"]:
-                return self._handle_no_results(user_query)
+            # 6-8. Değerlendirme, sonuç ve history
+            result = self._finalize_result(user_query, response_data["response"], retrieval)
+            self._store_cached_answer(retrieval, result)
+            return result
 
-            # 3.5. Context-aware boosting - conversation history'deki belgeleri öne çıkar
-            boosted_results = self._apply_conversation_context_boost(retrieval_result["results"], user_query)
+        except Exception as e:
+            logger.error(f"❌ Query işleme hatası: {e}")
+            return self._handle_error(user_query, str(e))
 
-            # 4. Filter by similarity threshold
-            filtered_results = self.retriever.filter_by_similarity_threshold(
-                boosted_results
+    def process_query_stream(
+        self, user_query: str, user_id: str = "anonymous"
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        process_query'nin akış versiyonu. Sırasıyla şu olayları üretir:
+          {"type": "meta", ...}   - kaynaklar ve retrieval bilgisi (LLM'den önce)
+          {"type": "token", "content": ...} - <think> ayıklanmış model çıktısı
+          {"type": "done", "result": {...}} - process_query ile aynı sonuç sözlüğü
+        """
+        try:
+            retrieval = self._retrieve_and_prepare(user_query, user_id)
+        except Exception as e:
+            logger.error(f"❌ Query işleme hatası: {e}")
+            retrieval = {"early_result": self._handle_error(user_query, str(e))}
+
+        if "early_result" in retrieval:
+            result = retrieval["early_result"]
+            yield {
+                "type": "meta",
+                "sources": result.get("sources", []),
+                "retrieval_info": result.get("retrieval_info", {}),
+                "query_analysis": result.get("query_analysis", {}),
+            }
+            yield {"type": "token", "content": result["response"]}
+            yield {"type": "done", "result": result}
+            return
+
+        context_info = retrieval["context_info"]
+        processed_query = retrieval["processed_query"]
+
+        cached_result = self._lookup_cached_answer(user_query, retrieval)
+        if cached_result:
+            yield {
+                "type": "meta",
+                "sources": cached_result["sources"],
+                "retrieval_info": cached_result["retrieval_info"],
+                "query_analysis": processed_query,
+                "cache_hit": True,
+            }
+            yield {"type": "token", "content": cached_result["response"]}
+            yield {"type": "done", "result": cached_result}
+            return
+
+        yield {
+            "type": "meta",
+            "sources": context_info["sources"][:1],
+            "retrieval_info": self._build_retrieval_info(retrieval),
+            "query_analysis": processed_query,
+        }
+
+        try:
+            prompt = self._build_prompt(user_query, context_info, processed_query)
+            raw_parts = []
+            for token in stream_local_llm(prompt, model=config.LLM_MODEL):
+                raw_parts.append(token)
+                yield {"type": "token", "content": token}
+
+            response = self._clean_llm_response(
+                "".join(raw_parts), context_info, user_query
             )
+            result = self._finalize_result(user_query, response, retrieval)
+            self._store_cached_answer(retrieval, result)
+        except Exception as e:
+            logger.error(f"❌ Stream yanıt hatası: {e}")
+            result = self._handle_error(user_query, str(e))
+
+        yield {"type": "done", "result": result}
+
+    def _retrieve_and_prepare(self, user_query: str, user_id: str) -> Dict[str, Any]:
+        """
+        Sorgu genişletme, retrieval, boost, filtreleme ve context hazırlığı.
+        Yanıt üretilemeyecekse sonuç "early_result" anahtarıyla döner.
+        """
+        history = self.conversation_store.get_history(user_id)
+
+        # 1. Context-aware query expansion
+        expanded_query = self._expand_query_with_context(user_query, history)
+
+        # 2. Query preprocessing
+        processed_query = self.query_processor.process_query(expanded_query)
+        logger.info(f"📝 İşlenmiş sorgu kategorisi: {processed_query['category']}")
 
-            if not filtered_results:
-                return self._handle_low_similarity(
+        # 3. Advanced retrieval
+        retrieval_result = self.retriever.advanced_retrieve(
+            expanded_query, n_results=config.DEFAULT_N_RESULTS
+        )
+
+        if not retrieval_result["results"]:
+            return {"early_result": self._handle_no_results(user_query)}
+
+        # 3.5. Context-aware boosting - conversation history'deki belgeleri öne çıkar
+        boosted_results = self._apply_conversation_context_boost(
+            retrieval_result["results"], user_query, history
+        )
+
+        # 4. Filter by similarity threshold
+        filtered_results = self.retriever.filter_by_similarity_threshold(
+            boosted_results
+        )
+
+        if not filtered_results:
+            return {
+                "early_result": self._handle_low_similarity(
                     user_query, retrieval_result["results"]
                 )
+            }
 
-            # 4. Context preparation
-            context_info = self._prepare_context(filtered_results, processed_query)
+        # 4. Context preparation
+        context_info = self._prepare_context(filtered_results, processed_query)
 
-            # 5. Generate response
-            response_data = self._generate_response(
-                user_query, context_info, processed_query
-            )
+        return {
+            "user_id": user_id,
+            "user_query": user_query,
+            "processed_query": processed_query,
+            "retrieval_result": retrieval_result,
+            "filtered_results": filtered_results,
+            "context_info": context_info,
+        }
 
-            # 6. Evaluate response quality
-            evaluation = self._evaluate_response(
-                response_data["response"],
-                user_query,
-                context_info["sources"],
-                context_info["documents"],
+    def _answer_cache_key(self, user_query: str, retrieval: Dict[str, Any]):
+        """Sorgu embedding'i ve context'e giren chunk'ların parmak izi"""
+        if "answer_cache_key" not in retrieval:
+            chunk_ids = [
+                part.get("id") or f"{part['source']}:{part['chunk_index']}"
+                for part in retrieval["context_info"]["context_parts"]
+            ]
+            retrieval["answer_cache_key"] = (
+                self.retriever.embed_query(user_query),
+                retrieval_fingerprint(chunk_ids),
             )
-
-            # 7. Prepare final result
-            # Sadece gerçekten kullanılan ilk source'u döndür (en yüksek skorlu)
-            result = {
-                "response": response_data["response"],
-                "sources": context_info["sources"][:1],  # İlk source (en alakalı)
-                "confidence": evaluation["overall_score"],
-                "quality_level": evaluation["quality_level"],
-                "query_analysis": processed_query,
-                "retrieval_info": {
-                    "total_found": len(retrieval_result["results"]),
-                    "after_filtering": len(filtered_results),
-                    "best_score": (
-                        filtered_results[0]["combined_score"] if filtered_results else 0
-                    ),
+        return retrieval["answer_cache_key"]
+
+    def _lookup_cached_answer(
+        self, user_query: str, retrieval: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """Cache'te eşleşen yanıt varsa sonuç sözlüğünü döndür"""
+        if not config.ANSWER_CACHE_ENABLED:
+            return None
+        try:
+            embedding, fingerprint = self._answer_cache_key(user_query, retrieval)
+            cached = self.answer_cache.lookup(embedding, fingerprint)
+        except Exception as e:
+            logger.warning(f"⚠️ Yanıt cache kontrolü başarısız: {e}")
+            return None
+        if not cached:
+            return None
+
+        logger.info(f"⚡ Yanıt cache'ten döndü (benzerlik: {cached['cache_similarity']:.3f})")
+        result = {
+            **cached,
+            "query_analysis": retrieval["processed_query"],
+            "retrieval_info": self._build_retrieval_info(retrieval),
+            "cache_hit": True,
+        }
+        self._add_to_conversation_history(retrieval["user_id"], user_query, result["response"])
+        return result
+
+    def _store_cached_answer(self, retrieval: Dict[str, Any], result: Dict[str, Any]):
+        """Başarılı yanıtları cache'e yaz"""
+        if not config.ANSWER_CACHE_ENABLED:
+            return
+        if result.get("quality_level") in ["Bilgi Yok", "Düşük Güven", "Hata"]:
+            return
+        if result["response"].startswith("⚠️"):
+            return
+        try:
+            embedding, fingerprint = self._answer_cache_key(
+                retrieval["user_query"], retrieval
+            )
+            self.answer_cache.store(
+                embedding,
+                fingerprint,
+                retrieval["context_info"]["sources"],
+                {
+                    key: result[key]
+                    for key in ("response", "sources", "confidence", "quality_level", "evaluation")
+                    if key in result
                 },
-                "evaluation": evaluation,
-            }
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Yanıt cache'e yazılamadı: {e}")
 
-            # 8. Conversation history'ye ekle
-            self._add_to_conversation_history(user_query, response_data["response"])
+    def _build_retrieval_info(self, retrieval: Dict[str, Any]) -> Dict[str, Any]:
+        """Sonuç sözlüğündeki retrieval_info alanı"""
+        filtered_results = retrieval["filtered_results"]
+        return {
+            "total_found": len(retrieval["retrieval_result"]["results"]),
+            "after_filtering": len(filtered_results),
+            "best_score": (
+                filtered_results[0]["combined_score"] if filtered_results else 0
+            ),
+        }
 
-            return result
+    def _finalize_result(
+        self, user_query: str, response: str, retrieval: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Yanıtı değerlendir, sonuç sözlüğünü kur ve history'ye ekle"""
+        context_info = retrieval["context_info"]
+
+        # 6. Evaluate response quality
+        evaluation = self._evaluate_response(
+            response,
+            user_query,
+            context_info["sources"],
+            context_info["documents"],
+        )
 
-        except Exception as e:
-            logger.error(f"❌ Query işleme hatası: {e}")
-            return self._handle_error(user_query, str(e))
+        # 7. Prepare final result
+        # Sadece gerçekten kullanılan ilk source'u döndür (en yüksek skorlu)
+        result = {
+            "response": response,
+            "sources": context_info["sources"][:1],  # İlk source (en alakalı)
+            "confidence": evaluation["overall_score"],
+            "quality_level": evaluation["quality_level"],
+            "query_analysis": retrieval["processed_query"],
+            "retrieval_info": self._build_retrieval_info(retrieval),
+            "evaluation": evaluation,
+        }
+
+        # 8. Conversation history'ye ekle
+        self._add_to_conversation_history(retrieval["user_id"], user_query, response)
+
+        return result
 
-    def _expand_query_with_context(self, user_query: str) -> str:
+    def _expand_query_with_context(
+        self, user_query: str, history: List[HistoryEntry]
+    ) -> str:
         """Conversation history kullanarak sorguyu genişlet"""
         
         # Kısa sorguları veya referans içeren sorguları context ile genişlet
         query_words = user_query.split()
         
-        if len(query_words) <= 6 and self.conversation_history:  # 6 kelime veya daha az
+        if len(query_words) <= 6 and history:  # 6 kelime veya daha az
             
             # Son soru-cevap çiftini al
-            last_qa = self.conversation_history[-1]
+            last_qa = history[-1]
             last_question = last_qa[0]
             
             # Referans kelimeler - Türkçe'de yaygın
@@ -174,9 +366,14 @@ class AdvancedRAGChatbot:
         
         return user_query
 
-    def _apply_conversation_context_boost(self, results: List[Dict[str, Any]], user_query: str) -> List[Dict[str, Any]]:
+    def _apply_conversation_context_boost(
+        self,
+        results: List[Dict[str, Any]],
+        user_query: str,
+        history: List[HistoryEntry],
+    ) -> List[Dict[str, Any]]:
         """Conversation history'de kullanılan belgelere ve konulara ekstra boost ver - GENEL SİSTEM"""
-        if not self.conversation_history or not results:
+        if not history or not results:
             return results
         
         # Vague/belirsiz sorguları tespit et (conversation context gerektiren)
@@ -200,13 +397,13 @@ class AdvancedRAGChatbot:
                 needs_context = True
                 break
                 
-        if needs_context and self.conversation_history:
+        if needs_context and history:
             
             # Son 2 conversation'dan anahtar terimleri çıkar
             context_keywords = set()
             recent_sources = set()
             
-            for question, answer, timestamp in self.conversation_history[-2:]:
+            for question, answer, timestamp in history[-2:]:
                 # Sorulardan anahtar kelimeler
                 q_keywords = self._extract_query_keywords(question)
                 context_keywords.update(q_keywords)
@@ -219,7 +416,7 @@ class AdvancedRAGChatbot:
             last_used_sources = set()
             
             # Conversation history'den pattern matching ile kaynak tespit et
-            for question, answer, timestamp in self.conversation_history[-2:]:
+            for question, answer, timestamp in history[-2:]:
                 # Cevaptan domain pattern'lerini tespit et
                 combined_text = (question + " " + answer).lower()
                 
@@ -345,16 +542,13 @@ class AdvancedRAGChatbot:
         
         return min(relevance, 1.0)  # Max 1.0
 
-    def _add_to_conversation_history(self, question: str, answer: str):
-        """Conversation history'ye soru-cevap çifti ekle"""
-        import time
-        
-        # Yeni soru-cevap çiftini ekle
-        self.conversation_history.append((question, answer, time.time()))
-        
-        # History uzunluğunu sınırla
-        if len(self.conversation_history) > self.max_history_length:
-            self.conversation_history = self.conversation_history[-self.max_history_length:]
+    def _add_to_conversation_history(self, user_id: str, question: str, answer: str):
+        """Kullanıcının conversation history'sine soru-cevap çifti ekle"""
+        self.conversation_store.append(user_id, question, answer)
+
+    def clear_conversation(self, user_id: str) -> bool:
+        """Tek kullanıcının geçmişini temizle (modeller yeniden yüklenmez)"""
+        return self.conversation_store.clear(user_id)
 
     def _prepare_context(
         self, results: List[Dict[str, Any]], processed_query: Dict[str, Any]
@@ -366,7 +560,18 @@ class AdvancedRAGChatbot:
         documents = []
         user_query = processed_query.get('original_query', processed_query.get('query', ''))
 
-        for i, result in enumerate(results[: config.DEFAULT_N_RESULTS], 1):
+        top_results = results[: config.DEFAULT_N_RESULTS]
+        # Embedding için küçük tutulan child chunk'lar LLM'e parent pasajıyla verilir
+        parents = {}
+        try:
+            parents = self.parent_store.get_many(
+                (result.get("metadata") or {}).get("parent_id") for result in top_results
+            )
+        except Exception as e:
+            logger.warning(f"Parent pasajlar okunamadı, chunk metinleri kullanılacak: {e}")
+        used_parents = set()
+
+        for i, result in enumerate(top_results, 1):
             doc = result["document"]
             metadata = result.get("metadata", {})
             score = result.get("combined_score", 0)
@@ -375,6 +580,14 @@ class AdvancedRAGChatbot:
             if not self._is_document_relevant_to_query(doc, user_query):
                 continue
 
+            parent_id = metadata.get("parent_id")
+            if parent_id in parents:
+                # Aynı parent'tan gelen ikinci child context'i tekrar etmesin
+                if parent_id in used_parents:
+                    continue
+                used_parents.add(parent_id)
+                doc = parents[parent_id]["content"]
+
             # Document preprocessing - user_query ile birlikte
             clean_doc = self._clean_document_for_context(doc, user_query)
             documents.append(clean_doc)
@@ -387,6 +600,7 @@ class AdvancedRAGChatbot:
             # Context formatting
             context_parts.append(
                 {
+                    "id": result.get("id"),
                     "index": i,
                     "content": clean_doc,
                     "source": source_file,
@@ -504,6 +718,26 @@ class AdvancedRAGChatbot:
     ) -> Dict[str, Any]:
         """Gelişmiş prompt ile yanıt üret"""
 
+        prompt = self._build_prompt(user_query, context_info, processed_query)
+
+        # LLM'den yanıt al
+        raw_response = ask_local_llm(prompt, model=config.LLM_MODEL)
+        processed_response = self._clean_llm_response(raw_response, context_info, user_query)
+
+        return {
+            "response": processed_response,
+            "raw_response": raw_response,
+            "prompt_used": prompt,
+        }
+
+    def _build_prompt(
+        self,
+        user_query: str,
+        context_info: Dict[str, Any],
+        processed_query: Dict[str, Any],
+    ) -> str:
+        """Kategoriye özel talimatlarla RAG prompt'unu oluştur"""
+
         # Query kategorisine göre özelleştirilmiş prompt
         specialized_instructions = self._get_specialized_instructions(
             processed_query["category"]
@@ -516,27 +750,23 @@ class AdvancedRAGChatbot:
 Bu sorguya özgü ve kesin bir yanıt ver. Başka konulara değinme."""
 
         # Ana prompt oluştur
-        prompt = config.RAG_PROMPT_TEMPLATE.format(
+        return config.RAG_PROMPT_TEMPLATE.format(
             system_prompt=focused_system_prompt,
             question=user_query,
             context=context_info["formatted_context"],
         )
 
-        # LLM'den yanıt al
-        raw_response = ask_local_llm(prompt, model=config.LLM_MODEL)
+    def _clean_llm_response(
+        self, raw_response: str, context_info: Dict[str, Any], user_query: str
+    ) -> str:
+        """Ham LLM çıktısını temizle ve son işlemden geçir"""
         clean_response = temizle_yanit(raw_response)
 
         # Yanıt post-processing - tek soruya odaklanarak
-        processed_response = self._post_process_response(
+        return self._post_process_response(
             clean_response, context_info["sources"], user_query
         )
 
-        return {
-            "response": processed_response,
-            "raw_response": raw_response,
-            "prompt_used": prompt,
-        }
-
     def _get_specialized_instructions(self, query_category: str) -> str:
         """Query kategorisine göre özel talimatlar"""
         instructions = {
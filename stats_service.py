@@ -0,0 +1,166 @@
+"""
+Dashboard istatistikleri için arka plan bakımı.
+
+Sayılar question_db'deki daily_stats / source_stats / stats_counters
+tablolarında add_question ve track_user_session ile aynı transaction'da
+güncellenir. Silinen dokümanlara ait soruların temizlenmesi ve kaynakların
+anahtar kelime / mevcut olma bilgisi ise dosya okumaları gerektirdiğinden
+/api/admin/stats isteğinde değil, bu thread'de periyodik olarak (veya
+request_reconcile ile hemen) yapılır.
+
+stats.json da chat isteği içinde değil StatsJsonWriter thread'inde yazılır:
+art arda gelen tetiklemeler birleştirilir ve dosya en fazla
+STATS_JSON_MIN_INTERVAL saniyede bir yeniden üretilir.
+"""
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from config import config
+import question_db
+
+logger = logging.getLogger(__name__)
+
+
+class StatsReconciler:
+    """question_db.reconcile_sources'u arka planda çalıştırır"""
+
+    def __init__(self, interval: float = config.STATS_RECONCILE_INTERVAL):
+        self.interval = interval
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="stats-reconciler", daemon=True)
+            self._thread.start()
+        logger.info(f"📊 İstatistik reconciler başlatıldı ({self.interval:.0f} sn aralıkla)")
+
+    def request_reconcile(self):
+        """Doküman eklendi / silindi: bir sonraki turu beklemeden çalıştır"""
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            try:
+                question_db.reconcile_sources()
+            except Exception as e:
+                logger.error(f"❌ İstatistik reconcile hatası: {e}")
+            finally:
+                question_db.close_connection()
+            self._wakeup.wait(timeout=self.interval)
+            self._wakeup.clear()
+
+
+def build_stats_json() -> Dict[str, Any]:
+    """stats.json içeriği (sadece mevcut dosyalardan)"""
+    total_questions = question_db.get_total_questions()
+    top_sources = question_db.get_top_sources(5)
+    top_questions = question_db.get_top_questions_by_similarity(5)
+    return {
+        "totalQuestions": total_questions,
+        "uniqueQuestions": total_questions,  # Şimdilik total ile aynı
+        "topSources": [
+            {"source": source, "keyword": keyword, "count": count}
+            for source, keyword, count in top_sources
+        ],
+        "topQuestions": [
+            {"question": question, "count": count}
+            for question, answer, count in top_questions
+        ],
+        "lastUpdated": datetime.now().isoformat(),
+    }
+
+
+class StatsJsonWriter:
+    """stats.json'u tetiklemeleri birleştirerek arka planda, atomik olarak yazar"""
+
+    def __init__(
+        self,
+        path: str = config.STATS_JSON_PATH,
+        min_interval: float = config.STATS_JSON_MIN_INTERVAL,
+    ):
+        self.path = path
+        self.min_interval = min_interval
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last_started = 0.0
+        self._pending_triggers = 0
+        self._stats = {
+            "triggers": 0,
+            "regenerations": 0,
+            "coalesced_triggers": 0,
+            "last_duration_ms": None,
+            "last_written_at": None,
+            "last_error": None,
+        }
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="stats-json-writer", daemon=True)
+            self._thread.start()
+
+    def trigger(self):
+        """Yeniden üretim iste; hemen döner (chat yolunu bloklamaz)"""
+        self.start()
+        with self._lock:
+            self._stats["triggers"] += 1
+            self._pending_triggers += 1
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            # En fazla min_interval'da bir; bu sürede gelen tetiklemeler tek yazıma düşer
+            delay = self._last_started + self.min_interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._wakeup.clear()
+            with self._lock:
+                self._stats["coalesced_triggers"] += max(0, self._pending_triggers - 1)
+                self._pending_triggers = 0
+            self._last_started = time.monotonic()
+            self.regenerate()
+
+    def regenerate(self) -> Optional[float]:
+        """stats.json'u şimdi üret; süreyi (ms) döndür"""
+        started = time.perf_counter()
+        try:
+            stats_data = build_stats_json()
+            # Okuyanlar yarım dosya görmesin: geçici dosyaya yaz, sonra yer değiştir
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(stats_data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            with self._lock:
+                self._stats["last_error"] = str(e)
+            logger.error(f"❌ stats.json güncellenirken hata: {e}")
+            return None
+        duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        with self._lock:
+            self._stats["regenerations"] += 1
+            self._stats["last_duration_ms"] = duration_ms
+            self._stats["last_written_at"] = datetime.now().isoformat(timespec="seconds")
+            self._stats["last_error"] = None
+        logger.info(f"📊 stats.json güncellendi ({duration_ms} ms)")
+        return duration_ms
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "min_interval_seconds": self.min_interval}
+
+
+# Global reconciler / writer instances
+stats_reconciler = StatsReconciler()
+stats_json_writer = StatsJsonWriter()
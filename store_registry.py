@@ -0,0 +1,29 @@
+"""
+Chroma dizini başına tek örnek tutan ortak yardımcılar.
+
+chunk kataloğu, BM25 index'i, ingestion manifest'i, parent deposu ve
+ChromaDBManager aynı dizin için process genelinde tek örnek paylaşır;
+get_X(chroma_path) fonksiyonları bu kayıt defterini kullanır.
+"""
+import os
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+# SQLite IN (...) parametre sınırının altında kalmak için
+SQLITE_ID_CHUNK = 900
+
+
+class PathRegistry:
+    """(mutlak dizin yolu, ek anahtarlar) -> tek örnek"""
+
+    def __init__(self):
+        self._items: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str, factory: Callable[[], Any], *extra_key: Hashable) -> Any:
+        """Örnek yoksa factory ile oluştur; aynı yol için hep aynı örneği döndür"""
+        key = (os.path.abspath(path), *extra_key)
+        with self._lock:
+            if key not in self._items:
+                self._items[key] = factory()
+            return self._items[key]
@@ -0,0 +1,306 @@
+"""
+Append-only, memory-mapped embedding deposu.
+
+Her namespace (model) kendi dizininde iki dosya tutar:
+  - vectors.<gen>.bin : ardışık float32/float16 vektörler (slot * dim)
+  - index.<gen>.bin   : 24 byte'lık kayıtlar (16 byte md5 digest + 8 byte slot)
+meta.json aktif generation'ı, boyutu ve dtype'ı tutar.
+
+Yeni vektörler önce bellekte bekler; flush() sırasında vektör dosyasına
+eklenip fsync edilir, ardından index kayıtları yazılır. Böylece diskteki
+index hiçbir zaman yazılmamış bir vektörü göstermez. Yarım kalan kayıtlar
+açılışta kırpılır. Boyut sınırı aşıldığında en eski kayıtlar atılarak yeni
+bir generation'a sıkıştırılır.
+"""
+import os
+import json
+import struct
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STORE_VERSION = 1
+DIGEST_SIZE = 16
+_RECORD = struct.Struct("<16sQ")
+
+
+class MmapVectorStore:
+    """Tek namespace için hash -> slot index'i + mmap vektör dosyası"""
+
+    def __init__(
+        self,
+        directory: str,
+        dtype: str = "float32",
+        max_entries: Optional[int] = None,
+    ):
+        self.directory = directory
+        self.dtype = np.dtype(dtype)
+        self.max_entries = max_entries
+        self.dim: Optional[int] = None
+        self.generation = 0
+        self._lock = threading.RLock()
+
+        self._index: Dict[bytes, int] = {}
+        self._pending: Dict[bytes, np.ndarray] = {}
+        self._pending_order = []
+        self._n_slots = 0
+        self._mmap: Optional[np.memmap] = None
+
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    # ------------------------------------------------------------------ #
+    # Dosya yolları
+    # ------------------------------------------------------------------ #
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.directory, "meta.json")
+
+    def _vectors_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"vectors.{generation}.bin")
+
+    def _index_path(self, generation: int) -> str:
+        return os.path.join(self.directory, f"index.{generation}.bin")
+
+    # ------------------------------------------------------------------ #
+    # Yükleme
+    # ------------------------------------------------------------------ #
+    def _load(self):
+        """meta.json + index dosyasını oku, yarım kayıtları kırp"""
+        if not os.path.exists(self._meta_path):
+            return
+        try:
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except Exception as e:
+            logger.warning(f"Vektör deposu meta dosyası okunamadı ({self.directory}): {e}")
+            return
+
+        if meta.get("version") != STORE_VERSION:
+            logger.warning(f"Vektör deposu sürümü uyumsuz, boş başlatılıyor: {self.directory}")
+            return
+
+        self.dim = meta["dim"]
+        self.dtype = np.dtype(meta["dtype"])
+        self.generation = meta["generation"]
+        vector_bytes = self.dim * self.dtype.itemsize
+
+        vectors_path = self._vectors_path(self.generation)
+        index_path = self._index_path(self.generation)
+        if not os.path.exists(vectors_path):
+            open(vectors_path, "wb").close()
+        if not os.path.exists(index_path):
+            open(index_path, "wb").close()
+
+        # Yarım yazılmış vektörü at
+        vectors_size = os.path.getsize(vectors_path)
+        self._n_slots = vectors_size // vector_bytes
+        if vectors_size % vector_bytes:
+            with open(vectors_path, "r+b") as f:
+                f.truncate(self._n_slots * vector_bytes)
+            logger.warning(f"Yarım vektör kırpıldı: {vectors_path}")
+
+        with open(index_path, "rb") as f:
+            raw = f.read()
+        valid_size = len(raw) - len(raw) % _RECORD.size
+        if valid_size != len(raw):
+            with open(index_path, "r+b") as f:
+                f.truncate(valid_size)
+            logger.warning(f"Yarım index kaydı kırpıldı: {index_path}")
+
+        for digest, slot in _RECORD.iter_unpack(raw[:valid_size]):
+            if slot < self._n_slots:
+                self._index[digest] = slot
+
+        self._remap()
+        logger.info(f"💾 Vektör deposu yüklendi: {self.directory} ({len(self._index)} kayıt)")
+
+    def _remap(self):
+        """Vektör dosyasını salt-okunur olarak yeniden map et"""
+        if self._n_slots == 0 or self.dim is None:
+            self._mmap = None
+            return
+        self._mmap = np.memmap(
+            self._vectors_path(self.generation),
+            dtype=self.dtype,
+            mode="r",
+            shape=(self._n_slots, self.dim),
+        )
+
+    def _write_meta(self):
+        """meta.json'u atomik olarak yaz"""
+        tmp_path = f"{self._meta_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": STORE_VERSION,
+                    "dim": self.dim,
+                    "dtype": self.dtype.name,
+                    "generation": self.generation,
+                },
+                f,
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._meta_path)
+
+    # ------------------------------------------------------------------ #
+    # Okuma / yazma
+    # ------------------------------------------------------------------ #
+    def get(self, digest: bytes) -> Optional[np.ndarray]:
+        """Vektörü döndür (float32 depoda kopyasız mmap görünümü)"""
+        with self._lock:
+            pending = self._pending.get(digest)
+            if pending is not None:
+                return pending
+            slot = self._index.get(digest)
+            if slot is None or self._mmap is None:
+                return None
+            vector = self._mmap[slot]
+        if vector.dtype != np.float32:
+            return vector.astype(np.float32)
+        return vector
+
+    def put(self, digest: bytes, vector: np.ndarray) -> bool:
+        """Vektörü ekle (O(1), diske flush() ile yazılır). Zaten varsa False"""
+        with self._lock:
+            if digest in self._index or digest in self._pending:
+                return False
+
+            vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+            if self.dim is None:
+                self.dim = int(vector.shape[0])
+                self._write_meta()
+                open(self._vectors_path(self.generation), "ab").close()
+                open(self._index_path(self.generation), "ab").close()
+            elif vector.shape[0] != self.dim:
+                logger.warning(
+                    f"Vektör boyutu uyumsuz ({vector.shape[0]} != {self.dim}), cache'e yazılmadı"
+                )
+                return False
+
+            self._pending[digest] = vector
+            self._pending_order.append(digest)
+            return True
+
+    def __contains__(self, digest: bytes) -> bool:
+        with self._lock:
+            return digest in self._index or digest in self._pending
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._index) + len(self._pending)
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending_order)
+
+    def flush(self):
+        """Bekleyen vektörleri diske yaz: önce vektörler + fsync, sonra index + fsync"""
+        with self._lock:
+            if not self._pending_order:
+                return
+
+            block = np.stack([self._pending[d] for d in self._pending_order]).astype(
+                self.dtype, copy=False
+            )
+            first_slot = self._n_slots
+
+            with open(self._vectors_path(self.generation), "ab") as f:
+                f.write(np.ascontiguousarray(block).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            records = b"".join(
+                _RECORD.pack(digest, first_slot + i)
+                for i, digest in enumerate(self._pending_order)
+            )
+            with open(self._index_path(self.generation), "ab") as f:
+                f.write(records)
+                f.flush()
+                os.fsync(f.fileno())
+
+            for i, digest in enumerate(self._pending_order):
+                self._index[digest] = first_slot + i
+            self._n_slots += len(self._pending_order)
+            self._pending.clear()
+            self._pending_order = []
+            self._remap()
+
+            if self.max_entries and len(self._index) > self.max_entries:
+                self._compact()
+
+    def _compact(self):
+        """En eski kayıtları atarak yeni generation'a sıkıştır (FIFO eviction)"""
+        # Sınırın %90'ına indir, her flush'ta yeniden sıkıştırma yapılmasın
+        keep = int(self.max_entries * 0.9)
+        survivors = sorted(self._index.items(), key=lambda item: item[1])[-keep:]
+        new_generation = self.generation + 1
+
+        slots = np.fromiter((slot for _, slot in survivors), dtype=np.int64, count=len(survivors))
+        with open(self._vectors_path(new_generation), "wb") as f:
+            # Sıralı okuma: mmap üzerinden parça parça kopyala
+            for start in range(0, len(slots), 10000):
+                f.write(np.ascontiguousarray(self._mmap[slots[start:start + 10000]]).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        with open(self._index_path(new_generation), "wb") as f:
+            f.write(b"".join(_RECORD.pack(digest, i) for i, (digest, _) in enumerate(survivors)))
+            f.flush()
+            os.fsync(f.fileno())
+
+        old_generation = self.generation
+        self.generation = new_generation
+        self._write_meta()
+
+        self._index = {digest: i for i, (digest, _) in enumerate(survivors)}
+        self._n_slots = len(survivors)
+        self._remap()
+
+        for path in (self._vectors_path(old_generation), self._index_path(old_generation)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        logger.info(f"🧹 Vektör deposu sıkıştırıldı: {self.directory} ({self._n_slots} kayıt kaldı)")
+
+    def clear(self):
+        """Namespace'i tamamen sil"""
+        with self._lock:
+            self._mmap = None
+            self._index = {}
+            self._pending.clear()
+            self._pending_order = []
+            self._n_slots = 0
+            for name in os.listdir(self.directory):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+            self.dim = None
+            self.generation = 0
+
+    def size_bytes(self) -> int:
+        """Diskteki toplam boyut"""
+        total = 0
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if os.path.isfile(path):
+                total += os.path.getsize(path)
+        return total
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._index) + len(self._pending),
+                "pending": len(self._pending),
+                "dim": self.dim,
+                "dtype": self.dtype.name,
+                "generation": self.generation,
+                "size_mb": self.size_bytes() / (1024 * 1024),
+            }